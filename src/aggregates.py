@@ -0,0 +1,599 @@
+"""
+Constant-memory aggregates of the census summaries.
+
+The aggregates are updated one `RespondentTable` at a time, e.g., one chunk
+of a large export, and only keep what the summary statistics need: counters,
+distributions of the Likert answers and value counts of the numeric answers.
+Their memory use depends on the number of distinct answers, not on the number
+of respondents. A numeric question with more than `MAX_VALUE_COUNTS` distinct
+answers drops its value counts for a quantile sketch (see `src.sketches`)
+and running sums, so that its memory use is bounded too.
+
+Rows that were added can be taken out again with `retract`, so the summaries
+can follow respondents who edit or delete their response. This is not
+possible anymore for a numeric question that went over to a sketch.
+
+The aggregates are also the partial form of the summaries for sharded
+processing, e.g., of regional partner exports handled on different nodes:
+each shard is aggregated on its own, serialized with `to_dict`, and the
+shards are combined with `merge` before `result` finalizes the summaries.
+Counters, Likert distributions and value counts add up exactly, so the merged
+summaries are the same as those of all respondents at once, as long as each
+respondent is in a single shard. The '_tot_' of a counter counts respondents
+with at least one answer, both for single-choice and multi-select questions,
+and so also adds up across shards.
+
+Of the statistics of a numeric question, the minimum and the maximum always
+merge exactly, and the standard deviation up to rounding. The median is exact
+as long as the merged value counts stay within `MAX_VALUE_COUNTS` distinct
+answers; beyond, it is read from the merged quantile sketch, within its
+`rank_error`.
+"""
+
+import numpy as np
+
+import src.likert as likert
+import src.sketches as sketches
+import src.utils as utils
+
+# Distinct answers of a numeric question counted exactly before its aggregate
+# goes over to a quantile sketch
+MAX_VALUE_COUNTS = 10000
+
+
+class CounterAggregate:
+    """
+    Dictionary counter of a single-choice or multi-select question
+    """
+
+    def __init__(self, section : str, key : str, sort : bool = False):
+
+        self.section = section
+        self.key     = key
+        self.sort    = sort
+        self.counter = dict()
+
+    def update(self, table, idx):
+        self.counter = utils.merge_counters(self.counter, self.count(table, idx))
+
+    def retract(self, table, idx):
+        """
+        Undo `update` for rows that were counted before
+        """
+        for key, count in self.count(table, idx).items():
+            self.counter[key] -= count
+            if self.counter[key] == 0 and key != '_tot_':
+                del self.counter[key]
+
+    def merge(self, other):
+        """
+        Add the counts of the same aggregate of another shard
+        """
+        self.counter = utils.merge_counters(self.counter, other.counter)
+
+    def to_dict(self) -> dict:
+        return {'counter': [[key, count] for key, count in self.counter.items()]}
+
+    def load(self, state : dict):
+        self.counter = {key: count for key, count in state['counter']}
+
+    def count(self, table, idx) -> dict:
+        column = getattr(table, self.section)[self.key]
+
+        # Categorical and multi-select columns count with array operations
+        if hasattr(column, 'count'):
+            return column.count(idx)
+        return utils.count_values(column.rows(idx))
+
+    def result(self) -> dict:
+        if self.sort:
+            return utils.sort_dict(dict(self.counter))
+        return dict(self.counter)
+
+
+class LikertAggregate:
+    """
+    Running distribution of the answers to each question of a Likert block
+    """
+
+    def __init__(self, section : str, key : str):
+
+        self.section = section
+        self.key     = key
+        self.keys    = None
+        self.counts  = 0
+
+    def update(self, table, idx, sign=1):
+        block = getattr(table, self.section)[self.key]
+        self.add(block.keys, likert.distribution(block.answers, idx), sign)
+
+    def add(self, keys, counts, sign=1):
+
+        # Pad to the widest scale seen so far
+        if np.ndim(self.counts) == 2 and np.ndim(counts) == 2 and self.counts.shape != counts.shape:
+            width = max(self.counts.shape[1], counts.shape[1])
+            self.counts = np.pad(self.counts, ((0, 0), (0, width - self.counts.shape[1])))
+            counts = np.pad(counts, ((0, 0), (0, width - counts.shape[1])))
+
+        if keys is not None:
+            self.keys = keys
+        self.counts = self.counts + sign * counts
+
+    def merge(self, other):
+        """
+        Add the distributions of the same aggregate of another shard
+        """
+        self.add(other.keys, other.counts)
+
+    def to_dict(self) -> dict:
+        counts = self.counts.tolist() if np.ndim(self.counts) == 2 else None
+        return {'keys': self.keys, 'counts': counts}
+
+    def load(self, state : dict):
+        self.keys   = state['keys']
+        self.counts = 0 if state['counts'] is None else np.array(state['counts'], dtype=np.int64)
+
+    def retract(self, table, idx):
+        """
+        Undo `update` for rows that were counted before
+        """
+        self.update(table, idx, sign=-1)
+
+    def result(self) -> dict:
+        statistics = likert.statistics(self.counts, percentiles=())
+
+        res = dict()
+        res['keys']  = self.keys
+        res['count'] = statistics['count']
+        res['mean']  = statistics['mean']
+        res['stdev'] = statistics['stdev']
+        return res
+
+
+class NumericAggregate:
+    """
+    Statistics of a numeric question: median, standard deviation, minimum and
+    maximum
+
+    The answers are kept as value counts, from which every statistic is
+    computed exactly, as long as there are at most `max_values` distinct
+    answers. Beyond, the aggregate keeps a quantile sketch of size `k`, for
+    the median, minimum and maximum, and the count, sum and sum of squares of
+    the answers, for the standard deviation.
+    """
+
+    def __init__(self, section : str, key : str, name : str,
+                       statistics : tuple = ('median',),
+                       max_values : int = MAX_VALUE_COUNTS, k : int = sketches.K):
+
+        for statistic in statistics:
+            if statistic not in STATISTICS:
+                raise ValueError(f'Unknown statistic: {statistic}')
+
+        self.section      = section
+        self.key          = key
+        self.name         = name
+        self.statistics   = statistics
+        self.max_values   = max_values
+        self.k            = k
+        self.value_counts = dict()
+
+        # Sketch and running sums, once there are too many distinct answers
+        self.sketch      = None
+        self.sum         = 0.0
+        self.sum_squares = 0.0
+
+    @property
+    def is_exact(self) -> bool:
+        """
+        Whether the answers are still held as value counts
+        """
+        return self.value_counts is not None
+
+    def update(self, table, idx, sign=1):
+        values = getattr(table, self.section)[self.key].values[idx].astype(float)
+        values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+
+        if not self.is_exact:
+            if sign < 0:
+                raise ValueError(f'Cannot retract answers to {self.key} from its quantile sketch')
+            self.add_sketch(*self.sketch_of(values, counts))
+            return
+
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self.value_counts[value] = self.value_counts.get(value, 0) + sign * count
+            if self.value_counts[value] == 0:
+                del self.value_counts[value]
+
+        self.check_size()
+
+    def retract(self, table, idx):
+        """
+        Undo `update` for rows that were counted before
+        """
+        self.update(table, idx, sign=-1)
+
+    def merge(self, other):
+        """
+        Add the answers of the same aggregate of another shard
+        """
+
+        if self.is_exact and other.is_exact:
+            for value, count in other.value_counts.items():
+                self.value_counts[value] = self.value_counts.get(value, 0) + count
+            self.check_size()
+            return
+
+        if other.is_exact:
+            self.add_sketch(*self.sketch_of(*other.sorted_counts()))
+        else:
+            self.add_sketch(other.sketch, other.sum, other.sum_squares)
+
+    def check_size(self):
+        """
+        Go over to a quantile sketch if there are too many distinct answers
+        """
+        if len(self.value_counts) > self.max_values:
+            self.to_sketch()
+
+    def to_sketch(self):
+        """
+        Move the value counts to a quantile sketch and running sums
+        """
+        if self.is_exact:
+            self.sketch, self.sum, self.sum_squares = self.sketch_of(*self.sorted_counts())
+            self.value_counts = None
+
+    def sketch_of(self, values, counts) -> tuple:
+        """
+        Quantile sketch, sum and sum of squares of `values` counted `counts`
+        times
+        """
+        sketch = sketches.QuantileSketch(self.k).update(values, counts)
+        return sketch, float(np.sum(values * counts)), float(np.sum(values ** 2 * counts))
+
+    def add_sketch(self, sketch, total, total_squares):
+        """
+        Add the answers summarized by a sketch and their sums
+        """
+
+        self.to_sketch()
+        self.sketch.merge(sketch)
+        self.sum         += total
+        self.sum_squares += total_squares
+
+    def sorted_counts(self) -> tuple:
+        values = np.array(sorted(self.value_counts), dtype=float)
+        counts = np.array([self.value_counts[v] for v in values], dtype=np.int64)
+        return values, counts
+
+    def to_dict(self) -> dict:
+        if self.is_exact:
+            return {'value_counts': [[value, count] for value, count in self.value_counts.items()]}
+        return {'value_counts': None, 'sketch': self.sketch.to_dict(),
+                'sum': self.sum, 'sum_squares': self.sum_squares}
+
+    def load(self, state : dict):
+        if state['value_counts'] is not None:
+            self.value_counts = {value: count for value, count in state['value_counts']}
+            return
+
+        self.value_counts = None
+        self.sketch       = sketches.QuantileSketch.from_dict(state['sketch'])
+        self.sum          = state['sum']
+        self.sum_squares  = state['sum_squares']
+
+    def result(self) -> dict:
+        res = dict()
+
+        if self.is_exact:
+            values, counts = self.sorted_counts()
+            for statistic in self.statistics:
+                res[f'{self.name}_{statistic}'] = STATISTICS[statistic](values, counts)
+            return res
+
+        n = self.sketch.n
+        mean = self.sum / n if n > 0 else np.nan
+        sketched = {'median': self.sketch.median(),
+                    'std'   : np.sqrt(max(self.sum_squares / n - mean ** 2, 0.0)) if n > 0 else np.nan,
+                    'min'   : self.sketch.min,
+                    'max'   : self.sketch.max}
+
+        for statistic in self.statistics:
+            res[f'{self.name}_{statistic}'] = sketched[statistic]
+        return res
+
+
+def weighted_median(values, counts) -> float:
+    """
+    Median of `values` repeated `counts` times, as `np.median` would return
+    """
+
+    n = counts.sum()
+    if n == 0:
+        return np.nan
+
+    cumulative = np.cumsum(counts)
+    lower = values[np.searchsorted(cumulative, (n - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, n // 2, side='right')]
+
+    return (lower + upper) / 2
+
+
+def weighted_std(values, counts) -> float:
+    """
+    Population standard deviation of `values` repeated `counts` times
+    """
+
+    n = counts.sum()
+    if n == 0:
+        return np.nan
+
+    mean = np.sum(values * counts) / n
+    return np.sqrt(np.sum(counts * (values - mean) ** 2) / n)
+
+
+def weighted_min(values, counts) -> float:
+    """
+    Smallest of the `values` counted at least once
+    """
+
+    is_counted = counts > 0
+    return values[is_counted].min() if is_counted.any() else np.nan
+
+
+def weighted_max(values, counts) -> float:
+    """
+    Largest of the `values` counted at least once
+    """
+
+    is_counted = counts > 0
+    return values[is_counted].max() if is_counted.any() else np.nan
+
+
+STATISTICS = {'median' : weighted_median,
+              'std'    : weighted_std,
+              'min'    : weighted_min,
+              'max'    : weighted_max}
+
+
+def summary_fields() -> dict:
+    """
+    Aggregates behind each summary of `Analyst`
+
+    Returns a dictionary from summary name (the `Analyst.summarize_*` method
+    without its prefix) to the population it covers and its fields. Each field
+    is a pair of the output key and the aggregate; an output key of None merges
+    the result of the aggregate into the summary itself.
+
+    Per-respondent outputs, like the lists of free-text answers or the arrays
+    of raw values, are left out since they grow with the number of
+    respondents.
+    """
+
+    return {
+        'census_sentiment': ('all', [
+            (None, LikertAggregate('census', 'sentiment'))]),
+
+        'census_skills_demand': ('all', [
+            ('value_chain_in_demand', CounterAggregate('census', 'skills_value_chain'))]),
+
+        'census_backgrounds': ('all', [
+            ('degree',            CounterAggregate('census', 'degree')),
+            ('country',           CounterAggregate('census', 'country')),
+            ('state',             CounterAggregate('census', 'state')),
+            ('education',         CounterAggregate('census', 'education')),
+            ('ethnicity',         CounterAggregate('census', 'ethnicity')),
+            ('gender',            CounterAggregate('census', 'gender')),
+            ('citizenship',       CounterAggregate('census', 'citizenship')),
+            ('military_status',   CounterAggregate('census', 'military_status')),
+            ('employment_status', CounterAggregate('census', 'employment_status'))]),
+
+        'company_satisfaction': ('working', [
+            (None, LikertAggregate('company', 'company_satisfaction'))]),
+
+        'company_salary': ('working', [
+            (None,                 NumericAggregate('company', 'salary_base', 'salary_base', ('median', 'std'))),
+            ('salary_num_raises',  CounterAggregate('company', 'salary_num_raises')),
+            ('salary_num_bonuses', CounterAggregate('company', 'salary_num_bonuses')),
+            ('salary_comp_types',  CounterAggregate('company', 'salary_comp_types', sort=True))]),
+
+        'company_info': ('working', [
+            (None,                  NumericAggregate('company', 'company_years_with', 'num_years_with_company')),
+            ('company_value_chain', CounterAggregate('company', 'company_value_chain')),
+            ('company_stage',       CounterAggregate('company', 'company_stage')),
+            ('company_country',     CounterAggregate('company', 'company_country')),
+            ('company_state',       CounterAggregate('company', 'company_state')),
+            ('company_headcount',   CounterAggregate('company', 'company_headcount')),
+            ('company_team_count',  CounterAggregate('company', 'company_team_count'))]),
+
+        'company_role': ('working', [
+            ('role_role',            CounterAggregate('company', 'role_role')),
+            ('role_level',           CounterAggregate('company', 'role_level')),
+            ('role_why_choose',      CounterAggregate('company', 'role_why_choose')),
+            ('role_prev_industries', CounterAggregate('company', 'role_prev_industries'))]),
+
+        'company_skills': ('working', [
+            ('skills_how_to_improve',         CounterAggregate('company', 'skills_how_to_improve')),
+            ('skills_how_was_trained',        CounterAggregate('company', 'skills_how_was_trained')),
+            ('num_previous_internships',      CounterAggregate('company', 'skills_num_internships')),
+            ('skills_preparedness_sentiment', LikertAggregate('company', 'skills_preparedness'))]),
+
+        'company_retention': ('working', [
+            ('retention_factors',              CounterAggregate('company', 'retention_factors')),
+            ('retention_is_on_market',         CounterAggregate('company', 'retention_is_on_market')),
+            ('retention_num_employer_changes', CounterAggregate('company', 'retention_num_employer_changes')),
+            ('retention_sentiment',            LikertAggregate('company', 'retention_sentiment'))]),
+
+        'company_benefits': ('working', [
+            ('entitlements',         CounterAggregate('company', 'benefits_entitlements')),
+            ('parental_leave_weeks', CounterAggregate('company', 'benefits_parental_leave_weeks')),
+            ('pto_weeks',            CounterAggregate('company', 'benefits_pto_weeks')),
+            ('sick_leave_days',      CounterAggregate('company', 'benefits_sick_leave_days')),
+            ('benefits_priorities',  LikertAggregate('company', 'benefits_priorities'))]),
+
+        'student_sentiment': ('student', [
+            (None, LikertAggregate('student', 'student_sentiment'))]),
+
+        'student_backgrounds': ('student', [
+            ('degree',    CounterAggregate('census', 'degree')),
+            ('country',   CounterAggregate('census', 'country')),
+            ('state',     CounterAggregate('census', 'state')),
+            ('education', CounterAggregate('census', 'education'))]),
+
+        'student_ideal': ('student', [
+            ('ideal_value_chain', CounterAggregate('student', 'ideal_value_chain')),
+            ('ideal_job_aspects', CounterAggregate('student', 'ideal_job_aspects')),
+            (None,                NumericAggregate('student', 'ideal_salary', 'ideal_salary'))]),
+
+        'student_internship': ('student', [
+            ('num_internships',        CounterAggregate('student', 'num_internships')),
+            ('internship_value_chain', CounterAggregate('student', 'internship_value_chain')),
+            ('internship_role',        CounterAggregate('student', 'internship_role')),
+            (None,                     NumericAggregate('student', 'internship_hourly_pay', 'internship_hourly_pay')),
+            (None,                     NumericAggregate('student', 'internship_hours_per_week', 'internship_hours_per_week'))]),
+    }
+
+
+def population_rows(table, population : str) -> np.ndarray:
+    """
+    Rows of the table in one of the populations used by the summaries
+    """
+
+    if population == 'all':
+        return np.arange(len(table))
+    if population == 'working':
+        return np.flatnonzero(table.working_mask())
+    if population == 'student':
+        return np.flatnonzero(table.student_mask())
+
+    raise ValueError(f'Unknown population: {population}')
+
+
+class SummaryAggregator:
+    """
+    Aggregates for all of the summaries, updated one table at a time
+    """
+
+    def __init__(self):
+
+        self.fields = summary_fields()
+
+        # Respondent counts for the summary of the stats
+        self.counts = {'num_total': 0}
+        for group in ['working', 'unemployed', 'student']:
+            self.counts[f'num_{group}'] = 0
+            self.counts[f'num_{group}_and_completed_all_questions'] = 0
+
+    def update(self, table):
+        """
+        Add the respondents of a table to the aggregates
+        """
+
+        self._apply(table, 'update', 1)
+
+    def retract(self, table):
+        """
+        Remove respondents that were added before, e.g., the old answers of
+        respondents who edited their response
+        """
+
+        if not self.can_retract:
+            raise ValueError('Cannot retract respondents from numeric answers held '
+                             'in quantile sketches')
+        self._apply(table, 'retract', -1)
+
+    @property
+    def can_retract(self) -> bool:
+        """
+        Whether respondents can still be retracted, i.e., no numeric question
+        went over to a quantile sketch
+        """
+        return all(getattr(aggregate, 'is_exact', True)
+                   for _, fields in self.fields.values() for _, aggregate in fields)
+
+    def _apply(self, table, method, sign):
+
+        rows = dict()
+
+        for population, fields in self.fields.values():
+            if population not in rows:
+                rows[population] = population_rows(table, population)
+            for _, aggregate in fields:
+                getattr(aggregate, method)(table, rows[population])
+
+        self.counts['num_total'] += sign * len(table)
+        for group in ['working', 'unemployed', 'student']:
+            is_group = table.flags[f'is_{group}']
+            self.counts[f'num_{group}'] += sign * int(is_group.sum())
+            self.counts[f'num_{group}_and_completed_all_questions'] += \
+                sign * int((is_group & table.flags[f'is_{group}_and_completed_all_questions']).sum())
+
+    def merge(self, other):
+        """
+        Add the aggregates of another shard, e.g., of another export
+        """
+
+        for name, (_, fields) in self.fields.items():
+            for (_, aggregate), (_, other_aggregate) in zip(fields, other.fields[name][1]):
+                aggregate.merge(other_aggregate)
+
+        for key, count in other.counts.items():
+            self.counts[key] += count
+
+        return self
+
+    def to_dict(self) -> dict:
+        """
+        JSON-compatible state of the aggregates, to send a partial result to
+        another process or node
+        """
+
+        res = dict()
+        res['fields'] = {name: [aggregate.to_dict() for _, aggregate in fields]
+                         for name, (_, fields) in self.fields.items()}
+        res['counts'] = dict(self.counts)
+        return res
+
+    @classmethod
+    def from_dict(cls, state : dict):
+        aggregator = cls()
+        for name, (_, fields) in aggregator.fields.items():
+            for (_, aggregate), field_state in zip(fields, state['fields'][name]):
+                aggregate.load(field_state)
+        aggregator.counts.update(state['counts'])
+        return aggregator
+
+    def result(self) -> dict:
+        """
+        Return the summaries, keyed by summary name
+        """
+
+        summaries = dict()
+
+        for name, (_, fields) in self.fields.items():
+            res = dict()
+            for output, aggregate in fields:
+                if output is None:
+                    res.update(aggregate.result())
+                else:
+                    res[output] = aggregate.result()
+            summaries[name] = res
+
+        summaries['stats'] = dict(self.counts)
+
+        return summaries
+
+
+def merge_partials(partials) -> SummaryAggregator:
+    """
+    Merge the aggregates of several shards, given as `SummaryAggregator`s or
+    their `to_dict` states, into a new aggregator
+    """
+
+    merged = SummaryAggregator()
+    for partial in partials:
+        if isinstance(partial, dict):
+            partial = SummaryAggregator.from_dict(partial)
+        merged.merge(partial)
+    return merged
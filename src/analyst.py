@@ -1,8 +1,27 @@
 import pandas as pd
 import numpy as np
-from collections import defaultdict
+import warnings
 from src.respondent import Respondent as Respondent
-import src.utils as utils
+from src.respondent import respondents_from_table, RespondentViews
+from src.parser import join_typeform_metadata, read_google_sheet
+import src.parser as parser
+import src.schema as schema
+from src.table import RespondentTable, LikertBlock, NumericColumn
+from src.index import FilterIndex
+import src.aggregates as aggregates
+import src.bootstrap as bootstrap
+import src.filters as filters
+import src.groupby as groupby
+import src.likert as likert
+import src.memo as memo
+import src.parallel as parallel
+import src.sketches as sketches
+import src.cache as cache
+import src.store as store
+import src.summaries as summaries
+from src.summaries import select_weights
+import src.timeseries as timeseries
+import src.weights as weighting
 
 FILE_GSHEET   = 'data/talent_census_data_20241230_gsheet_export.csv'
 FILE_TYPEFORM = 'data/talent_census_data_20241230_typeform_export.csv'
@@ -14,33 +33,417 @@ class Analyst:
 
     def __init__(self):
 
-        # Store the raw data
-        self.df_gsheet = None
-        self.df_typeform = None
+        # Paths to the raw data
+        self.file_gsheet = None
+        self.file_typeform = None
 
-        # Store the list of responses
+        # Store the raw data (read on first access, see `df_gsheet`)
+        self._df_gsheet = None
+        self._df_typeform = None
+
+        # Response metadata from the TypeForm export, joined on token
+        self._df_metadata = None
+        self.join_report = None
+
+        # Schema drift of the Google Sheet export (see `check_schema`)
+        self.schema_report = None
+
+        # Fingerprint of the raw data and parser for the on-disk cache
+        self.cache_dir = None
+        self.cache_key = None
+
+        # Columnar store of the parsed responses
+        self.table = None
+
+        # Hash of the raw Google Sheet row of each respondent (see `refresh`)
+        self.row_hashes = None
+
+        # Aggregates behind `summaries`, kept up to date by `refresh`
+        self.aggregator = None
+
+        # Bitmap indexes behind `filter_respondents_on` (see `filter_index`)
+        self._filter_index = None
+
+        # Memoized results of the `summarize_*` methods (see `src.memo`);
+        # set to None to turn memoization off
+        self.summary_cache = memo.SummaryCache()
+
+        # Store the list of responses (views over the rows of the table)
         self.respondents_list = []
 
 
+    @property
+    def df_gsheet(self) -> pd.DataFrame:
+        """ Raw data from the Google Sheet export """
+        if self._df_gsheet is None and self.file_gsheet is not None:
+            self._df_gsheet = read_google_sheet(self.file_gsheet)
+        return self._df_gsheet
+
+    @property
+    def df_typeform(self) -> pd.DataFrame:
+        """ Raw data from the TypeForm export """
+        if self._df_typeform is None and self.file_typeform is not None:
+            self._df_typeform = pd.read_csv(self.file_typeform)
+        return self._df_typeform
+
+    @property
+    def df_metadata(self) -> pd.DataFrame:
+        """ Response metadata from the TypeForm export, joined on token """
+        if self._df_metadata is None and self.file_typeform is not None:
+            self.join_data()
+        return self._df_metadata
+
+
     def load_data(self,
                     file_gsheet=FILE_GSHEET,
-                    file_typeform=FILE_TYPEFORM):
+                    file_typeform=FILE_TYPEFORM,
+                    cache_dir=cache.CACHE_DIR):
+        """
+        Load the raw census data
+
+        If `cache_dir` is set, the parsed responses are looked up in the
+        on-disk cache first. On a cache hit the raw exports are not read at all
+        (they are read on first access of `df_gsheet` or `df_typeform`), and
+        `build_respondents_list` reuses the cached table. Use `cache_dir=None`
+        to always parse the exports.
+        """
+
+        self.file_gsheet = file_gsheet
+        self.file_typeform = file_typeform
+
+        self._df_gsheet = None
+        self._df_typeform = None
+        self._df_metadata = None
+        self.table = None
+        self.row_hashes = None
+        self.aggregator = None
+
+        self.cache_dir = cache_dir
+        self.cache_key = None
+
+        if cache_dir is not None:
+            self.cache_key = cache.fingerprint(file_gsheet, file_typeform)
+            cached = cache.load(cache_dir, self.cache_key)
+            if cached is not None:
+                self.table, extras = cached
+                self.join_report = extras['join_report']
+                self.schema_report = extras.get('schema_report')
+                return
+
+        self.check_schema()
+        self.join_data()
+
+
+    def check_schema(self, df_gsheet : pd.DataFrame = None):
+        """
+        Compare the columns of the Google Sheet export with the question
+        registry (see `src.schema`)
+
+        Columns that no question reads are reported with a warning; missing
+        columns raise a `schema.SchemaDriftError` listing all of them, before
+        anything is parsed.
+        """
+
+        if df_gsheet is None:
+            df_gsheet = self.df_gsheet
+
+        plan = schema.compile_schema(df_gsheet.columns)
+        self.schema_report = plan.report()
+
+        if len(plan.unexpected) > 0:
+            warnings.warn(f'{len(plan.unexpected)} column(s) of the export not in the '
+                          f'question registry: {plan.unexpected}')
+
+        plan.check()
+
 
-        self.df_gsheet = pd.read_csv(file_gsheet)
-        self.df_typeform = pd.read_csv(file_typeform)
+    def join_data(self):
+        """
+        Join the TypeForm metadata onto the Google Sheet tokens
+        """
+
+        self._df_metadata, self.join_report = join_typeform_metadata(self.df_gsheet,
+                                                                     self.df_typeform)
+
+        for side, tokens in self.join_report.items():
+            if len(tokens) > 0:
+                warnings.warn(f'{len(tokens)} token(s) {side.replace("_", " ")}')
 
 
     def build_respondents_list(self) -> list[Respondent]:
         """
-        Build a complete list of respondents"""
+        Build a complete list of respondents
+
+        The Google Sheet is parsed in a single columnar pass into a
+        `RespondentTable`, together with the TypeForm metadata from the token
+        join done in `load_data`. Each respondent is a view over one row of the
+        table. If `load_data` found the table in the cache, it is used as is;
+        otherwise the new table is saved to the cache.
+        """
+
+        if self.table is None:
+            self.table = RespondentTable.from_frames(self.df_gsheet, self.df_metadata)
+            self.save_cache()
+
+        self.respondents_list = respondents_from_table(self.table)
+        self._filter_index = FilterIndex(self.table)
+
+
+    @property
+    def filter_index(self) -> FilterIndex:
+        """
+        Bitmap indexes of the filterable attributes, and catalog of their valid
+        values; built once per table
+        """
+        if self._filter_index is None or self._filter_index.table is not self.table:
+            self._filter_index = FilterIndex(self.table)
+        return self._filter_index
+
+
+    def filter_catalog(self) -> dict:
+        """
+        Valid values of each attribute `filter_respondents_on` filters on
+        """
+        return self.filter_index.catalog()
+
+
+    def save_cache(self):
+        """
+        Save the table to the on-disk cache, if `load_data` set one up
+        """
+
+        if self.cache_key is not None:
+            cache.save(self.cache_dir, self.cache_key, self.table,
+                       extras={'join_report': self.join_report,
+                               'schema_report': self.schema_report})
+
+
+    def refresh(self, file_gsheet, file_typeform):
+        """
+        Bring the respondent data up to date with a newer export of the census
+
+        The rows of the new Google Sheet export are hashed and compared with
+        the rows the current table was parsed from; only the responses of new
+        tokens, and of tokens whose row changed, are parsed. Deleted tokens are
+        dropped. The table follows the order of the new export, exactly as if
+        it had been loaded from scratch, and the aggregates of `summaries` are
+        updated with the difference only.
+
+        The TypeForm metadata is only joined for the new and changed tokens;
+        a change in the TypeForm export alone is not picked up.
+
+        Parameters
+        ----------
+        file_gsheet : str
+            Path to the new Google Sheet export
+        file_typeform : str
+            Path to the new TypeForm export
+
+        Returns
+        -------
+        dict with the 'new', 'changed' and 'deleted' tokens
+        """
+
+        if self.table is None:
+            self.build_respondents_list()
+
+        old_table  = self.table
+        old_hashes = self.current_row_hashes()
+
+        df_gsheet   = read_google_sheet(file_gsheet).drop_duplicates(subset='Token', keep='first')
+        df_typeform = pd.read_csv(file_typeform)
+        self.check_schema(df_gsheet)
+        hashes      = parser.row_hashes(df_gsheet)
+        tokens      = df_gsheet['Token'].to_numpy()
+
+        # Row of each token of the new export in the current table (-1 if new)
+        old_rows   = pd.Index(old_table.tokens).get_indexer(tokens)
+        is_new     = old_rows < 0
+        is_changed = ~is_new & (hashes != old_hashes[np.maximum(old_rows, 0)])
+        is_deleted = ~pd.Index(old_table.tokens).isin(tokens)
+
+        report = dict()
+        report['new']     = tokens[is_new].tolist()
+        report['changed'] = tokens[is_changed].tolist()
+        report['deleted'] = old_table.tokens[is_deleted].tolist()
+
+        # Parse the delta only
+        df_delta = df_gsheet[is_new | is_changed]
+        df_metadata, _ = join_typeform_metadata(df_delta,
+                            df_typeform[df_typeform['#'].isin(df_delta['Token'])])
+        delta = RespondentTable.from_frames(df_delta, df_metadata)
+
+        # Keep the untouched rows and put everything in the order of the new export
+        kept     = np.sort(old_rows[~is_new & ~is_changed])
+        combined = RespondentTable.concat([old_table.take(kept), delta])
+        table    = combined.take(pd.Index(combined.tokens).get_indexer(tokens))
+
+        # Aggregates that cannot retract respondents are rebuilt on next use
+        if self.aggregator is not None and not self.aggregator.can_retract:
+            self.aggregator = None
+
+        if self.aggregator is not None:
+            retracted = np.flatnonzero(is_deleted)
+            retracted = np.sort(np.concatenate([retracted, old_rows[is_changed]]))
+            self.aggregator.retract(old_table.take(retracted))
+            self.aggregator.update(delta)
+
+        self.file_gsheet   = file_gsheet
+        self.file_typeform = file_typeform
+        self._df_gsheet    = df_gsheet
+        self._df_typeform  = df_typeform
+        self._df_metadata  = None
+        self.join_report   = parser.join_report(tokens, df_typeform['#'])
+
+        self.table            = table
+        self.row_hashes       = hashes
+        self.respondents_list = respondents_from_table(table)
+        self._filter_index    = FilterIndex(table)
+
+        if self.cache_dir is not None:
+            self.cache_key = cache.fingerprint(file_gsheet, file_typeform)
+            self.save_cache()
+
+        return report
+
+
+    def current_row_hashes(self) -> np.ndarray:
+        """
+        Hashes of the Google Sheet rows the table was parsed from
+        """
+
+        if self.row_hashes is None:
+            if self.df_gsheet is None:
+                raise ValueError('The export the table was parsed from is unknown')
+            df = self.df_gsheet.drop_duplicates(subset='Token', keep='first')
+            self.row_hashes = parser.row_hashes(df)
+
+        return self.row_hashes
+
+
+    def summaries(self) -> dict:
+        """
+        Summaries of all respondents, keyed by summary name
+
+        The same counters and statistics as `stream_summaries`, from
+        aggregates that are built on first use and then updated by `refresh`
+        without re-reading the unchanged respondents.
+        """
+
+        if self.table is None:
+            self.build_respondents_list()
+
+        if self.aggregator is None:
+            self.aggregator = aggregates.SummaryAggregator()
+            self.aggregator.update(self.table)
+
+        return self.aggregator.result()
+
+
+    def save_store(self, path, overwrite=False):
+        """
+        Save the parsed responses as a memory-mapped store (see `src.store`)
+        """
+
+        store.save(self.table, path, overwrite=overwrite)
+
+
+    def open_store(self, path, mmap=True):
+        """
+        Use a memory-mapped store as the respondent data, instead of
+        `load_data` and `build_respondents_list`
+
+        Opening the store is near-instant regardless of its size: columns are
+        only read when a filter or summary touches them, and the respondents
+        list creates its `Respondent` views on access.
+        """
+
+        self.file_gsheet = None
+        self.file_typeform = None
+        self._df_gsheet = None
+        self._df_typeform = None
+        self._df_metadata = None
+        self.join_report = None
+        self.schema_report = None
+        self.cache_key = None
+        self.row_hashes = None
+        self.aggregator = None
+
+        self.table = store.open_store(path, mmap=mmap)
+        self.respondents_list = RespondentViews(self.table)
+
+
+    def stream_summaries(self, file_gsheet=FILE_GSHEET, chunksize=10000) -> dict:
+        """
+        Summarize an export in fixed-size chunks, without loading it whole
+
+        Each chunk of the Google Sheet export is parsed into a table of its own
+        and added to constant-memory aggregates (see `src.aggregates`), so the
+        peak memory is bounded by the chunk size. This does not change the
+        respondent data of the `Analyst`.
+
+        The summaries hold the same counters and statistics as the
+        `summarize_*` methods, but not the per-respondent outputs (lists of
+        free-text answers, arrays of raw values, submit times and survey
+        durations). Tokens are assumed to be unique across chunks.
+
+        Returns
+        -------
+        dict from summary name (e.g., 'company_salary') to the summary
+        """
+
+        return self.partial_summaries(file_gsheet, chunksize).result()
+
+
+    def partial_summaries(self, file_gsheet=None, chunksize=10000) -> aggregates.SummaryAggregator:
+        """
+        Partial summaries of an export (streamed in chunks as in
+        `stream_summaries`), or of the current respondents if no export is
+        given, to be merged with those of other shards
+
+        Shards, e.g., regional partner exports processed on different nodes,
+        are combined map-reduce style; as long as each respondent is in a
+        single shard, the result is the same as for all respondents at once:
+
+            partials = [analyst.partial_summaries(file).to_dict() for file in files]
+            summaries = aggregates.merge_partials(partials).result()
+
+        Returns a `SummaryAggregator` (see `src.aggregates`)
+        """
+
+        aggregator = aggregates.SummaryAggregator()
+
+        if file_gsheet is None:
+            aggregator.update(self.table)
+            return aggregator
+
+        for chunk in read_google_sheet(file_gsheet, chunksize=chunksize):
+            aggregator.update(RespondentTable.from_frames(chunk))
+
+        return aggregator
+
+
+    def select_rows(self, respondents_list=None) -> tuple:
+        """
+        Locate a list of respondents in the table
+
+        Returns the table and an array of row indices (all rows by default)
+        """
 
-        for token in self.df_gsheet['Token'].unique():
+        if respondents_list is None or respondents_list is self.respondents_list:
+            return self.table, np.arange(len(self.table))
 
-            resp = Respondent(token)
-            resp.set_properties_from_google_sheet(self.df_gsheet)
-            resp.set_properties_from_typeform(self.df_typeform)
+        if len(respondents_list) == 0:
+            return self.table, np.zeros(0, dtype=np.int64)
 
-            self.respondents_list.append(resp)
+        return RespondentTable.from_respondents(respondents_list)
+
+
+    def summary_cache_stats(self) -> dict:
+        """
+        Hit and miss statistics of the memoized summaries
+        """
+        return self.summary_cache.stats()
 
 
     def filter_respondents_on(self, is_student=False,
@@ -67,641 +470,553 @@ class Analyst:
         assert isinstance(is_unemployed, bool), "is_unemployed must be a boolean"
         assert isinstance(is_completed_all_questions, bool), "is_completed_all_questions must be a boolean"
 
-        # Use all of the responses to define the list of valid entries
-        backgrounds = self.summarize_census_backgrounds()
-        assert education is None or education in backgrounds['education'].keys(), "Invalid education level"
-        assert degree is None or degree in backgrounds['degree'].keys(), "Invalid degree"
-        assert country is None or country in backgrounds['country'].keys(), "Invalid country"
-        assert state is None or state in backgrounds['state'].keys(), "Invalid state"
-        assert ethnicity is None or ethnicity in backgrounds['ethnicity'].keys(), "Invalid ethnicity"
-        assert gender is None or gender in backgrounds['gender'].keys(), "Invalid gender filter"
-        assert citizenship is None or citizenship in backgrounds['citizenship'].keys(), "Invalid citizenship"
-        assert military_status is None or military_status in backgrounds['military_status'].keys(), "Invalid military status"
-
-        # Create a new list using list comprehension to keep only elements that
-        # do NOT match the removal criteria
-        filtered_list = [r for r in self.respondents_list if (
-            (not is_student or r.is_student) and
-            (not is_working or r.is_working) and
-            (not is_unemployed or r.is_unemployed) and
-            (not is_completed_all_questions or r.is_completed_all_questions) and
-            (education is None or r.census['education'] == education) and
-            (degree is None or r.census['degree'] == degree) and
-            (country is None or r.census['country'] == country) and
-            (state is None or r.census['state'] == state) and
-            (ethnicity is None or ethnicity in r.census['ethnicity']) and
-            (gender is None or r.census['gender'] == gender) and
-            (citizenship is None or r.census['citizenship'] == citizenship) and
-            (military_status is None or r.census['military_status'] == military_status)
-        )]
+        # Use the catalog of the filter index to define the list of valid entries
+        index = self.filter_index
+        assert education is None or education in index.indexes['education'], "Invalid education level"
+        assert degree is None or degree in index.indexes['degree'], "Invalid degree"
+        assert country is None or country in index.indexes['country'], "Invalid country"
+        assert state is None or state in index.indexes['state'], "Invalid state"
+        assert ethnicity is None or ethnicity in index.indexes['ethnicity'], "Invalid ethnicity"
+        assert gender is None or gender in index.indexes['gender'], "Invalid gender filter"
+        assert citizenship is None or citizenship in index.indexes['citizenship'], "Invalid citizenship"
+        assert military_status is None or military_status in index.indexes['military_status'], "Invalid military status"
+
+        # AND together the bitmaps of the rows that match each criterion
+        flags = [flag for flag, is_required in [('is_student', is_student),
+                                                ('is_working', is_working),
+                                                ('is_unemployed', is_unemployed),
+                                                ('is_completed_all_questions', is_completed_all_questions)]
+                 if is_required]
+
+        mask = index.mask(flags,
+                          education=education,
+                          degree=degree,
+                          country=country,
+                          state=state,
+                          ethnicity=ethnicity,
+                          gender=gender,
+                          citizenship=citizenship,
+                          military_status=military_status)
+
+        _, idx = self.select_rows(self.respondents_list)
+        filtered_list = [self.respondents_list[i] for i in np.flatnonzero(mask[idx])]
 
         return filtered_list
 
 
-    def filter_for_working(self, respondents_list=None) -> list:
+    def filter_respondents(self, expression, respondents_list=None) -> list:
         """
-        From a given list of respondents, downselect to only those who are
-        working or used to work, and have completed the questions for this
-        section. We do not distinguish between those who are currently working
-        and those who have worked in the past but have since left voluntarily
-        or have been let go (we'll let the user handle this filter manually by
-        specifying the `respondents_list` optional argument).
+        Filter respondents with an expression over their answers (see
+        `src.filters`), given as a string or built with `filters.field`, e.g.,
 
-        Returns a filtered list of respondents
+            analyst.filter_respondents("is_working and role_level in "
+                                       "['Senior', 'Expert', 'Director/VP'] "
+                                       "and salary_base > 120000")
+
+        The expression is evaluated as one boolean mask over the table.
+
+        Returns a filtered list
         """
 
         if respondents_list is None:
             respondents_list = self.respondents_list
 
-        working_list = []
+        table, idx = self.select_rows(respondents_list)
+        mask = filters.as_expression(expression).mask(table)[idx]
 
-        for respondent in respondents_list:
-            if respondent.is_working_and_completed_all_questions or \
-               respondent.is_unemployed_and_completed_all_questions:
-                working_list.append(respondent)
+        return [respondents_list[i] for i in np.flatnonzero(mask)]
 
-        return working_list
 
-
-    def summarize_census_sentiment(self, respondents_list=None) -> dict:
+    def group_by(self, keys, metrics=(), respondents_list=None) -> pd.DataFrame:
         """
-        Return summary statistics for the census sentiment question
+        Break respondents down by one or more grouping keys and summarize
+        each group in a single grouped pass (see `src.groupby`), e.g.,
+
+            analyst.group_by(['state', 'role_level'],
+                             {'salary_base': ['median', 'std'],
+                              'company_satisfaction': 'mean'},
+                             analyst.filter_for_working())
+
+        Returns a data frame with one row per non-empty group
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        table, idx = self.select_rows(respondents_list)
+        return groupby.group_by(table, keys, metrics, idx)
+
 
-        keys = respondents_list[0].census['sentiment']['keys']
+    @memo.memoized
+    def time_series(self, likert=('sentiment',), numeric=(), respondents_list=None,
+                          freq : str = timeseries.FREQ, window : int = timeseries.WINDOW,
+                          weights=None) -> dict:
+        """
+        Responses per time bucket, cumulative and rolling, with rolling means
+        of Likert blocks and rolling medians of numeric questions (see
+        `src.timeseries`), e.g., to follow the sentiment of working
+        respondents week by week
 
-        # Build an array of values with rows holding each response and columns
-        # as the results for each sentiment question defined by the keys
-        value_array = np.zeros((len(respondents_list), len(keys)))
+            analyst.time_series(['sentiment', 'company_satisfaction'],
+                                ['salary_base'], analyst.filter_for_working(),
+                                freq='7D', window=4)
 
-        submit_time = []
-        for i, respondent in enumerate(respondents_list):
-            value_array[i, :] = respondent.census['sentiment']['values']
-            submit_time.append(respondent.metadata['submit_time'])
+        `weights` are given for every respondent of the table, as returned
+        by `rake`.
+        """
 
-        res = dict()
+        table, idx = self.select_rows(respondents_list)
+        row_weights = select_weights(table, idx, weights)
 
-        res['keys']   = keys
-        res['values'] = value_array
-        res['submit_time'] = np.array(submit_time)
+        if isinstance(likert, str):
+            likert = [likert]
+        if isinstance(numeric, str):
+            numeric = [numeric]
 
-        # Summary statistics
-        res['mean']   = np.nanmean(value_array, axis=0)
-        res['stdev']  = np.nanstd(value_array, axis=0)
+        return timeseries.time_series(table, idx, likert, numeric, freq, window, row_weights)
 
-        return res
 
-    def summarize_census_skills_demand(self, respondents_list=None) -> dict:
+    def bootstrap_ci(self, field : str, statistic : str = None, respondents_list=None,
+                           by=None, level : float = 0.95,
+                           num_resamples : int = bootstrap.NUM_RESAMPLES,
+                           seed=bootstrap.SEED, processes : int = None):
         """
-        Return summary statistics for the skills demand question
+        Bootstrap confidence interval of the median or mean of a question (see
+        `src.bootstrap`), e.g., of the headline `salary_base_median` with
+
+            analyst.bootstrap_ci('salary_base')
+
+        Parameters
+        ----------
+        field : str
+            Numeric question, e.g., 'salary_base', or Likert block, e.g.,
+            'sentiment'; respondents who did not answer are left out, so the
+            "Company" and "Student" questions cover the same respondents as
+            the summaries
+        statistic : str, optional
+            'median' (default for numeric questions) or 'mean' (default for
+            Likert blocks, one value per question)
+        respondents_list : list, optional
+            Respondents to resample (all by default)
+        by : str or list of str, optional
+            Grouping keys (see `group_by`); one interval per group
+        level : float
+            Confidence level
+        num_resamples : int
+            Number of bootstrap resamples
+        seed : int
+            Seed of the random generator; the same seed gives the same intervals
+        processes : int, optional
+            Spread the groups over a pool of this many processes
+
+        Returns
+        -------
+        dict with 'n', 'estimate', 'lower' and 'upper', or a data frame with
+        one row per group if `by` is given
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        table, idx = self.select_rows(respondents_list)
+        column = filters.resolve_field(table, field)
 
-        skills_in_demand = []
-        vc_counter = dict()
+        if isinstance(column, LikertBlock):
+            values = likert.decode(column.answers[idx])
+            statistic = statistic or 'mean'
+        elif isinstance(column, NumericColumn):
+            values = column.values[idx].astype(float)
+            statistic = statistic or 'median'
+        else:
+            raise TypeError(f'{field} is neither a numeric question nor a Likert block')
 
-        for respondent in respondents_list:
-            utils.nanappend(skills_in_demand, respondent.census['skills_demand'])
-            utils.update_dict_counter(vc_counter, respondent.census['skills_value_chain'])
+        if by is None:
+            return bootstrap.confidence_interval(values, statistic, level, num_resamples, seed)
 
-        res = dict()
-        res['skills_in_demand'] = skills_in_demand
-        res['value_chain_in_demand'] = vc_counter
+        res, rows, groups, num_groups = groupby.group_rows(table, by, idx)
+        order  = np.argsort(groups, kind='stable')
+        bounds = np.searchsorted(groups[order], np.arange(1, num_groups))
+        segments = [values[rows[segment]] for segment in np.split(order, bounds)]
 
-        return res
+        intervals = bootstrap.segment_intervals(segments, statistic, level, num_resamples,
+                                                seed, processes)
+        for name in ['n', 'estimate', 'lower', 'upper']:
+            res[name] = [interval[name] for interval in intervals]
 
+        return pd.DataFrame(res)
 
-    def summarize_census_backgrounds(self, respondents_list=None) -> dict:
-        """
-        Return summary of respondent's backgrounds
+
+    def quantile_sketch(self, field : str, respondents_list=None, by=None,
+                              k : int = sketches.K):
         """
+        Mergeable quantile sketch of a numeric question (see `src.sketches`),
+        e.g., of 'salary_base', 'ideal_salary' or 'internship_hourly_pay'
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        The sketches of several exports, e.g., regional partner surveys, can
+        be merged and serialized, and give the medians and percentiles of the
+        combined answers within `rank_error`:
 
-        degree = {}
-        country = {}
-        state = {}
-        education = {}
-        ethnicity = {}
-        gender = {}
-        citizenship = {}
-        military = {}
-        employment = {}
-
-        for respondent in respondents_list:
-            utils.update_dict_counter(degree, respondent.census['degree'])
-            utils.update_dict_counter(country, respondent.census['country'])
-            utils.update_dict_counter(state, respondent.census['state'])
-            utils.update_dict_counter(education, respondent.census['education'])
-            utils.update_dict_counter(ethnicity, respondent.census['ethnicity'])
-            utils.update_dict_counter(gender, respondent.census['gender'])
-            utils.update_dict_counter(citizenship, respondent.census['citizenship'])
-            utils.update_dict_counter(military, respondent.census['military_status'])
-            utils.update_dict_counter(employment, respondent.census['employment_status'])
-
-        res = dict()
-        res['degree']           = degree
-        res['country']          = country
-        res['state']            = state
-        res['education']        = education
-        res['ethnicity']        = ethnicity
-        res['gender']           = gender
-        res['citizenship']      = citizenship
-        res['military_status']  = military
-        res['employment_status'] = employment
+            sketch = analyst.quantile_sketch('salary_base')
+            sketch.merge(other.quantile_sketch('salary_base'))
+            sketch.median(), sketch.percentiles([10, 90])
 
-        return res
+        Returns a `QuantileSketch`, or a data frame with one sketch per group
+        if `by` is given (see `group_by`)
+        """
 
+        table, idx = self.select_rows(respondents_list)
+        column = filters.resolve_field(table, field)
+        if not isinstance(column, NumericColumn):
+            raise TypeError(f'{field} is not a numeric question')
 
-    def summarize_company_satisfaction(self, respondents_list=None) -> dict:
+        values = column.values[idx].astype(float)
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        if by is None:
+            return sketches.QuantileSketch(k).update(values)
 
-        working_list = self.filter_for_working(respondents_list)
-        keys = working_list[0].company['company_satisfaction']['keys']
+        res, rows, groups, num_groups = groupby.group_rows(table, by, idx)
+        order  = np.argsort(groups, kind='stable')
+        bounds = np.searchsorted(groups[order], np.arange(1, num_groups))
+        res['sketch'] = [sketches.QuantileSketch(k).update(values[rows[segment]])
+                         for segment in np.split(order, bounds)]
 
-        # Build an array of values with rows holding each response and columns
-        # as the results for each sentiment question defined by the keys
-        value_array = np.zeros((len(working_list), len(keys)))
+        return pd.DataFrame(res)
 
-        submit_time = []
-        for i, respondent in enumerate(working_list):
-            value_array[i, :] = respondent.company['company_satisfaction']['values']
-            submit_time.append(respondent.metadata['submit_time'])
 
-        res = dict()
+    def term_sketch(self, field : str, respondents_list=None, by=None,
+                          ngrams=sketches.NGRAMS, capacity : int = sketches.CAPACITY,
+                          chunksize : int = sketches.CHUNKSIZE):
+        """
+        Mergeable sketch of the most frequent terms of a free-text question
+        (see `src.sketches`), e.g., of 'skills_demand', 'opinion_top_skills',
+        'opinion_barriers' or 'benefits_unique'
 
-        res['keys']   = keys
-        res['values'] = value_array
-        res['submit_time'] = np.array(submit_time)
+        Terms are the words and n-grams of the answers (single words and
+        pairs of words by default), counted once per respondent, `chunksize`
+        respondents at a time:
 
-        # Summary statistics
-        res['mean']   = np.nanmean(value_array, axis=0)
-        res['stdev']  = np.nanstd(value_array, axis=0)
+            analyst.term_sketch('opinion_barriers').top(10)
 
-        return res
+        Returns a `HeavyHitterSketch`, or a data frame with one sketch per
+        group if `by` is given (see `group_by`)
+        """
 
+        table, idx = self.select_rows(respondents_list)
+        column = filters.resolve_field(table, field)
 
-    def summarize_company_salary(self, respondents_list=None) -> dict:
-        """
-        Summarize salary info for those who completed the "Company" questions
-        """
+        if by is None:
+            return sketches.sketch_terms(column, idx, ngrams, capacity, chunksize)
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        res, rows, groups, num_groups = groupby.group_rows(table, by, idx)
+        order  = np.argsort(groups, kind='stable')
+        bounds = np.searchsorted(groups[order], np.arange(1, num_groups))
+        res['sketch'] = [sketches.sketch_terms(column, idx[rows[segment]], ngrams, capacity, chunksize)
+                         for segment in np.split(order, bounds)]
 
-        working_list = self.filter_for_working(respondents_list)
+        return pd.DataFrame(res)
 
-        salary_base_list = []
-        salary_comp_type_counter = dict()
-        num_raises_counter = dict()
-        num_bonuses_counter = dict()
 
-        for respondent in working_list:
-            salary_base_list.append(respondent.company['salary_base'])
-            utils.update_dict_counter(salary_comp_type_counter, respondent.company['salary_comp_types'])
-            utils.update_dict_counter(num_raises_counter, respondent.company['salary_num_raises'])
-            utils.update_dict_counter(num_bonuses_counter, respondent.company['salary_num_bonuses'])
+    def rake(self, targets : dict, respondents_list=None, **kwargs) -> np.ndarray:
+        """
+        Weights that rake the respondents to marginal targets (see
+        `src.weights`), e.g.,
+
+            weights = analyst.rake({'country': {'United States': 0.6, ...},
+                                    'gender' : {'Male': 0.7, 'Female': 0.3, ...}})
+            analyst.summarize_company_salary(weights=weights)
+
+        Every `summarize_*` method that takes a respondents list also takes
+        weights: counters add up weights instead of respondents, and Likert
+        means and medians are weighted. Keyword arguments are passed on to
+        `weights.rake`.
+
+        Returns
+        -------
+        np.ndarray with one weight per respondent of the table (0 for
+        respondents outside `respondents_list`)
+        """
 
-        res = dict()
-        res['salary_base_median'] = np.nanmedian(salary_base_list)
-        res['salary_base_std']    = np.nanstd(salary_base_list)
-        res['salary_base_list']   = np.array(salary_base_list)
-        res['salary_num_raises']  = num_raises_counter
-        res['salary_num_bonuses'] = num_bonuses_counter
-        res['salary_comp_types']  = utils.sort_dict(salary_comp_type_counter)
+        table, idx = self.select_rows(respondents_list)
+        if table is not self.table:
+            raise ValueError('The respondents must come from the current table')
 
-        return res
+        weights = np.zeros(len(table))
+        weights[idx] = weighting.rake(table, targets, idx, **kwargs)
+        return weights
 
 
-    def summarize_company_info(self, respondents_list=None) -> dict:
+    def filter_for_working(self, respondents_list=None) -> list:
         """
-        Summarize company info for those who completed the "Company" questions
+        From a given list of respondents, downselect to only those who are
+        working or used to work, and have completed the questions for this
+        section. We do not distinguish between those who are currently working
+        and those who have worked in the past but have since left voluntarily
+        or have been let go (we'll let the user handle this filter manually by
+        specifying the `respondents_list` optional argument).
+
+        Returns a filtered list of respondents
         """
 
         if respondents_list is None:
             respondents_list = self.respondents_list
 
-        working_list = self.filter_for_working(respondents_list)
-
-        num_years_with_company_list = []
-        company_stage_counter = dict()
-        company_vc_counter = dict()
-        company_country_counter = dict()
-        company_state_counter = dict()
-        num_days_in_office_list = []
-        company_headcount_counter = dict()
-        company_team_count_counter = dict()
-
-        for respondent in working_list:
-            num_years_with_company_list.append(respondent.company['company_years_with'])
-            utils.update_dict_counter(company_vc_counter, respondent.company['company_value_chain'])
-            utils.update_dict_counter(company_stage_counter, respondent.company['company_stage'])
-            utils.update_dict_counter(company_country_counter, respondent.company['company_country'])
-            utils.update_dict_counter(company_state_counter, respondent.company['company_state'])
-            num_days_in_office_list.append(respondent.company['company_days_in_office'])
-            utils.update_dict_counter(company_headcount_counter, respondent.company['company_headcount'])
-            utils.update_dict_counter(company_team_count_counter, respondent.company['company_team_count'])
-
-        res = dict()
-        res['num_years_with_company_median'] = np.nanmedian(num_years_with_company_list)
-        res['num_years_with_company_list'] = np.array(num_years_with_company_list)
-        res['company_value_chain'] = company_vc_counter
-        res['company_stage'] = company_stage_counter
-        res['company_country'] = company_country_counter
-        res['company_state'] = company_state_counter
-        res['num_days_in_office_list'] = np.array(num_days_in_office_list)
-        res['company_headcount'] = company_headcount_counter
-        res['company_team_count'] = company_team_count_counter
+        table, idx = self.select_rows(respondents_list)
+        mask = table.working_mask()[idx]
 
-        return res
+        working_list = [respondents_list[i] for i in np.flatnonzero(mask)]
+
+        return working_list
 
 
-    def summarize_company_role(self, respondents_list=None) -> dict:
+    def select_working_rows(self, respondents_list=None) -> tuple:
         """
-        Summarize the role of respondents who completed the "Company" questions
+        Table rows of the respondents who completed the "Company" questions
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        table, idx = self.select_rows(respondents_list)
+        return table, idx[table.working_mask()[idx]]
 
-        working_list = self.filter_for_working(respondents_list)
-
-        role_title_list = []
-        role_role_counter = dict()
-        role_level_counter = dict()
-        role_why_choose_counter = dict()
-        role_prev_industries_counter = dict()
-        role_prev_role_list = []
-
-        for respondent in working_list:
-            utils.nanappend(role_title_list, respondent.company['role_title'])
-            utils.update_dict_counter(role_role_counter, respondent.company['role_role'])
-            utils.update_dict_counter(role_level_counter, respondent.company['role_level'])
-            utils.update_dict_counter(role_why_choose_counter, respondent.company['role_why_choose'])
-            utils.update_dict_counter(role_prev_industries_counter, respondent.company['role_prev_industries'])
-            utils.nanappend(role_prev_role_list, respondent.company['role_prev_role'])
-
-        res = dict()
-        res['role_title_list'] = role_title_list
-        res['role_role'] = role_role_counter
-        res['role_level'] = role_level_counter
-        res['role_why_choose'] = role_why_choose_counter
-        res['role_prev_industries'] = role_prev_industries_counter
-        res['role_prev_role_list'] = role_prev_role_list
 
-        return res
+    def select_student_rows(self) -> tuple:
+        """
+        Table rows of the students who completed the "Student" questions
+        """
+
+        return self.table, np.flatnonzero(self.table.student_mask())
 
 
-    def summarize_company_skills(self, respondents_list=None) -> dict:
+    @memo.memoized
+    def report(self, respondents_list=None, weights=None) -> dict:
         """
-        Summarize the questions about job skills from those who completed the
-        "Company" questions
+        All of the `summarize_*` summaries at once (see `src.summaries`)
+
+        The respondents, the working and student populations and the weights
+        are selected once and shared by every summary, so the full report
+        costs about as much as one summary of each column.
+
+        Returns
+        -------
+        dict from summary name (e.g., 'company_salary' or 'stats') to the
+        summary, the same as returned by the `summarize_*` method
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        table, idx = self.select_rows(respondents_list)
 
-        working_list = self.filter_for_working(respondents_list)
-
-        barriers_to_talent_list = []
-        hardest_to_fill_positions_list = []
-        top_skills_for_success_list = []
-        skills_how_to_improve_counter = dict()
-        skills_how_was_trained_counter = dict()
-        num_previous_internships_counter = dict()
-
-        for respondent in working_list:
-            utils.nanappend(barriers_to_talent_list, respondent.company['opinion_barriers'])
-            utils.nanappend(hardest_to_fill_positions_list, respondent.company['opinion_hardest_to_fill'])
-            utils.nanappend(top_skills_for_success_list, respondent.company['opinion_top_skills'])
-            utils.update_dict_counter(skills_how_to_improve_counter, respondent.company['skills_how_to_improve'])
-            utils.update_dict_counter(skills_how_was_trained_counter, respondent.company['skills_how_was_trained'])
-            utils.update_dict_counter(num_previous_internships_counter, respondent.company['skills_num_internships'])
-
-        # Proces the responses about skills preparedness
-        keys = working_list[0].company['skills_preparedness']['keys']
-        value_array = np.zeros((len(working_list), len(keys)))
-        for i, respondent in enumerate(working_list):
-            value_array[i, :] = respondent.company['skills_preparedness']['values']
-        ress = dict()
-        ress['keys']   = keys
-        ress['values'] = value_array
-        ress['mean']   = np.nanmean(value_array, axis=0)
-        ress['stdev']  = np.nanstd(value_array, axis=0)
-
-        # Package the outputs
-        res = dict()
-        res['barriers_to_talent_list'] = barriers_to_talent_list
-        res['hardest_to_fill_positions_list'] = hardest_to_fill_positions_list
-        res['top_skills_for_success_list'] = top_skills_for_success_list
-        res['skills_how_to_improve'] = skills_how_to_improve_counter
-        res['skills_how_was_trained'] = skills_how_was_trained_counter
-        res['num_previous_internships'] = num_previous_internships_counter
-        res['skills_preparedness_sentiment'] = ress
+        populations = dict()
+        populations['all']     = table, idx
+        populations['working'] = table, idx[table.working_mask()[idx]]
+        populations['student'] = self.select_student_rows()
 
+        res = summaries.report(populations, weights)
+        res['stats'] = summaries.stats(self.table)
         return res
 
 
-    def summarize_company_retention(self, respondents_list=None) -> dict:
+    def segment_report(self, by, names=None, respondents_list=None, weights=None,
+                             processes : int = None) -> pd.DataFrame:
         """
-        Summarize the questions about retention from those who completed the
-        "Company" section
+        Summaries of every segment of the respondents, e.g., of each
+        country x degree x employment status combination, optionally spread
+        over a pool of processes (see `src.parallel`)
+
+        Within a segment, the company summaries cover its working respondents
+        and the student summaries its students, unlike `summarize_student_*`
+        which always cover all students.
+
+        Parameters
+        ----------
+        by : str or list of str
+            Grouping keys (see `group_by`)
+        names : list of str, optional
+            Summaries to compute, e.g., ['company_salary'] (all of them by
+            default; see `summaries.SUMMARIES`)
+        respondents_list : list, optional
+            Respondents to segment (all by default)
+        weights : np.ndarray, optional
+            Weight of every respondent of the table, as returned by `rake`
+        processes : int, optional
+            Number of worker processes; serial by default, with the same results
+
+        Returns
+        -------
+        pd.DataFrame with one row per non-empty segment: a column per grouping
+        key, 'num_respondents', and a column per summary
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        names = list(summaries.SUMMARIES if names is None else names)
 
-        working_list = self.filter_for_working(respondents_list)
-
-        retention_factors_counter = dict()
-        retention_is_on_market_counter = dict()
-        retention_misc_list = []
-        retention_num_employer_changes = dict()
-
-        for respondent in working_list:
-            utils.update_dict_counter(retention_factors_counter, respondent.company['retention_factors'])
-            utils.update_dict_counter(retention_is_on_market_counter, respondent.company['retention_is_on_market'])
-            utils.nanappend(retention_misc_list, respondent.company['retention_misc'])
-            utils.update_dict_counter(retention_num_employer_changes, respondent.company['retention_num_employer_changes'])
-
-        keys = working_list[0].company['retention_sentiment']['keys']
-        value_array = np.zeros((len(working_list), len(keys)))
-        for i, respondent in enumerate(working_list):
-            value_array[i, :] = respondent.company['retention_sentiment']['values']
-        ress = dict()
-        ress['keys']   = keys
-        ress['values'] = value_array
-        ress['mean']   = np.nanmean(value_array, axis=0)
-        ress['stdev']  = np.nanstd(value_array, axis=0)
-
-        res = dict()
-        res['retention_factors'] = retention_factors_counter
-        res['retention_is_on_market'] = retention_is_on_market_counter
-        res['retention_misc_list'] = retention_misc_list
-        res['retention_num_employer_changes'] = retention_num_employer_changes
-        res['retention_sentiment'] = ress
+        table, idx = self.select_rows(respondents_list)
+        res, rows, groups, num_groups = groupby.group_rows(table, by, idx)
 
-        return res
+        is_working = table.working_mask()
+        is_student = table.student_mask()
 
+        order  = np.argsort(groups, kind='stable')
+        bounds = np.searchsorted(groups[order], np.arange(1, num_groups))
 
-    def summarize_company_benefits(self, respondents_list=None) -> dict:
+        jobs = []
+        for segment in np.split(order, bounds):
+            segment_idx = idx[rows[segment]]
+            populations = {'all'    : segment_idx,
+                           'working': segment_idx[is_working[segment_idx]],
+                           'student': segment_idx[is_student[segment_idx]]}
+            jobs.append((names, populations))
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        reports = parallel.run_jobs(table, jobs, weights, processes)
 
-        working_list = self.filter_for_working(respondents_list)
-
-        entitlements = dict()
-        parental_leave_weeks = dict()
-        pto_weeks = dict()
-        sick_leave_days = dict()
-        unique_benefits_list = []
-
-        for respondent in working_list:
-            utils.update_dict_counter(entitlements, respondent.company['benefits_entitlements'])
-            utils.update_dict_counter(parental_leave_weeks, respondent.company['benefits_parental_leave_weeks'])
-            utils.update_dict_counter(pto_weeks, respondent.company['benefits_pto_weeks'])
-            utils.update_dict_counter(sick_leave_days, respondent.company['benefits_sick_leave_days'])
-            utils.nanappend(unique_benefits_list, respondent.company['benefits_unique'])
-
-        # Process the benefits proprities survey
-        keys = working_list[0].company['benefits_priorities']['keys']
-        value_array = np.zeros((len(working_list), len(keys)))
-        for i, respondent in enumerate(working_list):
-            value_array[i, :] = respondent.company['benefits_priorities']['values']
-        ress = dict()
-        ress['keys']   = keys
-        ress['values'] = value_array
-        ress['mean']   = np.nanmean(value_array, axis=0)
-        ress['stdev']  = np.nanstd(value_array, axis=0)
-
-        # Package the outputs
-        res = dict()
-        res['entitlements'] = entitlements
-        res['parental_leave_weeks'] = parental_leave_weeks
-        res['pto_weeks'] = pto_weeks
-        res['sick_leave_days'] = sick_leave_days
-        res['unique_benefits_list'] = unique_benefits_list
-        res['benefits_priorities'] = ress
+        res['num_respondents'] = np.bincount(groups, minlength=num_groups)
+        for name in names:
+            res[name] = [report[name] for report in reports]
 
-        return res
+        return pd.DataFrame(res)
 
 
-    def summarize_stats(self) -> dict:
+    @memo.memoized
+    def summarize_likert(self, key : str, respondents_list=None) -> dict:
         """
-        Return summary statistics of the respondents:
-        - Number of survey takers
-        - Median time taken for each subgroup
+        Statistics of each question of a Likert block, e.g., 'sentiment' or
+        'company.retention_sentiment': count, mean, stdev, distribution of the
+        answers on the 1-5 scale, top/bottom-box rates and percentiles (see
+        `src.likert`)
         """
 
-        # Initialize dictionary of counters
-        summary = defaultdict(lambda: 0)
+        table, idx = self.select_rows(respondents_list)
+        return filters.resolve_field(table, key).summarize(idx)
 
-        # Initialize lists for tabulating completion times within each subgroup
-        working_mins = []
-        working_completed_mins = []
-        student_mins = []
-        student_completed_mins = []
-        unemployed_mins = []
-        unemployed_completed_mins = []
 
-        for resp in self.respondents_list:
+    @memo.memoized
+    def summarize_census_sentiment(self, respondents_list=None, weights=None) -> dict:
+        """
+        Return summary statistics for the census sentiment question
+        """
 
-            summary['num_total'] += 1
+        table, idx = self.select_rows(respondents_list)
+        return summaries.census_sentiment(table, idx, select_weights(table, idx, weights))
 
-            if resp.is_working:
-                summary['num_working'] += 1
 
-                if resp.is_working_and_completed_all_questions:
-                    summary['num_working_and_completed_all_questions'] += 1
-                    working_completed_mins.append(resp.metadata['duration_mins'])
-                else:
-                    working_mins.append(resp.metadata['duration_mins'])
+    @memo.memoized
+    def summarize_census_skills_demand(self, respondents_list=None, weights=None) -> dict:
+        """
+        Return summary statistics for the skills demand question
+        """
 
-            if resp.is_student:
-                summary['num_student'] += 1
+        table, idx = self.select_rows(respondents_list)
+        return summaries.census_skills_demand(table, idx, select_weights(table, idx, weights))
 
-                if resp.is_student_and_completed_all_questions:
-                    summary['num_student_and_completed_all_questions'] += 1
-                    student_completed_mins.append(resp.metadata['duration_mins'])
-                else:
-                    student_mins.append(resp.metadata['duration_mins'])
 
-            if resp.is_unemployed:
-                summary['num_unemployed'] += 1
+    @memo.memoized
+    def summarize_census_backgrounds(self, respondents_list=None, weights=None) -> dict:
+        """
+        Return summary of respondent's backgrounds
+        """
 
-                if resp.is_unemployed_and_completed_all_questions:
-                    unemployed_completed_mins.append(resp.metadata['duration_mins'])
-                    summary['num_unemployed_and_completed_all_questions'] += 1
-                else:
-                    unemployed_mins.append(resp.metadata['duration_mins'])
+        table, idx = self.select_rows(respondents_list)
+        return summaries.census_backgrounds(table, idx, select_weights(table, idx, weights))
 
-        # Assign duration metrics and list of raw values
-        summary['mins_working_median'] = np.median(working_mins)
-        summary['mins_working_completed_median'] = np.median(working_completed_mins)
-        summary['mins_student_median'] = np.median(student_mins)
-        summary['mins_student_completed_median'] = np.median(student_completed_mins)
-        summary['mins_unemployed_median'] = np.median(unemployed_mins)
-        summary['mins_unemployed_completed_median'] = np.median(unemployed_completed_mins)
 
-        summary['mins_working_list'] = working_mins
-        summary['mins_working_completed_list'] = working_completed_mins
-        summary['mins_student_list'] = student_mins
-        summary['mins_student_completed_list'] = student_completed_mins
-        summary['mins_unemployed_list'] = unemployed_mins
-        summary['mins_unemployed_completed_list'] = unemployed_completed_mins
+    @memo.memoized
+    def summarize_company_satisfaction(self, respondents_list=None, weights=None) -> dict:
 
-        # For plotting number of response over time
-        # Sort the response times in ascending order and get corresponding count
-        sorted_indices = np.argsort(pd.to_datetime(self.df_gsheet['Submitted At']).values)
-        summary['response_by_time_datetime'] = pd.to_datetime(self.df_gsheet['Submitted At']).values[sorted_indices]
-        summary['response_by_time_num'] = np.arange(1, self.df_gsheet.shape[0] + 1)
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_satisfaction(table, idx, select_weights(table, idx, weights))
 
-        return summary
 
+    @memo.memoized
+    def summarize_company_salary(self, respondents_list=None, weights=None) -> dict:
+        """
+        Summarize salary info for those who completed the "Company" questions
+        """
 
-    def summarize_student_sentiment(self, respondents_list=None) -> dict:
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_salary(table, idx, select_weights(table, idx, weights))
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
 
-        student_list = self.filter_respondents_on(is_student=True,
-                                                  is_completed_all_questions=True)
+    @memo.memoized
+    def summarize_company_info(self, respondents_list=None, weights=None) -> dict:
+        """
+        Summarize company info for those who completed the "Company" questions
+        """
 
-        keys = student_list[0].student['student_sentiment']['keys']
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_info(table, idx, select_weights(table, idx, weights))
 
-        # Build an array of values with rows holding each response and columns
-        # as the results for each sentiment question defined by the keys
-        value_array = np.zeros((len(student_list), len(keys)))
 
-        submit_time = []
-        for i, respondent in enumerate(student_list):
-            value_array[i, :] = respondent.student['student_sentiment']['values']
-            submit_time.append(respondent.metadata['submit_time'])
+    @memo.memoized
+    def summarize_company_role(self, respondents_list=None, weights=None) -> dict:
+        """
+        Summarize the role of respondents who completed the "Company" questions
+        """
 
-        res = dict()
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_role(table, idx, select_weights(table, idx, weights))
 
-        res['keys']   = keys
-        res['values'] = value_array
-        res['submit_time'] = np.array(submit_time)
 
-        # Summary statistics
-        res['mean']   = np.nanmean(value_array, axis=0)
-        res['stdev']  = np.nanstd(value_array, axis=0)
+    @memo.memoized
+    def summarize_company_skills(self, respondents_list=None, weights=None) -> dict:
+        """
+        Summarize the questions about job skills from those who completed the
+        "Company" questions
+        """
 
-        return res
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_skills(table, idx, select_weights(table, idx, weights))
 
 
-    def summarize_student_backgrounds(self, respondents_list=None) -> dict:
+    @memo.memoized
+    def summarize_company_retention(self, respondents_list=None, weights=None) -> dict:
         """
-        Return summary of student's backgrounds
+        Summarize the questions about retention from those who completed the
+        "Company" section
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_retention(table, idx, select_weights(table, idx, weights))
 
-        student_list = self.filter_respondents_on(is_student=True,
-                                                  is_completed_all_questions=True)
 
-        degree = {}
-        country = {}
-        state = {}
-        education = {}
+    @memo.memoized
+    def summarize_company_benefits(self, respondents_list=None, weights=None) -> dict:
 
-        for respondent in student_list:
-            utils.update_dict_counter(degree, respondent.student['degree'])
-            utils.update_dict_counter(country, respondent.student['country'])
-            utils.update_dict_counter(state, respondent.student['state'])
-            utils.update_dict_counter(education, respondent.student['education'])
+        table, idx = self.select_working_rows(respondents_list)
+        return summaries.company_benefits(table, idx, select_weights(table, idx, weights))
 
-        res = dict()
-        res['degree']           = degree
-        res['country']          = country
-        res['state']            = state
-        res['education']        = education
-
-        return res
 
-
-    def summarize_student_ideal(self, respondents_list=None) -> dict:
+    @memo.memoized
+    def summarize_stats(self) -> dict:
         """
-        Summarize students' ideal career for those who completed the "Student" questions
+        Return summary statistics of the respondents:
+        - Number of survey takers
+        - Median time taken for each subgroup
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        return summaries.stats(self.table)
 
-        student_list = self.filter_respondents_on(is_student=True,is_completed_all_questions=True)
 
-        ideal_job_title_list = []
-        ideal_vc_counter = dict()
-        ideal_job_aspects_counter = dict()
-        ideal_salary_list = []
+    @memo.memoized
+    def summarize_student_sentiment(self, respondents_list=None, weights=None) -> dict:
 
-        for respondent in student_list:
-            utils.nanappend(ideal_job_title_list, respondent.student['ideal_job_title'])
-            utils.update_dict_counter(ideal_vc_counter, respondent.student['ideal_value_chain'])
-            utils.update_dict_counter(ideal_job_aspects_counter, respondent.student['ideal_job_aspects'])
-            utils.nanappend(ideal_salary_list, respondent.student['ideal_salary'])
+        table, idx = self.select_student_rows()
+        return summaries.student_sentiment(table, idx, select_weights(table, idx, weights))
 
-        res = dict()
-        res['ideal_job_title_list'] = ideal_job_title_list
-        res['ideal_value_chain'] = ideal_vc_counter
-        res['ideal_job_aspects'] = ideal_job_aspects_counter
-        res['ideal_salary_list'] = np.array(ideal_salary_list)
-        res['ideal_salary_median'] = np.nanmedian(ideal_salary_list)
 
-        return res
+    @memo.memoized
+    def summarize_student_backgrounds(self, respondents_list=None, weights=None) -> dict:
+        """
+        Return summary of student's backgrounds
+        """
+
+        table, idx = self.select_student_rows()
+        return summaries.student_backgrounds(table, idx, select_weights(table, idx, weights))
 
 
-    def summarize_student_internship(self, respondents_list=None) -> dict:
+    @memo.memoized
+    def summarize_student_ideal(self, respondents_list=None, weights=None) -> dict:
         """
-        Summarize students' internship experience for those who completed the "Student" questions
+        Summarize students' ideal career for those who completed the "Student" questions
         """
 
-        if respondents_list is None:
-            respondents_list = self.respondents_list
+        table, idx = self.select_student_rows()
+        return summaries.student_ideal(table, idx, select_weights(table, idx, weights))
 
-        student_list = self.filter_respondents_on(is_student=True,
-                                                  is_completed_all_questions=True)
-
-        num_internships_counter = dict()
-        internship_vc_counter = dict()
-        internship_role_counter = dict()
-        internship_top_skills_list = []
-        internship_skills_wish_learned_list = []
-        internship_skills_unprepared_list = []
-        internship_hourly_pay_list = []
-        internship_hours_per_week_list = []
-
-        # to be implemented with LLM: vc, role, skills
-
-        for respondent in student_list:
-            utils.update_dict_counter(num_internships_counter, respondent.student['num_internships'])
-            utils.update_dict_counter(internship_vc_counter, respondent.student['internship_value_chain'])
-            utils.update_dict_counter(internship_role_counter, respondent.student['internship_role'])
-            utils.nanappend(internship_top_skills_list, respondent.student['internship_top_skills'])
-            utils.nanappend(internship_skills_wish_learned_list, respondent.student['internship_skills_wish_learned'])
-            utils.nanappend(internship_skills_unprepared_list, respondent.student['internship_skills_unprepared'])
-            utils.nanappend(internship_hourly_pay_list, respondent.student['internship_hourly_pay'])
-            utils.nanappend(internship_hours_per_week_list, respondent.student['internship_hours_per_week'])
-
-        res = dict()
-        res['num_internships'] = num_internships_counter
-        res['internship_value_chain'] = internship_vc_counter
-        res['internship_role'] = internship_role_counter
-        res['internship_top_skills_list'] = internship_top_skills_list
-        res['internship_skills_wish_learned_list'] = internship_skills_wish_learned_list
-        res['internship_skills_unprepared_list'] = internship_skills_unprepared_list
-        res['internship_hourly_pay_list'] = np.array(internship_hourly_pay_list)
-        res['internship_hours_per_week_list'] = np.array(internship_hours_per_week_list)
 
-        return res
+    @memo.memoized
+    def summarize_student_internship(self, respondents_list=None, weights=None) -> dict:
+        """
+        Summarize students' internship experience for those who completed the "Student" questions
+        """
+
+        table, idx = self.select_student_rows()
+        return summaries.student_internship(table, idx, select_weights(table, idx, weights))
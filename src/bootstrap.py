@@ -0,0 +1,135 @@
+"""
+Bootstrap confidence intervals of the headline statistics.
+
+The respondents of a segment are resampled with replacement in batches: each
+batch is one (resamples x respondents) matrix of row indices drawn at once,
+and the statistic of every resample is computed along the rows of the
+gathered values in one vectorized call (`np.median`, `np.mean`, or their
+NaN-aware versions for Likert blocks). The interval is read off the
+percentiles of the resampled statistics.
+
+Every segment draws from its own random generator, spawned from one seed in
+the order of the segments, so the intervals are reproducible and do not
+depend on whether the segments are computed one after the other or spread
+over a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Default number of resamples and seed
+NUM_RESAMPLES = 2000
+SEED = 0
+
+# Upper bound on the number of values gathered per batch of resamples
+BATCH_VALUES = 2 ** 22
+
+STATISTICS = {'median': (np.median, np.nanmedian),
+              'mean'  : (np.mean, np.nanmean)}
+
+
+def resample(values : np.ndarray, statistic : str, num_resamples : int,
+             rng : np.random.Generator) -> np.ndarray:
+    """
+    Statistic of `num_resamples` resamples of `values`
+
+    `values` is either 1D (one value per respondent, without NaN) or 2D (one
+    row of Likert answers per respondent, NaN when missing), in which case
+    the statistic is computed for each question.
+    """
+
+    func = STATISTICS[statistic][values.ndim - 1]
+    n = len(values)
+    width = int(np.prod(values.shape[1:], dtype=np.int64))
+
+    batch_size = max(1, BATCH_VALUES // max(n * width, 1))
+
+    res = []
+    for start in range(0, num_resamples, batch_size):
+        size = min(batch_size, num_resamples - start)
+        idx  = rng.integers(0, n, size=(size, n))
+        res.append(func(values[idx], axis=1))
+
+    return np.concatenate(res)
+
+
+def confidence_interval(values, statistic : str = 'median', level : float = 0.95,
+                        num_resamples : int = NUM_RESAMPLES, seed=SEED) -> dict:
+    """
+    Percentile bootstrap confidence interval of a statistic
+
+    Parameters
+    ----------
+    values : array
+        One value per respondent (NaN values are dropped), or one row of
+        Likert answers per respondent
+    statistic : str
+        'median' or 'mean'
+    level : float
+        Confidence level of the interval
+    num_resamples : int
+        Number of bootstrap resamples
+    seed : int, np.random.SeedSequence or np.random.Generator
+        Seed of the random generator
+
+    Returns
+    -------
+    dict with the 'estimate' on the values themselves, the 'lower' and
+    'upper' bounds of the interval and the number of values 'n'
+    """
+
+    if statistic not in STATISTICS:
+        raise ValueError(f'Unknown statistic: {statistic}')
+
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[~np.isnan(values)]
+    else:
+        values = values[~np.isnan(values).all(axis=1)]
+
+    res = dict()
+    res['n'] = len(values)
+
+    if len(values) == 0:
+        shape = values.shape[1:]
+        res['estimate'] = res['lower'] = res['upper'] = np.full(shape, np.nan)[()]
+        return res
+
+    rng = np.random.default_rng(seed)
+    resamples = resample(values, statistic, num_resamples, rng)
+
+    alpha = (1 - level) / 2
+    res['estimate'] = STATISTICS[statistic][values.ndim - 1](values, axis=0)
+    res['lower'], res['upper'] = np.percentile(resamples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+
+    return res
+
+
+def _segment_interval(task):
+    values, statistic, level, num_resamples, seed = task
+    return confidence_interval(values, statistic, level, num_resamples, seed)
+
+
+def segment_intervals(segments : list, statistic : str = 'median', level : float = 0.95,
+                      num_resamples : int = NUM_RESAMPLES, seed=SEED,
+                      processes : int = None) -> list:
+    """
+    Confidence intervals of a statistic in each of a list of segments
+
+    Each segment gets its own random generator spawned from `seed`, in order.
+    With `processes` > 1, the segments are spread over a pool of that many
+    processes; the results are the same as computed serially.
+
+    Returns a list of dictionaries as returned by `confidence_interval`
+    """
+
+    seeds = np.random.SeedSequence(seed).spawn(len(segments))
+    tasks = [(values, statistic, level, num_resamples, segment_seed)
+             for values, segment_seed in zip(segments, seeds)]
+
+    if processes is None or processes <= 1 or len(tasks) <= 1:
+        return [_segment_interval(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_segment_interval, tasks))
@@ -0,0 +1,104 @@
+"""
+On-disk cache of the parsed census responses.
+
+The parsed `RespondentTable` is saved as an uncompressed `.npz` file, keyed on
+a fingerprint of the raw exports and of the parsing code. Changing either an
+export or the parser (`src/parser.py`, `src/schema.py`, `src/table.py`,
+`src/likert.py`, `src/zipcodes.py` or `PARSER_VERSION`) gives a new
+fingerprint, so stale caches are never read.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+
+import numpy as np
+
+import src.likert as likert
+import src.parser as parser
+import src.schema as schema
+import src.table as table
+import src.zipcodes as zipcodes
+from src.table import RespondentTable
+
+CACHE_DIR = 'data/cache/'
+
+# Modules whose source code is part of the fingerprint
+PARSER_MODULES = (parser, schema, table, likert, zipcodes)
+
+
+def fingerprint(*files) -> str:
+    """
+    Hash the contents of the raw export files together with the parser
+    version and the source code of the parser
+    """
+
+    digest = hashlib.sha256()
+    digest.update(f'parser-version:{parser.PARSER_VERSION}'.encode())
+
+    for module in PARSER_MODULES:
+        digest.update(pathlib.Path(module.__file__).read_bytes())
+
+    for file in files:
+        digest.update(pathlib.Path(file).read_bytes())
+
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir : str, key : str) -> pathlib.Path:
+    return pathlib.Path(cache_dir) / f'census_{key[:32]}.npz'
+
+
+def save(cache_dir : str, key : str, respondent_table : RespondentTable, extras : dict = None):
+    """
+    Save a parsed table to the cache
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache files
+    key : str
+        Fingerprint of the raw exports (see `fingerprint`)
+    respondent_table : RespondentTable
+        Parsed responses
+    extras : dict, optional
+        JSON-serializable information to keep with the table
+    """
+
+    arrays, manifest = respondent_table.to_arrays()
+    manifest['key']    = key
+    manifest['extras'] = extras or dict()
+
+    path = cache_path(cache_dir, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first so that an interrupted save never
+    # leaves a truncated cache behind
+    tmp_path = path.with_suffix('.tmp.npz')
+    np.savez(tmp_path, __manifest__=np.array(json.dumps(manifest)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load(cache_dir : str, key : str):
+    """
+    Load a parsed table from the cache
+
+    Returns
+    -------
+    (RespondentTable, extras) or None if there is no cache for this key
+    """
+
+    path = cache_path(cache_dir, key)
+    if not path.exists():
+        return None
+
+    with np.load(path) as arrays:
+
+        manifest = json.loads(arrays['__manifest__'].item())
+        if manifest['key'] != key:
+            return None
+
+        respondent_table = RespondentTable.from_arrays(arrays, manifest)
+
+    return respondent_table, manifest['extras']
@@ -0,0 +1,531 @@
+"""
+Filter expressions over the columns of a `RespondentTable`.
+
+Expressions are built either from Python operators on fields,
+
+    senior = field('role_level').isin(['Senior', 'Expert', 'Director/VP'])
+    expr   = field('is_working') & senior & (field('salary_base') > 120000)
+
+or parsed from a string with the same meaning,
+
+    expr = parse("is_working and role_level in ['Senior', 'Expert', 'Director/VP']"
+                 " and salary_base > 120000")
+
+and evaluate to a boolean mask over the rows of a table with `expr.mask(table)`.
+Each predicate is one vectorized operation on a column: categorical answers
+are compared by their integer codes and multi-select answers through their
+(row, option code) pairs.
+
+Supported predicates:
+
+- status flags, e.g., `is_student` or `is_student == False`
+- `==`, `!=`, `in`, `not in` on single-choice and text answers, where
+  `'CA' in state` is the same as `state == 'CA'`
+- `<`, `<=`, `>`, `>=` on single-choice answers that are numbers stored as
+  text, e.g., `num_internships >= 2` (other answers, like '5+', never match)
+- `==`, `!=`, `<`, `<=`, `>`, `>=` and ranges (`120000 <= salary_base < 200000`)
+  on numeric answers and timestamps
+- `'Asian' in ethnicity`, `contains_any(ethnicity, [...])` and
+  `contains_all(ethnicity, [...])` on multi-select answers
+- `isna(field)` and `notna(field)`
+- `and`, `or`, `not` (`&`, `|`, `~` when built with operators)
+
+Fields are named by their key, e.g., 'salary_base', or by section and key,
+e.g., 'company.salary_base', for keys found in more than one section; the
+submit time of the Google Sheet is 'submitted_at'.
+
+Missing answers never match a comparison, nor its negation: `not` is pushed
+down to the predicates (`not (a or b)` is `not a and not b`), and a negated
+predicate only matches the rows that answered its field, e.g.,
+`not salary_base < 100000` matches the salaries of 100000 or more. Use
+`isna(field)` to select the missing answers.
+"""
+
+import ast
+import operator
+
+import numpy as np
+import pandas as pd
+
+from src.table import (CategoricalColumn, DatetimeColumn, LikertBlock,
+                       MultiSelectColumn, NumericColumn)
+
+# Sections searched, in order, for a field named by its key only
+FIELD_SECTIONS = ('census', 'company', 'student', 'metadata')
+
+COMPARISONS = {'==': operator.eq,
+               '!=': operator.ne,
+               '<' : operator.lt,
+               '<=': operator.le,
+               '>' : operator.gt,
+               '>=': operator.ge}
+
+
+def resolve_field(table, name : str):
+    """
+    Return the status flag array or the column of a table named `name`
+    """
+
+    if name in table.flags:
+        return table.flags[name]
+
+    if name == 'submitted_at' and table.submitted_at is not None:
+        return table.submitted_at
+
+    if '.' in name:
+        section, key = name.split('.', 1)
+        columns = getattr(table, section, None)
+        if section in FIELD_SECTIONS and columns is not None and key in columns:
+            return columns[key]
+        raise KeyError(f'Unknown field: {name}')
+
+    for section in FIELD_SECTIONS:
+        columns = getattr(table, section)
+        if columns is not None and name in columns:
+            return columns[name]
+
+    raise KeyError(f'Unknown field: {name}')
+
+
+class Expr:
+    """
+    Base class of filter expressions
+    """
+
+    def mask(self, table) -> np.ndarray:
+        raise NotImplementedError
+
+    def negated_mask(self, table) -> np.ndarray:
+        """
+        Mask of `Not(self)`, which leaves out the missing answers
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class And(Expr):
+
+    def __init__(self, *operands):
+        self.operands = operands
+
+    def mask(self, table):
+        mask = np.ones(len(table), dtype=bool)
+        for operand in self.operands:
+            mask &= operand.mask(table)
+        return mask
+
+    def negated_mask(self, table):
+        return Or(*map(Not, self.operands)).mask(table)
+
+    def __repr__(self):
+        return '(' + ' & '.join(map(repr, self.operands)) + ')'
+
+
+class Or(Expr):
+
+    def __init__(self, *operands):
+        self.operands = operands
+
+    def mask(self, table):
+        mask = np.zeros(len(table), dtype=bool)
+        for operand in self.operands:
+            mask |= operand.mask(table)
+        return mask
+
+    def negated_mask(self, table):
+        return And(*map(Not, self.operands)).mask(table)
+
+    def __repr__(self):
+        return '(' + ' | '.join(map(repr, self.operands)) + ')'
+
+
+class Not(Expr):
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def mask(self, table):
+        return self.operand.negated_mask(table)
+
+    def negated_mask(self, table):
+        return self.operand.mask(table)
+
+    def __repr__(self):
+        return f'~{self.operand!r}'
+
+
+class Predicate(Expr):
+    """
+    Test on the column of one field
+    """
+
+    def __init__(self, name : str, op : str, value=None):
+
+        self.name  = name
+        self.op    = op
+        self.value = value
+
+    def __repr__(self):
+        return f'{self.op}({self.name}, {self.value!r})'
+
+    def mask(self, table):
+
+        column = resolve_field(table, self.name)
+
+        if isinstance(column, np.ndarray):
+            return self._flag(column)
+
+        if isinstance(column, CategoricalColumn):
+            return self._categorical(column)
+        if isinstance(column, MultiSelectColumn):
+            return self._multiselect(column)
+        if isinstance(column, (NumericColumn, DatetimeColumn)):
+            return self._numeric(column)
+        if isinstance(column, LikertBlock):
+            raise TypeError(f'{self.name} is a Likert block; filter on numeric answers instead')
+
+        raise TypeError(f'Cannot filter on {self.name}')
+
+    def negated_mask(self, table):
+
+        mask = ~self.mask(table)
+        if self.op in ('flag', 'isna', 'notna'):
+            return mask
+
+        # Rows that answered the field
+        column = resolve_field(table, self.name)
+        if isinstance(column, CategoricalColumn):
+            return mask & (column.codes >= 0)
+        if isinstance(column, MultiSelectColumn):
+            return mask & (column.lengths() > 0)
+        if isinstance(column, (NumericColumn, DatetimeColumn)):
+            return mask & ~pd.isna(column.values)
+        return mask
+
+    def _flag(self, column):
+
+        column = np.asarray(column, dtype=bool)
+
+        if self.op == 'flag':
+            return column
+        if self.op in ('==', '!=') and isinstance(self.value, (bool, np.bool_)):
+            return column == self.value if self.op == '==' else column != self.value
+
+        raise TypeError(f'{self.name} is a status flag; use it on its own or '
+                        f'compare it with True or False')
+
+    def _categorical(self, column):
+
+        is_answered = column.codes >= 0
+
+        if self.op == 'isna':
+            return ~is_answered
+        if self.op == 'notna':
+            return is_answered
+        if self.op in ('==', 'contains', 'isin', 'contains_any'):
+            # Values nobody gave (code -1) must not match the missing answers
+            values = [self.value] if self.op in ('==', 'contains') else list(self.value)
+            return is_answered & np.isin(column.codes, codes_of(column, values))
+        if self.op in ('!=', 'notin'):
+            values = [self.value] if self.op == '!=' else list(self.value)
+            return is_answered & ~np.isin(column.codes, codes_of(column, values))
+        if self.op not in COMPARISONS:
+            raise TypeError(f'{self.name} is a single-choice question; {self.op} is not supported')
+
+        # Ordered comparisons on the answers themselves, e.g., on numbers
+        # stored as text; answers that are not of the type of the value
+        # never match
+        values = [_convert(category, self.value) for category in column.categories]
+        if values and all(value is None for value in values):
+            raise TypeError(f'{self.name} has no answers comparable with {self.value!r}; '
+                            f'{self.op} is not supported')
+
+        matches = np.array([value is not None and bool(COMPARISONS[self.op](value, self.value))
+                            for value in values] + [False], dtype=bool)
+        return matches[column.codes]
+
+    def _multiselect(self, column):
+
+        rows, codes = column.long_format()
+
+        if self.op in ('isna', 'notna'):
+            is_answered = column.lengths() > 0
+            return ~is_answered if self.op == 'isna' else is_answered
+
+        if self.op in ('contains', 'contains_any', 'contains_all'):
+            values = [self.value] if self.op == 'contains' else list(self.value)
+            wanted = codes_of(column, values)
+            is_wanted = np.isin(codes, wanted)
+
+            if self.op != 'contains_all':
+                mask = np.zeros(len(column), dtype=bool)
+                mask[rows[is_wanted]] = True
+                return mask
+
+            # Count the distinct wanted options of each row (every row has
+            # all of no options)
+            wanted = np.unique(wanted)
+            if len(wanted) == 0:
+                return np.ones(len(column), dtype=bool)
+            if wanted[0] < 0:
+                return np.zeros(len(column), dtype=bool)
+            pairs = np.unique(np.stack([rows[is_wanted], codes[is_wanted]]), axis=1)
+            found = np.bincount(pairs[0], minlength=len(column))
+            return found == len(wanted)
+
+        raise TypeError(f'{self.name} is a multi-select question; use contains, '
+                        f'contains_any or contains_all')
+
+    def _numeric(self, column):
+
+        values = column.values
+        is_answered = ~pd.isna(values)
+
+        if self.op == 'isna':
+            return ~is_answered
+        if self.op == 'notna':
+            return is_answered
+        if self.op == 'isin':
+            return np.isin(values, list(self.value))
+        if self.op == 'notin':
+            return is_answered & ~np.isin(values, list(self.value))
+        if self.op == 'between':
+            low, high = self.value
+            return is_answered & (values >= _scalar(column, low)) & (values <= _scalar(column, high))
+        if self.op in COMPARISONS:
+            with np.errstate(invalid='ignore'):
+                return is_answered & COMPARISONS[self.op](values, _scalar(column, self.value))
+
+        raise TypeError(f'{self.name} is numeric; {self.op} is not supported')
+
+
+def codes_of(column, values) -> np.ndarray:
+    """
+    Codes of `values` in a categorical or multi-select column (-1 for values
+    nobody gave)
+    """
+    position = {category: code for code, category in enumerate(column.categories)}
+    return np.array([position.get(value, -1) for value in values], dtype=np.int64)
+
+
+def _scalar(column, value):
+    if isinstance(column, DatetimeColumn):
+        return np.datetime64(pd.Timestamp(value))
+    return value
+
+
+def _convert(value, like):
+    """
+    `value` converted to the type of `like` (to float for numbers), or None
+    if it cannot be
+    """
+    try:
+        if isinstance(like, (int, float, np.number)) and not isinstance(like, (bool, np.bool_)):
+            return float(value)
+        return type(like)(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Field:
+    """
+    Named field of a table, whose operators build predicates
+    """
+
+    def __init__(self, name : str):
+        self.name = name
+
+    def __repr__(self):
+        return f'field({self.name!r})'
+
+    # A field on its own is a status flag, e.g., `field('is_working') & ...`
+    def mask(self, table):
+        return Predicate(self.name, 'flag').mask(table)
+
+    def __and__(self, other):
+        return And(Predicate(self.name, 'flag'), other)
+
+    def __rand__(self, other):
+        return And(other, Predicate(self.name, 'flag'))
+
+    def __or__(self, other):
+        return Or(Predicate(self.name, 'flag'), other)
+
+    def __ror__(self, other):
+        return Or(other, Predicate(self.name, 'flag'))
+
+    def __invert__(self):
+        return Not(Predicate(self.name, 'flag'))
+
+    def __eq__(self, value):
+        return Predicate(self.name, '==', value)
+
+    def __ne__(self, value):
+        return Predicate(self.name, '!=', value)
+
+    def __lt__(self, value):
+        return Predicate(self.name, '<', value)
+
+    def __le__(self, value):
+        return Predicate(self.name, '<=', value)
+
+    def __gt__(self, value):
+        return Predicate(self.name, '>', value)
+
+    def __ge__(self, value):
+        return Predicate(self.name, '>=', value)
+
+    __hash__ = object.__hash__
+
+    def isin(self, values):
+        return Predicate(self.name, 'isin', tuple(values))
+
+    def notin(self, values):
+        return Predicate(self.name, 'notin', tuple(values))
+
+    def between(self, low, high):
+        """ Inclusive range """
+        return Predicate(self.name, 'between', (low, high))
+
+    def contains(self, value):
+        return Predicate(self.name, 'contains', value)
+
+    def contains_any(self, values):
+        return Predicate(self.name, 'contains_any', tuple(values))
+
+    def contains_all(self, values):
+        return Predicate(self.name, 'contains_all', tuple(values))
+
+    def isna(self):
+        return Predicate(self.name, 'isna')
+
+    def notna(self):
+        return Predicate(self.name, 'notna')
+
+
+def field(name : str) -> Field:
+    """
+    Refer to a status flag or question by name, to build a filter expression
+    """
+    return Field(name)
+
+
+def as_expression(expression) -> Expr:
+    """
+    Return a filter expression given as a string, a field or an expression
+    """
+    if isinstance(expression, str):
+        return parse(expression)
+    if isinstance(expression, Field):
+        return Predicate(expression.name, 'flag')
+    if isinstance(expression, Expr):
+        return expression
+    raise TypeError(f'Not a filter expression: {expression!r}')
+
+
+AST_COMPARISONS = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+                   ast.Gt: '>', ast.GtE: '>='}
+
+AST_FUNCTIONS = ('contains_any', 'contains_all', 'isna', 'notna')
+
+
+def parse(text : str) -> Expr:
+    """
+    Parse a filter expression written with Python syntax, e.g.,
+    "is_working and state in ['CA', 'MI'] and not salary_base < 120000"
+
+    Names are fields; values must be literals (strings, numbers, lists).
+    """
+
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except SyntaxError as error:
+        raise ValueError(f'Invalid filter expression: {text!r}') from error
+
+    return _from_ast(tree.body, text)
+
+
+def _from_ast(node, text):
+
+    if isinstance(node, ast.BoolOp):
+        operands = [_from_ast(value, text) for value in node.values]
+        return And(*operands) if isinstance(node.op, ast.And) else Or(*operands)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return Not(_from_ast(node.operand, text))
+
+    if _is_field(node):
+        return Predicate(_field_name(node, text), 'flag')
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+            and node.func.id in AST_FUNCTIONS:
+        name = _field_name(node.args[0], text)
+        if node.func.id in ('isna', 'notna'):
+            return Predicate(name, node.func.id)
+        return Predicate(name, node.func.id, tuple(_literal(node.args[1], text)))
+
+    if isinstance(node, ast.Compare):
+        # Chained comparisons, e.g., `100 < salary_base <= 200`, are ANDed
+        predicates = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            predicates.append(_comparison(left, op, right, text))
+            left = right
+        return predicates[0] if len(predicates) == 1 else And(*predicates)
+
+    raise ValueError(f'Unsupported filter expression: {ast.unparse(node)!r} in {text!r}')
+
+
+def _comparison(left, op, right, text):
+
+    if isinstance(op, (ast.In, ast.NotIn)):
+        # `'Asian' in ethnicity` tests a multi-select answer
+        if _is_field(right):
+            predicate = Predicate(_field_name(right, text), 'contains', _literal(left, text))
+        else:
+            predicate = Predicate(_field_name(left, text), 'isin', tuple(_literal(right, text)))
+        if isinstance(op, ast.NotIn):
+            if predicate.op == 'isin':
+                predicate.op = 'notin'
+            else:
+                return Not(predicate)
+        return predicate
+
+    if type(op) not in AST_COMPARISONS:
+        raise ValueError(f'Unsupported comparison in {text!r}')
+    symbol = AST_COMPARISONS[type(op)]
+
+    # Literal on the left, e.g., `120000 < salary_base`
+    if not _is_field(left):
+        swapped = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}.get(symbol, symbol)
+        return Predicate(_field_name(right, text), swapped, _literal(left, text))
+
+    return Predicate(_field_name(left, text), symbol, _literal(right, text))
+
+
+def _is_field(node) -> bool:
+    return isinstance(node, ast.Name) or \
+           (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name))
+
+
+def _field_name(node, text) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if _is_field(node):
+        return f'{node.value.id}.{node.attr}'
+    raise ValueError(f'Expected a field name in {text!r}')
+
+
+def _literal(node, text):
+    try:
+        return ast.literal_eval(node)
+    except ValueError as error:
+        raise ValueError(f'Expected a literal value in {text!r}') from error
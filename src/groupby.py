@@ -0,0 +1,298 @@
+"""
+Grouped summaries of the census answers.
+
+`group_by` breaks respondents down by one or more grouping keys, e.g., state
+and role level, and computes metrics for every combination in a single
+grouped pass over the columns, instead of one filter and one summary per
+cell. Grouping keys are single-choice or multi-select answers, or status
+flags; a respondent who selected several options of a multi-select key falls
+in one group per option.
+
+Each metric is a question and one or more statistics:
+
+- single-choice and multi-select answers: 'counts', a dictionary counter with
+  the same shape as the `summarize_*` methods ('_tot_' first, then the
+  answers in order of first appearance)
+- numeric answers: 'count', 'mean', 'median', 'std', 'min', 'max'
+- Likert blocks: 'count', 'mean', 'stdev', one value per question of the block
+
+The result is a data frame with one row per non-empty group: a column per
+grouping key, 'num_respondents', and a column per metric and statistic, e.g.,
+'salary_base_median' or 'ethnicity_counts'.
+"""
+
+import numpy as np
+import pandas as pd
+
+import src.likert as likert
+from src.filters import resolve_field
+from src.table import (CategoricalColumn, LikertBlock, MultiSelectColumn,
+                       NumericColumn)
+
+# Statistics computed when a metric is given without any
+DEFAULT_STATISTICS = {'counter': ('counts',),
+                      'numeric': ('median',),
+                      'likert' : ('mean', 'stdev')}
+
+STATISTICS = {'counter': ('counts',),
+              'numeric': ('count', 'mean', 'median', 'std', 'min', 'max'),
+              'likert' : ('count', 'mean', 'stdev')}
+
+
+def key_pairs(table, name : str, idx : np.ndarray) -> tuple:
+    """
+    Long-format (row, code) pairs of a grouping key at rows `idx`, one pair
+    per distinct value of each row, sorted by row
+
+    Rows are numbered by their position in `idx`. Returns the rows, the codes
+    and the label of each code.
+    """
+
+    column = resolve_field(table, name)
+
+    if isinstance(column, np.ndarray) and column.dtype == bool:
+        return np.arange(len(idx)), column[idx].astype(np.int64), [False, True]
+
+    if isinstance(column, CategoricalColumn):
+        codes = column.codes[idx].astype(np.int64)
+        rows  = np.flatnonzero(codes >= 0)
+        return rows, codes[rows], column.categories
+
+    if isinstance(column, MultiSelectColumn):
+        rows, codes = column.long_format(idx)
+        pairs = np.unique(rows * len(column.categories) + codes)
+        return pairs // len(column.categories), pairs % len(column.categories), column.categories
+
+    raise TypeError(f'{name} cannot be grouped on; use a single-choice, '
+                     'multi-select or flag field')
+
+
+def join_pairs(rows : np.ndarray, other_rows : np.ndarray, num_rows : int) -> tuple:
+    """
+    Join two lists of row numbers, both sorted
+
+    Returns the position in `rows` and in `other_rows` of each matching
+    pair, sorted by row.
+    """
+
+    counts = np.bincount(other_rows, minlength=num_rows)
+    starts = np.concatenate([[0], np.cumsum(counts)])
+
+    lengths = counts[rows]
+    left    = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    right   = np.repeat(starts[rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+    return left, right
+
+
+def metric_kind(column) -> str:
+    if isinstance(column, (CategoricalColumn, MultiSelectColumn)):
+        return 'counter'
+    if isinstance(column, NumericColumn):
+        return 'numeric'
+    if isinstance(column, LikertBlock):
+        return 'likert'
+    raise TypeError('Metrics are computed on single-choice, multi-select, '
+                    'numeric or Likert questions')
+
+
+def group_counter(column, idx, rows, groups, num_groups) -> list:
+    """
+    Dictionary counter of a single-choice or multi-select question per group
+    """
+
+    if isinstance(column, MultiSelectColumn):
+        value_rows, codes = column.long_format(idx)
+    else:
+        codes      = column.codes[idx].astype(np.int64)
+        value_rows = np.flatnonzero(codes >= 0)
+        codes      = codes[value_rows]
+
+    # Rows with at least one answer count towards '_tot_'
+    has_answer = np.bincount(value_rows, minlength=len(idx)) > 0
+    totals     = np.bincount(groups[has_answer[rows]], minlength=num_groups)
+
+    left, right = join_pairs(rows, value_rows, len(idx))
+    num_codes = len(column.categories)
+    keys = groups[left] * num_codes + codes[right]
+
+    # Answers of each group in order of first appearance
+    unique, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.lexsort((first, unique // num_codes))
+
+    counters = [{'_tot_': total} for total in totals.tolist()]
+    for key, count in zip(unique[order].tolist(), counts[order].tolist()):
+        counters[key // num_codes][column.categories[key % num_codes]] = count
+
+    return counters
+
+
+def group_numeric(values, groups, num_groups, statistics) -> dict:
+    """
+    Statistics of a numeric question per group
+    """
+
+    is_value = ~np.isnan(values)
+    values, groups = values[is_value], groups[is_value]
+
+    # Values sorted within each group, for the order statistics
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+    bounds = np.searchsorted(groups, np.arange(num_groups + 1))
+    starts, count = bounds[:-1], np.diff(bounds)
+    has_value = count > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(groups, values, minlength=num_groups) / count
+        std  = np.sqrt(np.bincount(groups, (values - mean[groups]) ** 2,
+                                   minlength=num_groups) / count)
+
+    def order_statistic(offsets):
+        res = np.full(num_groups, np.nan)
+        res[has_value] = values[starts[has_value] + offsets[has_value]]
+        return res
+
+    res = dict()
+    for statistic in statistics:
+        if statistic == 'count':
+            res[statistic] = count
+        elif statistic == 'mean':
+            res[statistic] = mean
+        elif statistic == 'std':
+            res[statistic] = std
+        elif statistic == 'median':
+            res[statistic] = (order_statistic((count - 1) // 2) + order_statistic(count // 2)) / 2
+        elif statistic == 'min':
+            res[statistic] = order_statistic(np.zeros(num_groups, dtype=np.int64))
+        elif statistic == 'max':
+            res[statistic] = order_statistic(count - 1)
+    return res
+
+
+def group_likert(values, groups, num_groups, statistics) -> dict:
+    """
+    Statistics of each question of a Likert block per group
+    """
+
+    is_value = ~np.isnan(values)
+    filled   = np.where(is_value, values, 0)
+
+    count = np.stack([np.bincount(groups, is_value[:, j], minlength=num_groups)
+                      for j in range(values.shape[1])], axis=1)
+    total = np.stack([np.bincount(groups, filled[:, j], minlength=num_groups)
+                      for j in range(values.shape[1])], axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        deviations = np.where(is_value, values - mean[groups], 0) ** 2
+        stdev = np.sqrt(np.stack([np.bincount(groups, deviations[:, j], minlength=num_groups)
+                                  for j in range(values.shape[1])], axis=1) / count)
+
+    res = dict()
+    for statistic in statistics:
+        res[statistic] = {'count': count.astype(np.int64), 'mean': mean, 'stdev': stdev}[statistic]
+    return res
+
+
+def as_metrics(metrics) -> dict:
+    """
+    Metrics as a dictionary from question to statistics (None for the
+    defaults)
+    """
+
+    if isinstance(metrics, str):
+        return {metrics: None}
+    if isinstance(metrics, dict):
+        return {name: (statistics,) if isinstance(statistics, str) else statistics
+                for name, statistics in metrics.items()}
+    return {name: None for name in metrics}
+
+
+def group_rows(table, keys, idx : np.ndarray) -> tuple:
+    """
+    Cross the grouping keys at rows `idx`
+
+    Returns
+    -------
+    labels     : dict from key to the label of each non-empty group
+    rows       : np.ndarray of positions in `idx`, one per (row, group) pair
+    groups     : np.ndarray of the group of each pair
+    num_groups : int
+    """
+
+    if isinstance(keys, str):
+        keys = [keys]
+
+    # Cross the (row, group) pairs with the codes of each key in turn
+    rows   = np.arange(len(idx))
+    groups = np.zeros(len(idx), dtype=np.int64)
+    labels = []
+    for key in keys:
+        key_rows, key_codes, key_labels = key_pairs(table, key, idx)
+        left, right = join_pairs(rows, key_rows, len(idx))
+        rows   = rows[left]
+        groups = groups[left] * len(key_labels) + key_codes[right]
+        labels.append(key_labels)
+
+    cells, groups = np.unique(groups, return_inverse=True)
+
+    res = dict()
+    for key, key_labels in reversed(list(zip(keys, labels))):
+        cells, codes = np.divmod(cells, len(key_labels))
+        res[key] = [key_labels[code] for code in codes.tolist()]
+
+    return {key: res[key] for key in keys}, rows, groups, len(cells)
+
+
+def group_by(table, keys, metrics=(), idx=None) -> pd.DataFrame:
+    """
+    Compute metrics for every combination of the grouping keys
+
+    Parameters
+    ----------
+    table : RespondentTable
+        Respondent data
+    keys : str or list of str
+        Grouping keys, named as in `src.filters`, e.g., 'state' or
+        'company.role_level'
+    metrics : str, list or dict
+        Questions to summarize in each group, either as a list of names (with
+        the default statistics) or as a dictionary from name to statistics,
+        e.g., {'salary_base': ['median', 'std'], 'sentiment': 'mean'}
+    idx : np.ndarray, optional
+        Rows of the table to group (all rows by default)
+
+    Returns
+    -------
+    pd.DataFrame with one row per non-empty group, in the order of the
+    answers of each key
+    """
+
+    metrics = as_metrics(metrics)
+    idx = np.arange(len(table)) if idx is None else np.asarray(idx, dtype=np.int64)
+
+    res, rows, groups, num_groups = group_rows(table, keys, idx)
+
+    res['num_respondents'] = np.bincount(groups, minlength=num_groups)
+
+    for name, statistics in metrics.items():
+        column = resolve_field(table, name)
+        kind   = metric_kind(column)
+        statistics = DEFAULT_STATISTICS[kind] if statistics is None else tuple(statistics)
+        for statistic in statistics:
+            if statistic not in STATISTICS[kind]:
+                raise ValueError(f'Unknown statistic for {name}: {statistic}')
+
+        if kind == 'counter':
+            res[f'{name}_counts'] = group_counter(column, idx, rows, groups, num_groups)
+        elif kind == 'numeric':
+            values = column.values[idx][rows].astype(float)
+            for statistic, value in group_numeric(values, groups, num_groups, statistics).items():
+                res[f'{name}_{statistic}'] = value
+        else:
+            values = likert.decode(column.answers[idx][rows])
+            for statistic, value in group_likert(values, groups, num_groups, statistics).items():
+                res[f'{name}_{statistic}'] = list(value)
+
+    return pd.DataFrame(res)
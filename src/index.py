@@ -0,0 +1,154 @@
+"""
+Bitmap indexes of the attributes used to filter respondents.
+
+For every value of a filterable attribute, the index keeps the set of rows
+holding that value as a compressed bitset: a packed bitmap (one bit per row)
+for common values, or the sorted row numbers for rare ones, whichever is
+smaller. A filter is then a handful of bitwise ANDs of packed bitmaps, and the
+index doubles as a catalog of the valid values of each attribute.
+"""
+
+import numpy as np
+
+from src.table import MultiSelectColumn
+
+# Status flags and census answers that `Analyst.filter_respondents_on` filters on
+FILTER_FLAGS = ('is_student',
+                'is_working',
+                'is_unemployed',
+                'is_completed_all_questions')
+
+FILTER_ATTRIBUTES = ('education',
+                     'degree',
+                     'country',
+                     'state',
+                     'ethnicity',
+                     'gender',
+                     'citizenship',
+                     'military_status')
+
+
+def pack(mask : np.ndarray) -> np.ndarray:
+    """
+    Pack a boolean mask into a bitmap, 8 rows per byte
+    """
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def unpack(bitmap : np.ndarray, num_rows : int) -> np.ndarray:
+    """
+    Unpack a bitmap into a boolean mask of `num_rows` rows
+    """
+    return np.unpackbits(bitmap, count=num_rows).astype(bool)
+
+
+class ValueIndex:
+    """
+    Compressed bitset of the rows holding each value of one categorical or
+    multi-select column
+    """
+
+    def __init__(self, column):
+
+        self.num_rows = len(column)
+
+        if isinstance(column, MultiSelectColumn):
+            rows, codes = column.long_format()
+        else:
+            codes = column.codes
+            rows  = np.flatnonzero(codes >= 0)
+            codes = codes[rows]
+
+        # Group the rows by code; a row is listed once per value even if a
+        # multi-select answer repeats an option
+        order = np.lexsort((rows, codes))
+        rows, codes = rows[order], codes[order]
+        is_first = np.ones(len(rows), dtype=bool)
+        is_first[1:] = (rows[1:] != rows[:-1]) | (codes[1:] != codes[:-1])
+        rows, codes = rows[is_first], codes[is_first]
+
+        bounds = np.searchsorted(codes, np.arange(len(column.categories) + 1))
+
+        # A row list costs 4 bytes per row holding the value; a bitmap costs
+        # 1 byte per 8 rows of the table
+        self.values  = []
+        self.bitsets = dict()
+        for code, value in enumerate(column.categories):
+            value_rows = rows[bounds[code]:bounds[code + 1]].astype(np.int32)
+            if len(value_rows) == 0:
+                continue
+            self.values.append(value)
+            if 4 * len(value_rows) < self.num_rows / 8:
+                self.bitsets[value] = value_rows
+            else:
+                mask = np.zeros(self.num_rows, dtype=bool)
+                mask[value_rows] = True
+                self.bitsets[value] = pack(mask)
+
+    def __contains__(self, value):
+        return value in self.bitsets
+
+    def bitmap(self, value) -> np.ndarray:
+        """
+        Packed bitmap of the rows holding `value` (no rows if nobody did)
+        """
+        bitset = self.bitsets.get(value)
+
+        if bitset is None:
+            return pack(np.zeros(self.num_rows, dtype=bool))
+        if bitset.dtype == np.uint8:
+            return bitset
+
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[bitset] = True
+        return pack(mask)
+
+    def count(self, value) -> int:
+        """
+        Number of rows holding `value`
+        """
+        bitset = self.bitsets.get(value)
+
+        if bitset is None:
+            return 0
+        if bitset.dtype == np.uint8:
+            return int(np.unpackbits(bitset, count=self.num_rows).sum())
+        return len(bitset)
+
+
+class FilterIndex:
+    """
+    Bitmaps of the status flags and value indexes of the census answers of a
+    `RespondentTable`, built once per table
+    """
+
+    def __init__(self, table):
+
+        self.table    = table
+        self.num_rows = len(table)
+
+        self.flags   = {flag: pack(table.flags[flag]) for flag in FILTER_FLAGS}
+        self.indexes = {key: ValueIndex(table.census[key]) for key in FILTER_ATTRIBUTES}
+
+    def catalog(self) -> dict:
+        """
+        Valid values of each attribute, i.e., the values held by at least one
+        respondent, in order of first appearance
+        """
+        return {key: list(index.values) for key, index in self.indexes.items()}
+
+    def mask(self, flags=(), **values) -> np.ndarray:
+        """
+        Boolean mask of the rows that have all `flags` set and hold all
+        `values` (attribute=value; None values are ignored)
+        """
+        bitmap = pack(np.ones(self.num_rows, dtype=bool))
+
+        for flag in flags:
+            bitmap &= self.flags[flag]
+
+        for key, value in values.items():
+            if value is not None:
+                bitmap &= self.indexes[key].bitmap(value)
+
+        return unpack(bitmap, self.num_rows)
@@ -0,0 +1,144 @@
+"""
+Vectorized statistics of the Likert blocks.
+
+Every Likert block is held as one contiguous (respondents x questions) matrix
+of small integers: the answer on the 1-5 scale, or 0 when the question was
+left unanswered (see `LikertBlock`). The statistics of any subset of
+respondents come from a single `np.bincount` of that matrix into the
+distribution of the answers of each question, from which the counts, means,
+standard deviations, top/bottom-box rates and percentiles are all derived
+exactly.
+"""
+
+import numpy as np
+
+# Number of points on the Likert scale; answers run from 1 to `LEVELS`
+LEVELS = 5
+
+# Answers counted in the top-box and bottom-box rates
+TOP_BOX    = (4, 5)
+BOTTOM_BOX = (1, 2)
+
+PERCENTILES = (25, 50, 75)
+
+
+def encode(values) -> np.ndarray:
+    """
+    Encode Likert answers given as floats (NaN when missing) as small
+    integers (0 when missing)
+    """
+
+    values = np.asarray(values, dtype=float)
+    is_answered = ~np.isnan(values)
+
+    answers = values[is_answered]
+    if np.any((answers != np.round(answers)) | (answers < 1) | (answers > np.iinfo(np.int8).max)):
+        raise ValueError('Likert answers must be positive integers')
+
+    encoded = np.zeros(values.shape, dtype=np.int8)
+    encoded[is_answered] = answers
+    return encoded
+
+
+def decode(answers) -> np.ndarray:
+    """
+    Decode Likert answers into floats (NaN when missing)
+    """
+
+    values = np.asarray(answers, dtype=float)
+    values[values == 0] = np.nan
+    return values
+
+
+def distribution(answers : np.ndarray, idx=None, levels : int = LEVELS,
+                 weights=None) -> np.ndarray:
+    """
+    Count the answers of each question at rows `idx` (all rows by default)
+
+    With `weights` (one per row of `idx`), each row counts for its weight.
+    Returns an array of shape (questions, levels + 1) whose first column
+    counts the unanswered questions.
+    """
+
+    if idx is not None:
+        answers = answers[idx]
+
+    num_questions = answers.shape[1]
+    levels = max(levels, int(answers.max(initial=0)))
+
+    if weights is not None:
+        weights = np.repeat(np.asarray(weights, dtype=float), num_questions)
+
+    keys = np.arange(num_questions) * (levels + 1) + answers.astype(np.int64)
+    counts = np.bincount(keys.ravel(), weights, minlength=num_questions * (levels + 1))
+
+    return counts.reshape(num_questions, levels + 1)
+
+
+def percentile(counts : np.ndarray, q : float) -> np.ndarray:
+    """
+    Percentile `q` of each question from its distribution, as
+    `np.nanpercentile` would return with linear interpolation
+    """
+
+    answered   = counts[:, 1:]
+    n          = answered.sum(axis=1)
+    cumulative = np.cumsum(answered, axis=1)
+
+    res = np.full(len(counts), np.nan)
+    for j in np.flatnonzero(n):
+        position = q / 100 * (n[j] - 1)
+        lower, upper = np.searchsorted(cumulative[j], [np.floor(position), np.ceil(position)],
+                                       side='right') + 1
+        res[j] = lower + (position - np.floor(position)) * (upper - lower)
+    return res
+
+
+def statistics(counts : np.ndarray, percentiles=PERCENTILES) -> dict:
+    """
+    Statistics of each question from the distribution of its answers (see
+    `distribution`)
+
+    Returns
+    -------
+    dict with the count of answers, 'mean' and 'stdev' (as `np.nanmean` and
+    `np.nanstd`), the 'distribution' of the answers on the scale, the
+    'top_box' and 'bottom_box' rates, and 'percentiles' keyed by percentile
+    """
+
+    answered = counts[:, 1:]
+    levels   = np.arange(1, answered.shape[1] + 1)
+    n        = answered.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean  = answered @ levels / n
+        stdev = np.sqrt(np.sum(answered * (levels - mean[:, None]) ** 2, axis=1) / n)
+        top_box    = answered[:, np.array(TOP_BOX) - 1].sum(axis=1) / n
+        bottom_box = answered[:, np.array(BOTTOM_BOX) - 1].sum(axis=1) / n
+
+    res = dict()
+    res['count']        = n
+    res['mean']         = mean
+    res['stdev']        = stdev
+    res['distribution'] = answered
+    res['top_box']      = top_box
+    res['bottom_box']   = bottom_box
+    res['percentiles']  = {q: percentile(counts, q) for q in percentiles}
+    return res
+
+
+def summarize(block, idx=None, percentiles=PERCENTILES, weights=None) -> dict:
+    """
+    Statistics of each question of a `LikertBlock` at rows `idx`, in one
+    vectorized pass (see `statistics`)
+
+    With `weights`, the statistics are those of the answers repeated as many
+    times as their weight, e.g., the weighted mean.
+    """
+
+    counts = distribution(block.answers, idx, weights=weights)
+
+    res = dict()
+    res['keys'] = block.keys
+    res.update(statistics(counts, percentiles))
+    return res
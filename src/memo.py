@@ -0,0 +1,181 @@
+"""
+Memoized summaries.
+
+The `summarize_*` methods of `Analyst` are often called again and again with
+the same respondents, e.g., while tweaking a plot in a notebook. Their results
+are kept in a least-recently-used cache keyed by the method, its arguments and
+a fingerprint of the respondent subset: the hash of its row indices in the
+table. The cache is bound to one `RespondentTable` and is cleared as soon as
+the respondent data changes (`build_respondents_list`, `refresh`,
+`open_store`), since every change gives a new table.
+"""
+
+import collections
+import copy
+import functools
+import hashlib
+import inspect
+
+import numpy as np
+
+# Number of summaries kept by default
+MAXSIZE = 128
+
+
+def subset_fingerprint(idx : np.ndarray) -> str:
+    """
+    Hash the row indices of a respondent subset
+    """
+
+    return array_fingerprint(np.asarray(idx, dtype=np.int64))
+
+
+def array_fingerprint(values : np.ndarray) -> str:
+    """
+    Hash the contents of an array, e.g., respondent weights
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(values.dtype).encode())
+    digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def copy_result(value):
+    """
+    Copy a summary so that the caller can modify it without touching the cache
+
+    Dictionaries and arrays are copied, recursively for dictionaries; lists
+    are copied shallowly since they only hold answers and numbers.
+    """
+
+    if isinstance(value, dict):
+        value = copy.copy(value)
+        for key, item in value.items():
+            value[key] = copy_result(item)
+        return value
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+class SummaryCache:
+    """
+    Least-recently-used cache of the summaries of one `RespondentTable`
+    """
+
+    def __init__(self, maxsize : int = MAXSIZE):
+
+        self.maxsize   = maxsize
+        self.table     = None
+        self.entries   = collections.OrderedDict()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def bind(self, table):
+        """
+        Bind the cache to a table, dropping the summaries of any other table
+        """
+        if table is not self.table:
+            self.entries.clear()
+            self.table = table
+
+    def get(self, key):
+        """
+        Cached summary for `key`, or None
+        """
+        if key not in self.entries:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return copy_result(self.entries[key])
+
+    def put(self, key, result):
+        if self.maxsize <= 0:
+            return
+
+        self.entries[key] = copy_result(result)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all summaries and reset the statistics
+        """
+        self.entries.clear()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Hit, miss and eviction counts, and current and maximum size
+        """
+        res = dict()
+        res['hits']      = self.hits
+        res['misses']    = self.misses
+        res['evictions'] = self.evictions
+        res['size']      = len(self.entries)
+        res['maxsize']   = self.maxsize
+        return res
+
+
+def memoized(method):
+    """
+    Memoize an `Analyst.summarize_*` method in `Analyst.summary_cache`
+
+    The respondents are taken from the `respondents_list` argument of the
+    method, if it has one. Only subsets of the current table are memoized;
+    respondents gathered from several tables are summarized from scratch.
+    """
+
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+
+        summary_cache = self.summary_cache
+
+        if self.table is None or summary_cache is None:
+            return method(self, *args, **kwargs)
+
+        summary_cache.bind(self.table)
+
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        arguments = dict(arguments.arguments)
+        del arguments['self']
+        respondents_list = arguments.pop('respondents_list', None)
+
+        if respondents_list is None or respondents_list is self.respondents_list:
+            subset = 'all'
+        else:
+            table, idx = self.select_rows(respondents_list)
+            if table is not self.table:
+                return method(self, *args, **kwargs)
+            subset = subset_fingerprint(idx)
+
+        key = (method.__name__, subset,
+               tuple((name, array_fingerprint(value) if isinstance(value, np.ndarray) else value)
+                     for name, value in arguments.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+
+        result = summary_cache.get(key)
+        if result is None:
+            result = method(self, *args, **kwargs)
+            summary_cache.put(key, result)
+
+        return result
+
+    return wrapper
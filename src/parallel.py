@@ -0,0 +1,89 @@
+"""
+Parallel execution of summary jobs over a process pool.
+
+A job is a list of summaries (see `src.summaries`) and the rows of the
+populations they cover, e.g., the respondents of one country x degree
+segment. Only the row indices of each job are sent to the workers; the
+respondent data itself is never pickled:
+
+- with the 'fork' start method (Linux), the workers inherit the table and the
+  weights from the parent process, copy-on-write
+- otherwise, the table is saved once to a memory-mapped store (see
+  `src.store`) in a temporary directory, which every worker opens, so they
+  share the pages of the OS file cache
+
+Results come back in the order of the jobs, and are the same as computed
+serially in the parent process.
+"""
+
+import multiprocessing
+import pathlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import src.store as store
+import src.summaries as summaries
+
+# Respondent data of the worker processes
+_table   = None
+_weights = None
+
+
+def _init_worker(path, weights):
+    global _table, _weights
+    _table   = store.open_store(path, mmap=True)
+    _weights = weights
+
+
+def _run_job(job):
+    names, populations = job
+    return summaries.report({population: (_table, idx) for population, idx in populations.items()},
+                            _weights, names)
+
+
+def run_jobs(table, jobs : list, weights=None, processes : int = None) -> list:
+    """
+    Run summary jobs, in parallel if `processes` > 1
+
+    Parameters
+    ----------
+    table : RespondentTable
+        Respondent data
+    jobs : list
+        Pairs of the summary names (None for all) and a dictionary from
+        population ('all', 'working' or 'student') to its rows in the table
+    weights : np.ndarray, optional
+        Weight of every row of the table
+    processes : int, optional
+        Number of worker processes; the jobs run serially by default
+
+    Returns
+    -------
+    list with the summaries of each job, as returned by `summaries.report`
+    """
+
+    global _table, _weights
+
+    if processes is None or processes <= 1 or len(jobs) <= 1:
+        return [summaries.report({population: (table, idx) for population, idx in populations.items()},
+                                 weights, names)
+                for names, populations in jobs]
+
+    # Hand out the jobs in a few chunks per worker
+    chunksize = max(1, len(jobs) // (4 * processes))
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _table, _weights = table, weights
+        try:
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('fork')) as pool:
+                return list(pool.map(_run_job, jobs, chunksize=chunksize))
+        finally:
+            _table, _weights = None, None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = pathlib.Path(tmp_dir) / 'store'
+        store.save(table, path)
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(path, weights)) as pool:
+            return list(pool.map(_run_job, jobs, chunksize=chunksize))
@@ -0,0 +1,333 @@
+"""
+Parse the raw census exports into columns.
+
+Each question is parsed for every row of an export at once, so that the
+respondent data can be stored column by column (see `RespondentTable`). The
+questions, their columns and their types are defined in `src.schema`.
+"""
+
+import re
+import warnings
+from typing import NamedTuple
+
+import pandas as pd
+import numpy as np
+
+import src.schema as schema
+from src.zipcodes import resolve_states
+
+# Bump when the parsed output changes for a reason the source code of the
+# parser does not show (e.g., a dependency update); invalidates the cache
+PARSER_VERSION = 2
+
+
+def read_google_sheet(file, **kwargs) -> pd.DataFrame:
+    """
+    Read the Google Sheet export with every answer as a string
+
+    The parser converts the numeric and boolean answers itself, so that the
+    types do not depend on which rows were read, e.g., when reading in chunks.
+    Keyword arguments are passed on to `pd.read_csv`.
+    """
+    return pd.read_csv(file, dtype=str, **kwargs)
+
+
+def parse_typeform_metadata(df : pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse the response metadata of every row of the TypeForm export
+
+    The dates are converted in one vectorized pass per column.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw data from the TypeForm export as a DataFrame
+
+    Returns
+    -------
+    pd.DataFrame indexed by token, with one column per metadata field
+    """
+
+    submit_time = pd.to_datetime(df['Submit Date (UTC)'])
+    start_time  = pd.to_datetime(df['Start Date (UTC)'])
+
+    meta = pd.DataFrame(index=pd.Index(df['#'].to_numpy(), name='Token'))
+
+    meta['submit_time']   = submit_time.to_numpy()
+    meta['duration_mins'] = ((submit_time - start_time).dt.total_seconds() / 60).to_numpy()
+    meta['start_time']    = start_time.to_numpy()
+    meta['stage_time']    = pd.to_datetime(df['Stage Date (UTC)']).to_numpy()
+    meta['response_type'] = df['Response Type'].to_numpy()
+    meta['network_id']    = df['Network ID'].to_numpy()
+
+    return meta
+
+
+def join_typeform_metadata(df_gsheet : pd.DataFrame,
+                           df_typeform : pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    Join the TypeForm metadata onto the tokens of the Google Sheet export
+
+    The join is a single hash lookup of the Google Sheet tokens against the
+    TypeForm tokens ('#'), instead of one scan of the TypeForm table per
+    respondent.
+
+    Returns
+    -------
+    metadata : pd.DataFrame
+        One row per unique Google Sheet token, in order of first appearance.
+        Tokens without a TypeForm response have missing values.
+    report : dict
+        'missing_from_typeform' : tokens only found in the Google Sheet
+        'missing_from_gsheet'   : tokens only found in the TypeForm export
+    """
+
+    meta = parse_typeform_metadata(df_typeform)
+    meta = meta[~meta.index.duplicated(keep='first')]
+
+    tokens = pd.Index(df_gsheet['Token'].drop_duplicates(), name='Token')
+
+    return meta.reindex(tokens), join_report(tokens, meta.index)
+
+
+def join_report(gsheet_tokens, typeform_tokens) -> dict:
+    """
+    Report the tokens found in only one of the two exports
+    """
+
+    gsheet_tokens   = pd.Index(gsheet_tokens).unique()
+    typeform_tokens = pd.Index(typeform_tokens).unique()
+
+    report = dict()
+    report['missing_from_typeform'] = gsheet_tokens.difference(typeform_tokens, sort=False).tolist()
+    report['missing_from_gsheet']   = typeform_tokens.difference(gsheet_tokens, sort=False).tolist()
+
+    return report
+
+
+def row_hashes(df : pd.DataFrame) -> np.ndarray:
+    """
+    Hash every row of an export into a 64-bit integer, to tell which
+    responses changed between two exports without parsing them
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def parse_census_columns(df : pd.DataFrame) -> dict:
+    """
+    Parse the census questions for every row of the Google Sheet export
+
+    Returns a dictionary with the 'census' answers and the status 'flags'. Each
+    answer is stored as a column (one entry per row of `df`); Likert blocks are
+    stored as a dictionary of 'keys' and a 2D array of 'values'.
+    """
+    cens = parse_section(df, 'census')
+
+    flags = dict()
+
+    flags['is_working']    = cens['employment_status'] == "I'm working professionally (e.g., at a company, national lab)"
+    flags['is_student']    = cens['employment_status'] == "I'm in school or in training (e.g., a student or postdoc)"
+    flags['is_unemployed'] = cens['employment_status'] == "I'm not employed right now but I used to work for a company"
+
+    flags['is_working_and_completed_all_questions']    = cens['to_complete_industry_questions'] == True
+    flags['is_student_and_completed_all_questions']    = cens['to_complete_student_questions'] == True
+    flags['is_unemployed_and_completed_all_questions'] = cens['to_complete_unemployed_questions'] == True
+
+    # Those who are working in industry or are employed see the same set of
+    # "company" questions; those unemployed see an additional context which
+    # asks them to answer the following questions for their previous
+    # employer, i.e.: 'Please complete the remaining sections as they relate
+    # to the last month of your employment with your previous employer.'
+    flags['is_completed_industry_questions'] = flags['is_working_and_completed_all_questions'] | \
+                                               flags['is_unemployed_and_completed_all_questions']
+    flags['is_completed_student_questions']  = flags['is_student_and_completed_all_questions']
+
+    flags['is_completed_all_questions'] = flags['is_completed_industry_questions'] | \
+                                          flags['is_completed_student_questions']
+
+    flags = {flag: np.asarray(values, dtype=bool) for flag, values in flags.items()}
+
+    return {'census': cens, 'flags': flags}
+
+
+def parse_company_columns(df : pd.DataFrame, rows : np.ndarray = None) -> dict:
+    """
+    Parse the company questions for every row of the Google Sheet export, or
+    only for `rows` (see `parse_section`)
+    """
+    return parse_section(df, 'company', rows)
+
+
+def parse_student_columns(df : pd.DataFrame, rows : np.ndarray = None) -> dict:
+    """
+    Parse the student questions for every row of the Google Sheet export, or
+    only for `rows` (see `parse_section`)
+    """
+    return parse_section(df, 'student', rows)
+
+
+def parse_section(df : pd.DataFrame, section : str, rows : np.ndarray = None) -> dict:
+    """
+    Parse the questions of one section of the registry (see `src.schema`)
+
+    The registry is compiled against the columns of `df` and every question
+    is parsed from its column(s) in one vectorized pass. Raises a
+    `schema.SchemaDriftError` listing all missing columns before any parsing.
+
+    If `rows` is given, only those rows are parsed, e.g., the respondents who
+    completed the section; the other rows are left unanswered (NaN, or an
+    empty list for multi-select questions).
+    """
+    plan = schema.compile_schema(df.columns)
+    plan.check()
+
+    num_rows = len(df)
+    if rows is not None:
+        df = df.iloc[rows]
+
+    parsed = dict()
+    for question, positions in plan.section(section):
+        columns = [df.iloc[:, i] for i in positions]
+        if question.kind == schema.LIKERT:
+            parsed[question.key] = likert_columns(columns, question.columns)
+        elif question.kind == schema.MULTI:
+            parsed[question.key] = split_multiselect(columns[0], question.options)
+        else:
+            parsed[question.key] = CONVERTERS[question.kind](*columns)
+
+        if rows is not None:
+            parsed[question.key] = expand_rows(parsed[question.key], rows, num_rows)
+
+    return parsed
+
+
+def expand_rows(parsed, rows : np.ndarray, num_rows : int):
+    """
+    Spread a column parsed for some of the rows over all `num_rows` rows,
+    leaving the other rows unanswered
+    """
+    if isinstance(parsed, dict):
+        values = np.full((num_rows, len(parsed['keys'])), np.nan)
+        values[rows] = parsed['values']
+        return {'keys': parsed['keys'], 'values': values}
+
+    if isinstance(parsed, MultiSelectAnswers):
+        lengths = np.zeros(num_rows, dtype=np.int64)
+        lengths[rows] = np.diff(parsed.offsets)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        return MultiSelectAnswers(offsets, parsed.codes, parsed.options)
+
+    expanded = np.full(num_rows, np.nan, dtype=parsed.dtype)
+    expanded[rows] = parsed
+    return expanded
+
+
+def likert_columns(columns : list, keys : list) -> dict:
+    """
+    Gather a block of Likert questions into a 2D array with rows holding each
+    response and columns holding the results for each question in `keys`
+    """
+    return {'keys': list(keys),
+            'values': np.column_stack([numeric_column(column) for column in columns])}
+
+
+def object_column(column : pd.Series) -> np.ndarray:
+    """
+    Return a column of single-choice or free-text answers as is
+    """
+    return column.to_numpy()
+
+
+def numeric_column(column : pd.Series) -> np.ndarray:
+    """
+    Convert a column of numeric answers to floats (NaN when missing)
+
+    Answers that are not numbers, e.g., '120k', count as missing, with a
+    warning.
+    """
+    values = pd.to_numeric(column, errors='coerce')
+
+    num_coerced = int((values.isna() & column.notna()).sum())
+    if num_coerced > 0:
+        warnings.warn(f'{num_coerced} non-numeric answer(s) to {column.name!r} counted as missing')
+
+    return values.to_numpy(dtype=float)
+
+
+def boolean_column(column : pd.Series) -> np.ndarray:
+    """
+    Convert a column of 'TRUE'/'FALSE' answers to booleans, keeping missing
+    answers as NaN, as `pd.read_csv` does when it infers the types
+    """
+    values = column.to_numpy(dtype=object).copy()
+    values[np.isin(values, ['TRUE', 'True', 'true'])]    = True
+    values[np.isin(values, ['FALSE', 'False', 'false'])] = False
+    return values
+
+
+class MultiSelectAnswers(NamedTuple):
+    """
+    Multi-select answers in long format: the options selected by row `i` are
+    `options[codes[offsets[i]:offsets[i + 1]]]`
+    """
+    offsets : np.ndarray
+    codes   : np.ndarray
+    options : list
+
+
+# Commas separate the options of a multi-select answer, except for commas
+# inside parentheses, e.g., 'Product integration (vehicles, mobility)'
+OPTION_SEPARATOR = re.compile(r',(?![^()]*\))')
+
+# Stands in for the commas of known options while an answer is split
+COMMA_PLACEHOLDER = '\x00'
+
+
+def split_options(answer : str, options=()) -> list:
+    """
+    Split one comma-separated multi-select answer into its options, keeping
+    the known `options` whose labels contain commas whole
+    """
+    for option in options:
+        answer = answer.replace(option, option.replace(',', COMMA_PLACEHOLDER))
+
+    return [x.strip().replace(COMMA_PLACEHOLDER, ',') for x in OPTION_SEPARATOR.split(answer)]
+
+
+def split_multiselect(column : pd.Series, options=()) -> MultiSelectAnswers:
+    """
+    Split a column of comma-separated multi-select answers into long format
+
+    Each distinct answer is only split once; the options of every row are
+    then gathered with integer array operations. The options are coded in
+    order of first appearance. `options` lists the labels that contain
+    commas outside of parentheses (see `schema.Question`).
+    """
+    answers, uniques = pd.factorize(column.to_numpy(dtype=object))
+
+    # Split the distinct answers and code their options
+    split   = [split_options(answer, options) for answer in uniques]
+    lengths = np.array([len(x) for x in split] + [0], dtype=np.int64)
+    starts  = np.concatenate([[0], np.cumsum(lengths)])
+    flat    = np.empty(starts[-1], dtype=object)
+    flat[:] = [option for options in split for option in options]
+    flat_codes, options = pd.factorize(flat)
+
+    # Gather the codes of each row's answer (missing answers, coded -1, map
+    # onto the trailing empty answer)
+    row_lengths = lengths[answers]
+    offsets     = np.concatenate([[0], np.cumsum(row_lengths)])
+    positions   = np.repeat(starts[answers] - offsets[:-1], row_lengths) + np.arange(offsets[-1])
+
+    return MultiSelectAnswers(offsets, flat_codes[positions].astype(np.int32), options.tolist())
+
+
+# How each question type of the registry is parsed (Likert groups are
+# gathered by `likert_columns`)
+CONVERTERS = {schema.SINGLE  : object_column,
+              schema.TEXT    : object_column,
+              schema.MULTI   : split_multiselect,
+              schema.NUMERIC : numeric_column,
+              schema.BOOLEAN : boolean_column,
+              schema.STATE   : lambda zip_codes, countries: resolve_states(zip_codes.to_numpy(),
+                                                                          countries.to_numpy())}
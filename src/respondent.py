@@ -1,29 +1,41 @@
 import pandas as pd
-import numpy as np
-from pyzipcode import ZipCodeDatabase
+from collections.abc import Sequence
+
+from src.parser import parse_typeform_metadata
+from src.table import RespondentTable
+
+# Status flags of a respondent, stored as boolean columns of the table
+FLAGS = ('is_working',
+         'is_working_and_completed_all_questions',
+         'is_student',
+         'is_student_and_completed_all_questions',
+         'is_unemployed',
+         'is_unemployed_and_completed_all_questions',
+         'is_completed_industry_questions',
+         'is_completed_student_questions',
+         'is_completed_all_questions')
 
-zcdb = ZipCodeDatabase()
 class Respondent:
+    """
+    View of one respondent, i.e., one row of a `RespondentTable`
 
-    def __init__(self, respondent_id : str):
+    The answers are read from the columns of the table on access, e.g.,
+    `respondent.census['gender']`, so a respondent holds no data of its own.
+    """
+
+    __slots__ = ('respondent_id', 'table', 'index', 'df_gsh', 'df_typ', '_metadata')
+
+    def __init__(self, respondent_id : str, table : RespondentTable = None, index : int = None):
 
         self.respondent_id = respondent_id
 
+        self.table         = table # Table holding the parsed responses
+        self.index         = index # Row of this respondent in the table
+
         self.df_gsh        = None
         self.df_typ        = None
 
-        self.metadata      = None # Metadata about the survey response
-        self.census        = None # census responses (everyone fills)
-        self.company       = None # company responses (detailed; only some fill)
-        self.student       = None # student responses (detailed; only some fill)
-
-        self.is_working                                = False
-        self.is_working_and_completed_all_questions    = False
-        self.is_student                                = False
-        self.is_student_and_completed_all_questions    = False
-        self.is_unemployed                             = False
-        self.is_unemployed_and_completed_all_questions = False
-        self.is_completed_all_questions                = False
+        self._metadata     = None
 
     def __repr__(self):
 
@@ -44,6 +56,45 @@ class Respondent:
 
         return representation
 
+    def __getattr__(self, name):
+
+        # Status flags are looked up in the table; they are all False until
+        # the responses have been set
+        if name in FLAGS:
+            if self.table is None:
+                return False
+            return bool(self.table.flags[name][self.index])
+
+        raise AttributeError(f"'Respondent' object has no attribute '{name}'")
+
+    @property
+    def census(self):
+        """ census responses (everyone fills) """
+        return self._section('census')
+
+    @property
+    def company(self):
+        """ company responses (detailed; only some fill) """
+        return self._section('company')
+
+    @property
+    def student(self):
+        """ student responses (detailed; only some fill) """
+        return self._section('student')
+
+    @property
+    def metadata(self):
+        """ Metadata about the survey response """
+        if self._metadata is not None:
+            return self._metadata
+        return self._section('metadata')
+
+    def _section(self, section):
+
+        if self.table is None:
+            return None
+        return self.table.section_row(section, self.index)
+
 
     def set_properties_from_google_sheet(self, df : pd.DataFrame):
         """
@@ -61,6 +112,9 @@ class Respondent:
            long column names which are the questions themselves.
         3. Defining custom filters and flags for certain data.
 
+        The respondent's row is parsed into a table of its own. To parse many
+        respondents, use `build_respondents` instead.
+
         Parameters
         ----------
         df : pd.DataFrame
@@ -69,282 +123,68 @@ class Respondent:
 
         self.df_gsh = df[df['Token'] == self.respondent_id].copy()
 
-        self.set_census_results_from_google_sheet()
-        self.set_company_results_from_google_sheet()
-        self.set_student_results_from_google_sheet()
+        self.table = RespondentTable.from_frames(self.df_gsh)
+        self.index = 0
 
 
-    def set_census_results_from_google_sheet(self):
-        """
-        Census Questions
-        """
-        cens = dict()
-
-        sentiment = dict()
-
-        sentiment['keys'] = [
-                'I feel good about what I\'m working on',
-                'I feel good about my career path',
-                'I feel good about my work-life balance',
-                'I feel valued by those around me',
-                'I see opportunities for career growth'
-                ]
-        sentiment['values'] = np.array([
-                self.df_gsh['I feel good about what I\'m working on'].values[0],
-                self.df_gsh['I feel good about my career path'].values[0],
-                self.df_gsh['I feel good about my work-life balance'].values[0],
-                self.df_gsh['I feel valued by those around me'].values[0],
-                self.df_gsh['I see opportunities for career growth'].values[0]
-                ])
-        cens['sentiment'] = sentiment
-
-        cens['skills_demand'] = self.df_gsh['In your opinion, what are the top three skills most in demand in the battery industry?'].values[0]
-
-        skills_value_chain = self.df_gsh['In opinion, which part(s) of the battery value chain are most in need of more skilled workers?'].values[0]
-        cens['skills_value_chain'] = [] if pd.isna(skills_value_chain) else [x.strip() for x in skills_value_chain.split(',')]
-
-        cens['education']      = self.df_gsh['What is your highest level of education?'].values[0]
-        cens['degree']         = self.df_gsh['What did you study in school?'].values[0]
-        cens['country']        = self.df_gsh['What country do you live in?'].values[0]
-        cens['zip']            = self.df_gsh['What is your ZIP code or postal code?'].values[0]
-
-        # Assign state based on zip code (for valid zip codes only)
-        try:
-            state = zcdb[ cens['zip'] ].state
-        except KeyError:
-            state = None
-        cens['state']          = state
-
-        cens['income']         = self.df_gsh['What is your total income over the past 12 months?'].values[0]
-        cens['hours_worked']   = self.df_gsh['How many hours did you work last week?'].values[0]
-        cens['age']            = self.df_gsh['What is your age?'].values[0]
-
-        ethnicity = self.df_gsh['How would you best describe yourself?'].values[0]
-        cens['ethnicity'] = [] if pd.isna(ethnicity) else [x.strip() for x in ethnicity.split(',')]
-
-        cens['gender']         = self.df_gsh['To which gender do you most identify with?'].values[0]
-        cens['citizenship']    = self.df_gsh['What is your citizenship status in the country you currently live in?'].values[0]
-        cens['military_status']= self.df_gsh['Have you ever served in the military?'].values[0]
-        cens['employment_status'] = self.df_gsh['What is your current employment situation?'].values[0]
-        self.is_working        = cens['employment_status'] == "I'm working professionally (e.g., at a company, national lab)"
-        self.is_student        = cens['employment_status'] == "I'm in school or in training (e.g., a student or postdoc)"
-        self.is_unemployed     = cens['employment_status'] == "I'm not employed right now but I used to work for a company"
-        cens['to_complete_industry_questions']   = self.df_gsh["Since you\'re currently working in the industry, we would love to ask you some more detailed questions about your industry experience.\n\nWould you like to complete these additional questions? "].values[0]
-        cens['to_complete_student_questions']    = self.df_gsh["Since you\'re a student, we would love to ask you more detailed questions about your student and job searching experience.\n\nWould you like to complete these additional questions? "].values[0]
-        cens['to_complete_unemployed_questions'] = self.df_gsh["Since you\'ve indicated that you used to work for a company but no longer work there, we would love to ask you more detailed questions about your experience with the previous company and your job-search process.\n\nWould you like to complete these additional questions? "].values[0]
-
-        self.is_working_and_completed_all_questions = cens['to_complete_industry_questions'] == True
-        self.is_student_and_completed_all_questions = cens['to_complete_student_questions'] == True
-        self.is_unemployed_and_completed_all_questions = cens['to_complete_unemployed_questions'] == True
-
-        # Those who are working in industry or are employed see the same set of
-        # "company" questions; those unemployed see an additional context which
-        # asks them to answer the following questions for their previous
-        # employer, i.e.: 'Please complete the remaining sections as they relate
-        # to the last month of your employment with your previous employer.'
-        self.is_completed_industry_questions = (cens['to_complete_industry_questions'] == True) or \
-                                               (cens['to_complete_unemployed_questions'] == True)
-        self.is_completed_student_questions  = cens['to_complete_student_questions'] == True
-
-        self.is_completed_all_questions = self.is_completed_industry_questions or \
-                                            self.is_completed_student_questions
-
-        self.census = cens
-
-        # Why did you leave your previous company?
-        cens['why_leave'] = self.df_gsh['Why did you leave your previous company?'].values[0]
-
-
-    def set_company_results_from_google_sheet(self):
-        """
-        Company questions
-        """
-        comp = dict()
-
-        # Satisfaction
-        company_satisfaction = dict()
-        company_satisfaction['keys'] = [
-            'I am satisfied with my compensation',
-            'I am being underpaid compared to similar roles',
-            'I am satisfied with the raises and/or bonuses I have been receiving'
-        ]
-        company_satisfaction['values'] = np.array([
-            self.df_gsh['I am satisfied with my compensation'].values[0],
-            self.df_gsh['I am being underpaid compared to similar roles'].values[0],
-            self.df_gsh['I am satisfied with the raises and/or bonuses I have been receiving'].values[0]
-        ])
-        comp['company_satisfaction'] = company_satisfaction
-
-        # Salary
-        comp['salary_base']          = self.df_gsh['What is your annual base salary?'].values[0]
-
-        comp_types = self.df_gsh['Beyond base salary, what additional compensation types do you receive?'].values[0]
-        comp['salary_comp_types'] = [] if pd.isna(comp_types) else [x.strip() for x in comp_types.split(',')]
-
-        comp['salary_num_raises']   = self.df_gsh['How many times have you received a base salary increase over the past 12 months of employment?'].values[0]
-        comp['salary_num_bonuses']  = self.df_gsh['How many times have you received a bonus over the past 12 months of employment?'].values[0]
-
-        # Company info
-        comp['company_years_with']  = self.df_gsh['How many years have you been with the company?'].values[0]
-
-        comp_value_chain = self.df_gsh['Where does the company fall on the battery value chain?'].values[0]
-        comp['company_value_chain'] = [] if pd.isna(comp_value_chain) else [x.strip() for x in comp_value_chain.split(',')]
-
-        comp['company_stage']       = self.df_gsh['How would you classify your company\'s stage of development?'].values[0]
-        comp['company_country']     = self.df_gsh['In what country is your office located?'].values[0]
-        comp['company_state']       = self.df_gsh['In what state is your office located?'].values[0]
-        comp['company_days_in_office'] = self.df_gsh['How many days did you work in the office last week?'].values[0]
-        comp['company_headcount']   = self.df_gsh['How many employees work at your company?'].values[0]
-        comp['company_team_count']  = self.df_gsh['What is the total headcount on your team?'].values[0]
-
-
-        # Role info
-        comp['role_title']          = self.df_gsh['What is your current job title?'].values[0]
-
-        role_role = self.df_gsh['What does your role involve?'].values[0]
-        comp['role_role'] = [] if pd.isna(role_role) else [x.strip() for x in role_role.split(',')]
-
-        comp['role_level']          = self.df_gsh['What is your current level?'].values[0]
-
-        role_why_choose = self.df_gsh['Why did you choose your current role and company?'].values[0]
-        comp['role_why_choose'] = [] if pd.isna(role_why_choose) else [x.strip() for x in role_why_choose.split(',')]
-
-        comp['role_prev_industries'] = self.df_gsh['Have you previously worked in other industries?'].values[0]
-        comp['role_prev_role']      = self.df_gsh['What was your previous role before joining the battery industry?'].values[0]
-
-        # Skills and preparedness
-        skills_preparedness = dict()
-        skills_preparedness['keys'] = [
-            'After working for 1 week?',
-            'After working for 1 month?',
-            'After working for 3 months?',
-            'Last week?'
-            ]
-        skills_preparedness['values'] = np.array([
-                self.df_gsh['After working for 1 week?'].values[0],
-                self.df_gsh['After working for 1 month?'].values[0],
-                self.df_gsh['After working for 3 months?'].values[0],
-                self.df_gsh['Last week?'].values[0]
-        ])
-        comp['skills_preparedness'] = skills_preparedness
-
-        skills_how_was_trained = self.df_gsh['When you first started your role, how were you trained?'].values[0]
-        comp['skills_how_was_trained']  = [] if pd.isna(skills_how_was_trained) else [x.strip() for x in skills_how_was_trained.split(',')]
-
-        skills_how_to_improve = self.df_gsh['When you first started in the battery industry, what could have improved your job performance on day one?'].values[0]
-        comp['skills_how_to_improve']   = [] if pd.isna(skills_how_to_improve) else [x.strip() for x in skills_how_to_improve.split(',')]
-
-        comp['skills_num_internships']  = self.df_gsh['How many internships did you complete before starting your current role?'].values[0]
-        comp['opinion_top_skills']      = self.df_gsh['In your opinion, what are the top skills that contributed to your success?'].values[0]
-        comp['opinion_hardest_to_fill'] = self.df_gsh['In your opinion, which positions are the hardest to fill in your company?'].values[0]
-        comp['opinion_barriers']        = self.df_gsh['In your opinion, what do you think are the main barriers to hiring skilled talent in the battery industry?'].values[0]
-
-        # Retention
-        comp['retention_num_employer_changes'] = self.df_gsh['How many times have you changed employers in the last five years?'].values[0]
-        comp['retention_is_on_market']  = self.df_gsh['Are you currently seeking new job opportunities?'].values[0]
-
-        retention_sentiment = dict()
-        retention_sentiment['keys'] = [
-            'My company has a good reputation in the industry',
-            'I want to stay with my company for at least 12 more months',
-            'I am satisfied with my current job stability',
-            'I am confident in my ability to find my next job in the industry'
-            ]
-        retention_sentiment['values'] = np.array([
-            self.df_gsh['My company has a good reputation in the industry'].values[0],
-            self.df_gsh['I want to stay with my company for at least 12 more months'].values[0],
-            self.df_gsh['I am satisfied with my current job stability'].values[0],
-            self.df_gsh['I am confident in my ability to find my next job in the industry'].values[0]
-        ])
-        comp['retention_sentiment'] = retention_sentiment
-
-        retention_factors = self.df_gsh['If you were offered a similar role with a different company, what factors would influence your decision accept the offer?'].values[0]
-        comp['retention_factors'] = [] if pd.isna(retention_factors) else [x.strip() for x in retention_factors.split(',')]
-
-        comp['retention_misc']      = self.df_gsh['Is there anything else you\'d like to share about what you\'re looking for in your next role?'].values[0]
-
-        # Benefits
-        benefits_priorities = dict()
-        benefits_priorities['keys'] = ['Mental health support',
-                                       'Work-life balance initiatives',
-                                       'Financial wellness programs',
-                                       'Career development opportunities']
-        benefits_priorities['values'] = np.array([
-            self.df_gsh['Mental health support'].values[0],
-            self.df_gsh['Work-life balance initiatives'].values[0],
-            self.df_gsh['Financial wellness programs'].values[0],
-            self.df_gsh['Career development opportunities'].values[0]
-        ])
-        comp['benefits_priorities']           = benefits_priorities
-
-        benefits_entitlements = self.df_gsh['What benefits does your company entitle you to?'].values[0]
-        comp['benefits_entitlements']         = [] if pd.isna(benefits_entitlements) else [x.strip() for x in benefits_entitlements.split(',')]
-
-        comp['benefits_parental_leave_weeks'] = self.df_gsh['How many weeks of parental leave are you entitled to?'].values[0]
-        comp['benefits_pto_weeks']            = self.df_gsh['How many weeks of paid time off are you entitled to each year?'].values[0]
-        comp['benefits_sick_leave_days']      = self.df_gsh['How many days of sick leave are you entitled to?'].values[0]
-        comp['benefits_unique']               = self.df_gsh['Are there any unique benefits that you value?'].values[0]
-
-        self.company = comp
-
-
-    def set_student_results_from_google_sheet(self):
-        """
-        Student Questions
-        """
+    def set_properties_from_typeform(self, df : pd.DataFrame):
 
-        stud = dict()
+        self.df_typ = df[df['#'] == self.respondent_id]
 
-        stud_sentiment = dict()
-        stud_sentiment['keys'] = [
-            'After graduating, I know what role(s) to apply to',
-            'After graduating, I will find a job',
-            'By the time I graduate, I will have learned the skills needed to find a job',
-            'I am optimistic about the future of the battery industry'
-        ]
-        stud_sentiment['values'] = np.array([
-            self.df_gsh['After graduating, I know what role(s) to apply to'].values[0],
-            self.df_gsh['After graduating, I will find a job'].values[0],
-            self.df_gsh['By the time I graduate, I will have learned the skills needed to find a job'].values[0],
-            self.df_gsh['I am optimistic about the future of the battery industry'].values[0]
-        ])
-        stud['student_sentiment'] = stud_sentiment
-        stud['ideal_job_title'] = self.df_gsh['After you graduate, what would be your ideal job title?'].values[0]
+        self._metadata = parse_typeform_metadata(self.df_typ).to_dict('records')[0]
 
-        ideal_value_chain = self.df_gsh['After you graduate, what part(s) of the battery value chain do you see yourself contributing to?'].values[0]
-        stud['ideal_value_chain'] = [] if pd.isna(ideal_value_chain) else [x.strip() for x in ideal_value_chain.split(',')]
 
-        ideal_job_aspects = self.df_gsh['Which of the following aspects are you looking for in your first job?'].values[0]
-        stud['ideal_job_aspects'] = [] if pd.isna(ideal_job_aspects) else [x.strip() for x in ideal_job_aspects.split(',')]
+def build_respondents(df : pd.DataFrame, df_metadata : pd.DataFrame = None) -> list[Respondent]:
+    """
+    Build one `Respondent` per row of the Google Sheet export
 
-        stud['ideal_salary'] = self.df_gsh['How much do you expect to be paid for your first job?'].values[0]
-        stud['num_internships'] = self.df_gsh['How many internships have you completed so far?'].values[0]
+    The frame is parsed once, column by column, into a `RespondentTable`, and
+    each respondent is a view over its own row of the table.
 
-        internship_value_chain = self.df_gsh['During your previous internship, where did your  employer fall on the battery value chain?'].values[0]
-        stud['internship_value_chain'] = [] if pd.isna(internship_value_chain) else [x.strip() for x in internship_value_chain.split(',')]
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw data from the Google Sheet as a DataFrame
+    df_metadata : pd.DataFrame, optional
+        TypeForm metadata joined on token (see `src.parser.join_typeform_metadata`)
 
-        internship_role = self.df_gsh['During your previous internship, what did your role involve?'].values[0]
-        stud['internship_role'] = [] if pd.isna(internship_role) else [x.strip() for x in internship_role.split(',')]
+    Returns
+    -------
+    list of `Respondent`, in the same order as the unique tokens of `df`
+    """
 
-        stud['internship_top_skills'] = self.df_gsh['During your previous internship, what are the top three skills that contributed to your success?'].values[0]
-        stud['internship_skills_wish_learned'] = self.df_gsh['During your previous internship, were there skills you wish you had learned but didn\'t? If yes, what were they?'].values[0]
-        stud['internship_skills_unprepared'] = self.df_gsh['During your previous internship, were there skills that you felt unprepared for? If yes, what were they?'].values[0]
-        stud['internship_hourly_pay'] = self.df_gsh['During your previous internship, what was your hourly pay?'].values[0]
-        stud['internship_hours_per_week'] = self.df_gsh['During your previous internship, how many hours per week did you work, on average?'].values[0]
+    return respondents_from_table(RespondentTable.from_frames(df, df_metadata))
 
-        self.student = stud
 
+def respondents_from_table(table : RespondentTable) -> list[Respondent]:
+    """
+    Return one `Respondent` view per row of the table
+    """
 
-    def set_properties_from_typeform(self, df : pd.DataFrame):
+    return [Respondent(token, table, i) for i, token in enumerate(table.tokens)]
 
-        self.df_typ = df[df['#'] == self.respondent_id]
 
-        meta = dict()
+class RespondentViews(Sequence):
+    """
+    Sequence of `Respondent` views over all rows of a table, created on
+    access; avoids building millions of views up front for large tables
+    """
+
+    def __init__(self, table : RespondentTable):
+
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
 
-        submit_time = pd.to_datetime(self.df_typ['Submit Date (UTC)'].values[0])
-        start_time  = pd.to_datetime(self.df_typ['Start Date (UTC)'].values[0])
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
 
-        meta['submit_time'] = submit_time
-        meta['duration_mins'] = (submit_time - start_time).total_seconds() / 60
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('respondent index out of range')
 
-        self.metadata = meta
+        return Respondent(self.table.tokens[i], self.table, i)
@@ -0,0 +1,273 @@
+"""
+Registry of the census questions.
+
+Each question maps an internal key (e.g., 'salary_base') to the column(s) of
+the Google Sheet export it is read from and to its question type, which
+decides how the answers are parsed. The registry is compiled once per export
+into a `SchemaPlan` holding the position of every column, which the parser
+runs over the whole frame, and a report of the schema drift: questions whose
+columns are missing from the export, and columns of the export that no
+question reads.
+"""
+
+import functools
+
+import pandas as pd
+
+# Question types
+SINGLE  = 'single'  # Single-choice multiple choice question
+MULTI   = 'multi'   # Multi-select multiple choice question (comma-separated)
+LIKERT  = 'likert'  # Group of Likert questions, one column each
+NUMERIC = 'numeric' # Number
+BOOLEAN = 'boolean' # TRUE/FALSE
+TEXT    = 'text'    # Free text
+STATE   = 'state'   # US state looked up from a ZIP code and a country
+
+QUESTION_TYPES = (SINGLE, MULTI, LIKERT, NUMERIC, BOOLEAN, TEXT, STATE)
+
+# Columns of the export that identify a response rather than answer a question
+ID_COLUMNS = ('Token', 'Submitted At')
+
+
+class Question:
+    """
+    One question of the census, read from one column of the export (or one
+    column per item for Likert groups, and the ZIP code and country columns
+    for states)
+
+    `options` lists the options of a multi-select question whose labels
+    contain commas, so that they are not split apart.
+    """
+
+    __slots__ = ('section', 'key', 'kind', 'columns', 'options')
+
+    def __init__(self, section : str, key : str, kind : str, columns, options=()):
+
+        if kind not in QUESTION_TYPES:
+            raise ValueError(f'Unknown question type: {kind}')
+
+        self.section = section
+        self.key     = key
+        self.kind    = kind
+        self.columns = tuple(columns) if kind in (LIKERT, STATE) else (columns,)
+        self.options = tuple(options)
+
+    def __repr__(self):
+        return f'Question({self.section!r}, {self.key!r}, {self.kind!r})'
+
+
+QUESTIONS = (
+
+    # Census (everyone fills)
+    Question('census', 'sentiment', LIKERT, [
+        'I feel good about what I\'m working on',
+        'I feel good about my career path',
+        'I feel good about my work-life balance',
+        'I feel valued by those around me',
+        'I see opportunities for career growth']),
+
+    Question('census', 'skills_demand',      TEXT,    'In your opinion, what are the top three skills most in demand in the battery industry?'),
+    Question('census', 'skills_value_chain', MULTI,   'In opinion, which part(s) of the battery value chain are most in need of more skilled workers?'),
+    Question('census', 'education',          SINGLE,  'What is your highest level of education?'),
+    Question('census', 'degree',             SINGLE,  'What did you study in school?'),
+    Question('census', 'country',            SINGLE,  'What country do you live in?'),
+    Question('census', 'zip',                TEXT,    'What is your ZIP code or postal code?'),
+    Question('census', 'state',              STATE,   ['What is your ZIP code or postal code?',
+                                                       'What country do you live in?']),
+    Question('census', 'income',             NUMERIC, 'What is your total income over the past 12 months?'),
+    Question('census', 'hours_worked',       NUMERIC, 'How many hours did you work last week?'),
+    Question('census', 'age',                NUMERIC, 'What is your age?'),
+    Question('census', 'ethnicity',          MULTI,   'How would you best describe yourself?',
+             options=['Hispanic, Latino, or Spanish origin']),
+    Question('census', 'gender',             SINGLE,  'To which gender do you most identify with?'),
+    Question('census', 'citizenship',        SINGLE,  'What is your citizenship status in the country you currently live in?'),
+    Question('census', 'military_status',    SINGLE,  'Have you ever served in the military?'),
+    Question('census', 'employment_status',  SINGLE,  'What is your current employment situation?'),
+    Question('census', 'to_complete_industry_questions',   BOOLEAN, "Since you\'re currently working in the industry, we would love to ask you some more detailed questions about your industry experience.\n\nWould you like to complete these additional questions? "),
+    Question('census', 'to_complete_student_questions',    BOOLEAN, "Since you\'re a student, we would love to ask you more detailed questions about your student and job searching experience.\n\nWould you like to complete these additional questions? "),
+    Question('census', 'to_complete_unemployed_questions', BOOLEAN, "Since you\'ve indicated that you used to work for a company but no longer work there, we would love to ask you more detailed questions about your experience with the previous company and your job-search process.\n\nWould you like to complete these additional questions? "),
+    Question('census', 'why_leave',          TEXT,    'Why did you leave your previous company?'),
+
+    # Company (working or used to work)
+    Question('company', 'company_satisfaction', LIKERT, [
+        'I am satisfied with my compensation',
+        'I am being underpaid compared to similar roles',
+        'I am satisfied with the raises and/or bonuses I have been receiving']),
+
+    Question('company', 'salary_base',            NUMERIC, 'What is your annual base salary?'),
+    Question('company', 'salary_comp_types',      MULTI,   'Beyond base salary, what additional compensation types do you receive?'),
+    Question('company', 'salary_num_raises',      SINGLE,  'How many times have you received a base salary increase over the past 12 months of employment?'),
+    Question('company', 'salary_num_bonuses',     SINGLE,  'How many times have you received a bonus over the past 12 months of employment?'),
+
+    Question('company', 'company_years_with',     NUMERIC, 'How many years have you been with the company?'),
+    Question('company', 'company_value_chain',    MULTI,   'Where does the company fall on the battery value chain?'),
+    Question('company', 'company_stage',          SINGLE,  'How would you classify your company\'s stage of development?'),
+    Question('company', 'company_country',        SINGLE,  'In what country is your office located?'),
+    Question('company', 'company_state',          SINGLE,  'In what state is your office located?'),
+    Question('company', 'company_days_in_office', NUMERIC, 'How many days did you work in the office last week?'),
+    Question('company', 'company_headcount',      SINGLE,  'How many employees work at your company?'),
+    Question('company', 'company_team_count',     SINGLE,  'What is the total headcount on your team?'),
+
+    Question('company', 'role_title',             TEXT,    'What is your current job title?'),
+    Question('company', 'role_role',              MULTI,   'What does your role involve?'),
+    Question('company', 'role_level',             SINGLE,  'What is your current level?'),
+    Question('company', 'role_why_choose',        MULTI,   'Why did you choose your current role and company?'),
+    Question('company', 'role_prev_industries',   SINGLE,  'Have you previously worked in other industries?'),
+    Question('company', 'role_prev_role',         TEXT,    'What was your previous role before joining the battery industry?'),
+
+    Question('company', 'skills_preparedness', LIKERT, [
+        'After working for 1 week?',
+        'After working for 1 month?',
+        'After working for 3 months?',
+        'Last week?']),
+
+    Question('company', 'skills_how_was_trained',  MULTI,  'When you first started your role, how were you trained?'),
+    Question('company', 'skills_how_to_improve',   MULTI,  'When you first started in the battery industry, what could have improved your job performance on day one?'),
+    Question('company', 'skills_num_internships',  SINGLE, 'How many internships did you complete before starting your current role?'),
+    Question('company', 'opinion_top_skills',      TEXT,   'In your opinion, what are the top skills that contributed to your success?'),
+    Question('company', 'opinion_hardest_to_fill', TEXT,   'In your opinion, which positions are the hardest to fill in your company?'),
+    Question('company', 'opinion_barriers',        TEXT,   'In your opinion, what do you think are the main barriers to hiring skilled talent in the battery industry?'),
+
+    Question('company', 'retention_num_employer_changes', NUMERIC, 'How many times have you changed employers in the last five years?'),
+    Question('company', 'retention_is_on_market',         BOOLEAN, 'Are you currently seeking new job opportunities?'),
+
+    Question('company', 'retention_sentiment', LIKERT, [
+        'My company has a good reputation in the industry',
+        'I want to stay with my company for at least 12 more months',
+        'I am satisfied with my current job stability',
+        'I am confident in my ability to find my next job in the industry']),
+
+    Question('company', 'retention_factors', MULTI, 'If you were offered a similar role with a different company, what factors would influence your decision accept the offer?',
+             options=['Salary, bonuses']),
+    Question('company', 'retention_misc',    TEXT,  'Is there anything else you\'d like to share about what you\'re looking for in your next role?'),
+
+    Question('company', 'benefits_priorities', LIKERT, [
+        'Mental health support',
+        'Work-life balance initiatives',
+        'Financial wellness programs',
+        'Career development opportunities']),
+
+    Question('company', 'benefits_entitlements',         MULTI,   'What benefits does your company entitle you to?',
+             options=['Educational, tuition, or continued education stipend']),
+    Question('company', 'benefits_parental_leave_weeks', NUMERIC, 'How many weeks of parental leave are you entitled to?'),
+    Question('company', 'benefits_pto_weeks',            NUMERIC, 'How many weeks of paid time off are you entitled to each year?'),
+    Question('company', 'benefits_sick_leave_days',      NUMERIC, 'How many days of sick leave are you entitled to?'),
+    Question('company', 'benefits_unique',               TEXT,    'Are there any unique benefits that you value?'),
+
+    # Student
+    Question('student', 'student_sentiment', LIKERT, [
+        'After graduating, I know what role(s) to apply to',
+        'After graduating, I will find a job',
+        'By the time I graduate, I will have learned the skills needed to find a job',
+        'I am optimistic about the future of the battery industry']),
+
+    Question('student', 'ideal_job_title',   TEXT,    'After you graduate, what would be your ideal job title?'),
+    Question('student', 'ideal_value_chain', MULTI,   'After you graduate, what part(s) of the battery value chain do you see yourself contributing to?'),
+    Question('student', 'ideal_job_aspects', MULTI,   'Which of the following aspects are you looking for in your first job?'),
+    Question('student', 'ideal_salary',      NUMERIC, 'How much do you expect to be paid for your first job?'),
+    Question('student', 'num_internships',   SINGLE,  'How many internships have you completed so far?'),
+
+    Question('student', 'internship_value_chain',         MULTI,   'During your previous internship, where did your  employer fall on the battery value chain?'),
+    Question('student', 'internship_role',                MULTI,   'During your previous internship, what did your role involve?'),
+    Question('student', 'internship_top_skills',          TEXT,    'During your previous internship, what are the top three skills that contributed to your success?'),
+    Question('student', 'internship_skills_wish_learned', TEXT,    'During your previous internship, were there skills you wish you had learned but didn\'t? If yes, what were they?'),
+    Question('student', 'internship_skills_unprepared',   TEXT,    'During your previous internship, were there skills that you felt unprepared for? If yes, what were they?'),
+    Question('student', 'internship_hourly_pay',          NUMERIC, 'During your previous internship, what was your hourly pay?'),
+    Question('student', 'internship_hours_per_week',      NUMERIC, 'During your previous internship, how many hours per week did you work, on average?'),
+)
+
+
+def questions(section : str = None, kind : str = None) -> list[Question]:
+    """
+    Return the questions of the registry, optionally of one section and/or
+    one question type
+    """
+
+    return [q for q in QUESTIONS
+            if (section is None or q.section == section)
+            and (kind is None or q.kind == kind)]
+
+
+class SchemaDriftError(KeyError):
+    """
+    Raised when the export is missing columns that the registry reads
+    """
+
+    def __init__(self, missing : list):
+
+        self.missing = missing
+        lines = [f'  {section}/{key}: {column!r}' for section, key, column in missing]
+        super().__init__(f'{len(missing)} column(s) missing from the export:\n' + '\n'.join(lines))
+
+    def __str__(self):
+        return self.args[0]
+
+
+class SchemaPlan:
+    """
+    The registry compiled against the columns of one export
+
+    `positions` maps each question whose columns are all present to the
+    position of its column(s) in the export. `missing` lists the
+    (section, key, column) of every column that is not in the export, and
+    `unexpected` the columns of the export that no question reads.
+    """
+
+    def __init__(self, columns):
+
+        columns  = list(columns)
+        position = dict()
+        for i, column in enumerate(columns):
+            position.setdefault(column, i)
+
+        self.positions  = dict()
+        self.missing    = []
+
+        for question in QUESTIONS:
+            absent = [c for c in question.columns if c not in position]
+            for column in absent:
+                self.missing.append((question.section, question.key, column))
+            if len(absent) == 0:
+                self.positions[question] = [position[c] for c in question.columns]
+
+        known = set(ID_COLUMNS).union(c for q in QUESTIONS for c in q.columns)
+        self.unexpected = [c for c in columns if c not in known]
+
+    def report(self) -> dict:
+        """
+        Schema drift report: the 'missing' and the 'unexpected' columns
+        """
+
+        return {'missing':    [column for _, _, column in self.missing],
+                'unexpected': list(self.unexpected)}
+
+    def check(self):
+        """
+        Raise a `SchemaDriftError` listing every missing column, if any
+        """
+
+        if len(self.missing) > 0:
+            raise SchemaDriftError(self.missing)
+
+    def section(self, section : str) -> list:
+        """
+        Return the (question, positions) of one section, in registry order
+        """
+
+        return [(q, pos) for q, pos in self.positions.items() if q.section == section]
+
+
+@functools.lru_cache(maxsize=16)
+def _compile(columns : tuple) -> SchemaPlan:
+    return SchemaPlan(columns)
+
+
+def compile_schema(columns) -> SchemaPlan:
+    """
+    Compile the registry against the columns of an export
+
+    Plans are memoized on the column names, so the chunks of one export, or
+    several exports with the same columns, share one plan.
+    """
+
+    return _compile(tuple(pd.Index(columns)))
@@ -0,0 +1,431 @@
+"""
+Mergeable sketches of the census answers.
+
+A sketch summarizes a stream of answers in bounded memory. It can be updated
+one chunk at a time, merged with the sketch of another shard or survey wave,
+and serialized to a JSON-compatible dictionary, so that statistics of any
+segment can be read from compact sketches instead of the raw answers.
+
+`QuantileSketch` is a KLL-style quantile sketch of a numeric question, e.g.,
+`salary_base`. Values are kept in a stack of compactors: level `h` holds
+values standing for 2^h answers each, and the capacities of the levels shrink
+geometrically down from `k` at the top. Whenever the sketch holds more values
+than all of its levels together can, the lowest level over capacity is
+sorted and every other value is promoted to the next level, alternating
+between the odd and even positions from one compaction to the next. The
+sketch thus holds at most about 3k values whatever the number of answers.
+
+Each compaction at level h shifts the rank of any value by at most 2^h; the
+sketch adds these up, so `rank_error` is a guaranteed bound on the error of
+every quantile, as a fraction of the number of answers. Until the first
+compaction (at most k answers), the quantiles are exact.
+
+`HeavyHitterSketch` is a Space-Saving sketch of the most frequent terms of
+free-text answers, e.g., `skills_demand`. Answers are normalized into words
+and n-grams (see `text_terms`), and each term is counted once per answer, so
+its count is the number of respondents who mention it. The sketch keeps at
+most `capacity` terms. Each kept term has an over-estimated count and a bound
+on the over-estimate, so its true count lies in [count - error, count]. Any
+other term was mentioned at most `floor` times. Sketches are merged as in
+Agarwal et al., "Mergeable Summaries" (2012): the counts of the union of
+their terms are added, a term missing from one sketch gets that sketch's
+`floor`, and only the `capacity` largest counts are kept. `sketch_terms`
+counts a column one chunk of rows at a time into a sketch, so that memory
+is bounded by the capacity and the chunk size, whatever the number of
+answers and the size of their vocabulary.
+"""
+
+import collections
+import re
+
+import numpy as np
+
+from src.table import (CategoricalColumn, DatetimeColumn, LikertBlock,
+                       MultiSelectColumn, NumericColumn)
+
+# Default capacity of the top compactor of a quantile sketch
+K = 256
+
+# Ratio of the capacities of two consecutive compactors
+CAPACITY_RATIO = 2 / 3
+
+# Default number of terms kept by a heavy-hitter sketch, n-gram lengths, and
+# number of rows whose terms are counted at a time
+CAPACITY  = 1000
+NGRAMS    = (1, 2)
+CHUNKSIZE = 10000
+
+# Words left out of the terms of the free-text answers
+STOPWORDS = frozenset("""
+    a about all also an and any are as at be been being but by can could do
+    does for from had has have how i if in into is it its just like me more
+    most my no not of on or our so some such than that the their them then
+    there these they this those to too us very was we were what when which
+    who will with would you your
+    """.split())
+
+# Answers are split into phrases at punctuation, e.g., into the items of a
+# comma-separated list, and n-grams do not cross phrases
+PHRASE_BREAK = re.compile(r"[,;:!?()\[\]{}/|\n]|\.(?=\s|$)|\s-\s")
+WORD = re.compile(r"[a-z0-9][a-z0-9+#&.'-]*[a-z0-9+#]|[a-z0-9]")
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL-style sketch of the quantiles of a numeric question
+    """
+
+    def __init__(self, k : int = K):
+
+        if k < 2:
+            raise ValueError(f'The sketch size must be at least 2; got {k}')
+
+        self.k     = k
+        self.n     = 0
+        self.min   = np.nan
+        self.max   = np.nan
+        self.error = 0
+
+        # Values held at each level, and number of compactions of each level
+        self.levels      = [np.zeros(0)]
+        self.compactions = [0]
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def size(self) -> int:
+        """
+        Number of values held by the sketch
+        """
+        return sum(len(values) for values in self.levels)
+
+    @property
+    def rank_error(self) -> float:
+        """
+        Bound on the rank error of any quantile, as a fraction of the number
+        of answers
+        """
+        return self.error / self.n if self.n > 0 else 0.0
+
+    def capacity(self, level : int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * CAPACITY_RATIO ** depth)))
+
+    def update(self, values, counts=None):
+        """
+        Add answers to the sketch (NaN values are left out)
+
+        With `counts`, each value stands for that many answers, e.g., for
+        value counts. A value is then held once at each level h whose bit is
+        set in its count, which adds no error.
+        """
+
+        values = np.asarray(values, dtype=float).ravel()
+        counts = np.ones(len(values), dtype=np.int64) if counts is None else \
+                 np.asarray(counts, dtype=np.int64).ravel()
+
+        is_counted = ~np.isnan(values) & (counts > 0)
+        values, counts = values[is_counted], counts[is_counted]
+        if len(values) == 0:
+            return self
+
+        self.n  += int(counts.sum())
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+
+        for level in range(int(counts.max()).bit_length()):
+            if level == len(self.levels):
+                self.levels.append(np.zeros(0))
+                self.compactions.append(0)
+            self.levels[level] = np.concatenate([self.levels[level],
+                                                 values[(counts >> level) & 1 == 1]])
+        self.compress()
+        return self
+
+    def merge(self, other):
+        """
+        Add the answers of another sketch of the same size `k`
+        """
+
+        if other.k != self.k:
+            raise ValueError(f'Cannot merge sketches of sizes {self.k} and {other.k}')
+
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.zeros(0))
+            self.compactions.append(0)
+
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], values])
+            self.compactions[level] += other.compactions[level]
+
+        self.n     += other.n
+        self.min    = np.fmin(self.min, other.min)
+        self.max    = np.fmax(self.max, other.max)
+        self.error += other.error
+
+        self.compress()
+        return self
+
+    def compress(self):
+        """
+        Compact the lowest level over capacity, as long as the sketch holds
+        more values than all of its levels together can
+        """
+
+        while self.size > sum(self.capacity(level) for level in range(len(self.levels))):
+
+            level = next(level for level, values in enumerate(self.levels)
+                         if len(values) > self.capacity(level))
+
+            if level + 1 == len(self.levels):
+                self.levels.append(np.zeros(0))
+                self.compactions.append(0)
+
+            # An odd value out stays at its level
+            values = np.sort(self.levels[level])
+            kept   = len(values) % 2
+            offset = self.compactions[level] % 2
+
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1],
+                                                     values[kept + offset::2]])
+            self.levels[level] = values[:kept]
+            self.compactions[level] += 1
+            self.error += 2 ** level
+
+    def weighted_values(self) -> tuple:
+        """
+        Values held by the sketch, sorted, with the number of answers each
+        stands for
+        """
+
+        values  = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_values), 2 ** level, dtype=np.int64)
+                                  for level, level_values in enumerate(self.levels)])
+
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Quantile(s) `q` between 0 and 1, interpolated linearly between ranks
+        as `np.quantile` would return
+        """
+
+        q = np.asarray(q, dtype=float)
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError('Quantiles must be between 0 and 1')
+
+        if self.n == 0:
+            return np.full(q.shape, np.nan)[()]
+
+        values, weights = self.weighted_values()
+        cumulative = np.cumsum(weights)
+
+        position = q * (self.n - 1)
+        lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+        upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+        res   = lower + (position - np.floor(position)) * (upper - lower)
+
+        # The extremes are known exactly
+        res = np.where(q == 0, self.min, np.where(q == 1, self.max, res))
+        return res[()]
+
+    def median(self) -> float:
+        return float(self.quantile(0.5))
+
+    def percentiles(self, percentiles=(25, 50, 75)) -> dict:
+        """
+        Percentiles of the answers, keyed by percentile
+        """
+        return dict(zip(percentiles, np.atleast_1d(self.quantile(np.array(percentiles) / 100)).tolist()))
+
+    def to_dict(self) -> dict:
+        """
+        JSON-compatible representation of the sketch
+        """
+
+        res = dict()
+        res['k']           = self.k
+        res['n']           = self.n
+        res['min']         = None if np.isnan(self.min) else float(self.min)
+        res['max']         = None if np.isnan(self.max) else float(self.max)
+        res['error']       = self.error
+        res['levels']      = [values.tolist() for values in self.levels]
+        res['compactions'] = list(self.compactions)
+        return res
+
+    @classmethod
+    def from_dict(cls, res : dict):
+        sketch = cls(res['k'])
+        sketch.n           = res['n']
+        sketch.min         = np.nan if res['min'] is None else res['min']
+        sketch.max         = np.nan if res['max'] is None else res['max']
+        sketch.error       = res['error']
+        sketch.levels      = [np.array(values, dtype=float) for values in res['levels']]
+        sketch.compactions = list(res['compactions'])
+        return sketch
+
+
+def text_terms(text : str, ngrams=NGRAMS) -> list:
+    """
+    Distinct terms of a free-text answer: its lower-cased words, without
+    punctuation or stop words, and the n-grams of consecutive words within
+    each phrase
+    """
+
+    phrases = []
+    for phrase in PHRASE_BREAK.split(text.lower()):
+        words = [word.removesuffix("'s") for word in WORD.findall(phrase)]
+        phrases.append([word for word in words if word not in STOPWORDS])
+
+    terms = dict()
+    for n in ngrams:
+        for words in phrases:
+            for start in range(len(words) - n + 1):
+                terms[' '.join(words[start:start + n])] = None
+    return list(terms)
+
+
+def count_terms(column, idx, ngrams=NGRAMS) -> dict:
+    """
+    Number of answers that mention each term, in a free-text column at rows
+    `idx`
+
+    Each distinct answer is only split into terms once. The counts hold every
+    term of the answers; see `sketch_terms` to count many rows in bounded
+    memory.
+    """
+
+    if isinstance(column, (MultiSelectColumn, NumericColumn, DatetimeColumn, LikertBlock, np.ndarray)):
+        raise TypeError(f'Terms can only be counted in free-text answers, not in a '
+                        f'{type(column).__name__}')
+
+    if isinstance(column, CategoricalColumn):
+        codes = column.codes[idx]
+        answers, counts = np.unique(codes[codes >= 0], return_counts=True)
+        answers = [column.categories[code] for code in answers.tolist()]
+    else:
+        counts = collections.Counter(value for value in column.rows(idx) if isinstance(value, str))
+        answers, counts = list(counts), list(counts.values())
+
+    res = collections.Counter()
+    for answer, count in zip(answers, np.asarray(counts).tolist()):
+        for term in text_terms(str(answer), ngrams):
+            res[term] += count
+    return dict(res)
+
+
+class HeavyHitterSketch:
+    """
+    Mergeable Space-Saving sketch of the most frequent terms
+    """
+
+    def __init__(self, capacity : int = CAPACITY):
+
+        if capacity < 1:
+            raise ValueError(f'The sketch must keep at least one term; got {capacity}')
+
+        self.capacity = capacity
+        self.n        = 0
+
+        # Over-estimated count of each kept term, and bound on the over-estimate
+        self.counts = dict()
+        self.errors = dict()
+
+        # Most times any term that is not kept may have been counted
+        self.floor = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, counts : dict):
+        """
+        Add the counts of terms, e.g., from `count_terms`
+        """
+
+        other = HeavyHitterSketch(self.capacity)
+        other.counts = {term: count for term, count in counts.items() if count > 0}
+        other.errors = dict.fromkeys(other.counts, 0)
+        other.n      = sum(other.counts.values())
+        other.prune()
+
+        return self.merge(other)
+
+    def merge(self, other):
+        """
+        Add the terms of another sketch
+        """
+
+        counts, errors = dict(), dict()
+        for term in list(self.counts) + [term for term in other.counts if term not in self.counts]:
+            counts[term] = self.counts.get(term, self.floor) + other.counts.get(term, other.floor)
+            errors[term] = self.errors.get(term, self.floor) + other.errors.get(term, other.floor)
+
+        self.counts = counts
+        self.errors = errors
+        self.n     += other.n
+        self.floor += other.floor
+        self.prune()
+        return self
+
+    def prune(self):
+        """
+        Keep the `capacity` terms with the largest counts
+        """
+
+        if len(self.counts) <= self.capacity:
+            return
+
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        self.floor  = max(self.floor, ranked[self.capacity][1])
+        self.counts = dict(ranked[:self.capacity])
+        self.errors = {term: self.errors[term] for term in self.counts}
+
+    def top(self, k : int = 20) -> list:
+        """
+        The `k` terms with the largest counts, as (term, count, error) tuples:
+        the term was counted between `count - error` and `count` times
+        """
+
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(term, count, self.errors[term]) for term, count in ranked[:k]]
+
+    def to_dict(self) -> dict:
+        """
+        JSON-compatible representation of the sketch
+        """
+
+        res = dict()
+        res['capacity'] = self.capacity
+        res['n']        = self.n
+        res['floor']    = self.floor
+        res['counts']   = {term: [count, self.errors[term]] for term, count in self.counts.items()}
+        return res
+
+    @classmethod
+    def from_dict(cls, res : dict):
+        sketch = cls(res['capacity'])
+        sketch.n      = res['n']
+        sketch.floor  = res['floor']
+        sketch.counts = {term: count for term, (count, _) in res['counts'].items()}
+        sketch.errors = {term: error for term, (_, error) in res['counts'].items()}
+        return sketch
+
+
+def sketch_terms(column, idx, ngrams=NGRAMS, capacity : int = CAPACITY,
+                 chunksize : int = CHUNKSIZE) -> HeavyHitterSketch:
+    """
+    Heavy-hitter sketch of the terms of a free-text column at rows `idx`
+
+    The terms of `chunksize` rows at a time are counted with `count_terms`
+    and added to the sketch, so that only the sketch and the terms of one
+    chunk are ever held. With a single chunk, the counts of the kept terms
+    are exact.
+    """
+
+    idx    = np.asarray(idx, dtype=np.int64)
+    sketch = HeavyHitterSketch(capacity)
+    for start in range(0, len(idx), chunksize):
+        sketch.update(count_terms(column, idx[start:start + chunksize], ngrams))
+    return sketch
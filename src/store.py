@@ -0,0 +1,88 @@
+"""
+Memory-mapped storage of the parsed census responses.
+
+A store is a directory holding one `.npy` file per array of a
+`RespondentTable` (numeric arrays, Likert matrices, categorical and
+multi-select codes, status flags) and a `manifest.json` describing the
+columns. Opening a store only reads the manifest; each column is memory-mapped
+when it is first accessed, so a filter or summary only pages in the columns it
+touches, and processes opening the same store share the pages of the OS file
+cache instead of holding copies.
+"""
+
+import json
+import pathlib
+import shutil
+
+import numpy as np
+
+from src.table import RespondentTable
+
+MANIFEST = 'manifest.json'
+
+
+class NpyDirectory:
+    """
+    Read-only mapping from array names to the `.npy` files of a store
+    """
+
+    def __init__(self, path, mmap : bool = True):
+
+        self.path = pathlib.Path(path)
+        self.mmap_mode = 'r' if mmap else None
+
+    def __getitem__(self, name : str) -> np.ndarray:
+        return np.load(self.path / f'{name}.npy', mmap_mode=self.mmap_mode)
+
+
+def save(respondent_table : RespondentTable, path, overwrite : bool = False):
+    """
+    Write a table to a store directory
+
+    Parameters
+    ----------
+    respondent_table : RespondentTable
+        Parsed responses; to store several waves or partner surveys together,
+        combine them first with `RespondentTable.concat`
+    path : str or pathlib.Path
+        Directory of the store
+    overwrite : bool
+        Replace an existing store at `path`
+    """
+
+    path = pathlib.Path(path)
+
+    if path.exists():
+        if not overwrite:
+            raise FileExistsError(f'Store already exists: {path}')
+        shutil.rmtree(path)
+
+    arrays, manifest = respondent_table.to_arrays()
+
+    for name, values in arrays.items():
+        file = path / f'{name}.npy'
+        file.parent.mkdir(parents=True, exist_ok=True)
+        np.save(file, np.ascontiguousarray(values))
+
+    with open(path / MANIFEST, 'w') as f:
+        json.dump(manifest, f)
+
+
+def open_store(path, mmap : bool = True) -> RespondentTable:
+    """
+    Open a store directory as a table whose columns are loaded on first access
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Directory of the store
+    mmap : bool
+        Memory-map the arrays (default) rather than reading them into memory
+    """
+
+    path = pathlib.Path(path)
+
+    with open(path / MANIFEST) as f:
+        manifest = json.load(f)
+
+    return RespondentTable.from_arrays(NpyDirectory(path, mmap), manifest, lazy=True)
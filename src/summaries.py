@@ -0,0 +1,411 @@
+"""
+The census summaries, computed from the rows of a `RespondentTable`.
+
+Each summary is a function of a table, the rows of the population it covers
+and optional weights (one per row), and returns the dictionary published by
+the `Analyst.summarize_*` method of the same name. `SUMMARIES` lists them
+with their population:
+
+- 'all': every respondent of the subset
+- 'working': respondents of the subset who completed the "Company" questions
+- 'student': students who completed the "Student" questions
+
+`report` computes all of them at once. The respondent rows, the populations
+and the weights are resolved once and shared by every summary, instead of
+once per summary, and each column is read in a single vectorized pass.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+import src.aggregates as aggregates
+import src.likert as likert
+import src.utils as utils
+
+
+def count_rows(column, idx, weights=None) -> dict:
+    """
+    Dictionary counter of the answers in a column at rows `idx`, optionally
+    weighted (one weight per row of `idx`)
+    """
+
+    if hasattr(column, 'count'):
+        return column.count(idx, weights)
+
+    return utils.count_values(column.rows(idx), weights=weights)
+
+
+def collect_rows(column, idx) -> list:
+    """
+    List of the non-missing answers in a column at rows `idx`
+    """
+
+    if hasattr(column, 'collect'):
+        return column.collect(idx)
+
+    values = []
+    for value in column.rows(idx):
+        utils.nanappend(values, value)
+    return values
+
+
+def likert_summary(block, idx, submit_time=None, weights=None) -> dict:
+    """
+    Answers of a Likert block at rows `idx` with their mean and standard
+    deviation (see `src.likert`), as the `summarize_*` methods return them
+    """
+
+    statistics = block.summarize(idx, weights)
+
+    res = dict()
+    res['keys']   = block.keys
+    res['values'] = likert.decode(block.answers[idx])
+    if submit_time is not None:
+        res['submit_time'] = submit_time
+    res['mean']   = statistics['mean']
+    res['stdev']  = statistics['stdev']
+    return res
+
+
+def select_weights(table, idx, weights=None):
+    """
+    Weights of the rows `idx` of a table, from weights given for every row of
+    the table (None if unweighted)
+    """
+
+    if weights is None:
+        return None
+
+    weights = np.asarray(weights, dtype=float)
+    if len(weights) != len(table):
+        raise ValueError(f'Expected one weight per respondent ({len(table)}), got {len(weights)}')
+
+    return weights[idx]
+
+
+def nanmedian(values, weights=None) -> float:
+    """
+    Median of the non-missing values, optionally weighted
+
+    The weighted median only depends on the relative weights (see
+    `utils.weighted_medians`), so raking weights of any scale give the same
+    median, and uniform weights give that of `np.nanmedian`.
+    """
+
+    if weights is None:
+        return np.nanmedian(values)
+
+    is_value = ~np.isnan(values)
+    order = np.argsort(values[is_value], kind='stable')
+    return float(utils.weighted_medians(values[is_value][order], weights[is_value][order])[0])
+
+
+def nanstd(values, weights=None) -> float:
+    """
+    Standard deviation of the non-missing values, optionally weighted
+    """
+
+    if weights is None:
+        return np.nanstd(values)
+
+    is_value = ~np.isnan(values)
+    return aggregates.weighted_std(values[is_value], weights[is_value])
+
+
+def submit_times(table, idx) -> np.ndarray:
+    """
+    Submit time of each row of `idx`, as returned with the sentiment answers
+    """
+
+    return np.array(table.metadata['submit_time'].rows(idx))
+
+
+def census_sentiment(table, idx, weights=None) -> dict:
+
+    return likert_summary(table.census['sentiment'], idx, submit_times(table, idx), weights)
+
+
+def census_skills_demand(table, idx, weights=None) -> dict:
+
+    census = table.census
+
+    res = dict()
+    res['skills_in_demand'] = collect_rows(census['skills_demand'], idx)
+    res['value_chain_in_demand'] = count_rows(census['skills_value_chain'], idx, weights)
+
+    return res
+
+
+def census_backgrounds(table, idx, weights=None) -> dict:
+
+    census = table.census
+
+    res = dict()
+    res['degree']           = count_rows(census['degree'], idx, weights)
+    res['country']          = count_rows(census['country'], idx, weights)
+    res['state']            = count_rows(census['state'], idx, weights)
+    res['education']        = count_rows(census['education'], idx, weights)
+    res['ethnicity']        = count_rows(census['ethnicity'], idx, weights)
+    res['gender']           = count_rows(census['gender'], idx, weights)
+    res['citizenship']      = count_rows(census['citizenship'], idx, weights)
+    res['military_status']  = count_rows(census['military_status'], idx, weights)
+    res['employment_status'] = count_rows(census['employment_status'], idx, weights)
+
+    return res
+
+
+def company_satisfaction(table, idx, weights=None) -> dict:
+
+    return likert_summary(table.company['company_satisfaction'], idx,
+                          submit_times(table, idx), weights)
+
+
+def company_salary(table, idx, weights=None) -> dict:
+
+    company = table.company
+
+    salary_base_list = company['salary_base'].values[idx]
+
+    res = dict()
+    res['salary_base_median'] = nanmedian(salary_base_list, weights)
+    res['salary_base_std']    = nanstd(salary_base_list, weights)
+    res['salary_base_list']   = salary_base_list
+    res['salary_num_raises']  = count_rows(company['salary_num_raises'], idx, weights)
+    res['salary_num_bonuses'] = count_rows(company['salary_num_bonuses'], idx, weights)
+    res['salary_comp_types']  = utils.sort_dict(count_rows(company['salary_comp_types'], idx, weights))
+
+    return res
+
+
+def company_info(table, idx, weights=None) -> dict:
+
+    company = table.company
+
+    num_years_with_company_list = company['company_years_with'].values[idx]
+
+    res = dict()
+    res['num_years_with_company_median'] = nanmedian(num_years_with_company_list, weights)
+    res['num_years_with_company_list'] = num_years_with_company_list
+    res['company_value_chain'] = count_rows(company['company_value_chain'], idx, weights)
+    res['company_stage'] = count_rows(company['company_stage'], idx, weights)
+    res['company_country'] = count_rows(company['company_country'], idx, weights)
+    res['company_state'] = count_rows(company['company_state'], idx, weights)
+    res['num_days_in_office_list'] = company['company_days_in_office'].values[idx]
+    res['company_headcount'] = count_rows(company['company_headcount'], idx, weights)
+    res['company_team_count'] = count_rows(company['company_team_count'], idx, weights)
+
+    return res
+
+
+def company_role(table, idx, weights=None) -> dict:
+
+    company = table.company
+
+    res = dict()
+    res['role_title_list'] = collect_rows(company['role_title'], idx)
+    res['role_role'] = count_rows(company['role_role'], idx, weights)
+    res['role_level'] = count_rows(company['role_level'], idx, weights)
+    res['role_why_choose'] = count_rows(company['role_why_choose'], idx, weights)
+    res['role_prev_industries'] = count_rows(company['role_prev_industries'], idx, weights)
+    res['role_prev_role_list'] = collect_rows(company['role_prev_role'], idx)
+
+    return res
+
+
+def company_skills(table, idx, weights=None) -> dict:
+
+    company = table.company
+
+    res = dict()
+    res['barriers_to_talent_list'] = collect_rows(company['opinion_barriers'], idx)
+    res['hardest_to_fill_positions_list'] = collect_rows(company['opinion_hardest_to_fill'], idx)
+    res['top_skills_for_success_list'] = collect_rows(company['opinion_top_skills'], idx)
+    res['skills_how_to_improve'] = count_rows(company['skills_how_to_improve'], idx, weights)
+    res['skills_how_was_trained'] = count_rows(company['skills_how_was_trained'], idx, weights)
+    res['num_previous_internships'] = count_rows(company['skills_num_internships'], idx, weights)
+    res['skills_preparedness_sentiment'] = likert_summary(company['skills_preparedness'], idx, weights=weights)
+
+    return res
+
+
+def company_retention(table, idx, weights=None) -> dict:
+
+    company = table.company
+
+    res = dict()
+    res['retention_factors'] = count_rows(company['retention_factors'], idx, weights)
+    res['retention_is_on_market'] = count_rows(company['retention_is_on_market'], idx, weights)
+    res['retention_misc_list'] = collect_rows(company['retention_misc'], idx)
+    res['retention_num_employer_changes'] = count_rows(company['retention_num_employer_changes'], idx, weights)
+    res['retention_sentiment'] = likert_summary(company['retention_sentiment'], idx, weights=weights)
+
+    return res
+
+
+def company_benefits(table, idx, weights=None) -> dict:
+
+    company = table.company
+
+    res = dict()
+    res['entitlements'] = count_rows(company['benefits_entitlements'], idx, weights)
+    res['parental_leave_weeks'] = count_rows(company['benefits_parental_leave_weeks'], idx, weights)
+    res['pto_weeks'] = count_rows(company['benefits_pto_weeks'], idx, weights)
+    res['sick_leave_days'] = count_rows(company['benefits_sick_leave_days'], idx, weights)
+    res['unique_benefits_list'] = collect_rows(company['benefits_unique'], idx)
+    res['benefits_priorities'] = likert_summary(company['benefits_priorities'], idx, weights=weights)
+
+    return res
+
+
+def student_sentiment(table, idx, weights=None) -> dict:
+
+    return likert_summary(table.student['student_sentiment'], idx,
+                          submit_times(table, idx), weights)
+
+
+def student_backgrounds(table, idx, weights=None) -> dict:
+
+    census = table.census
+
+    res = dict()
+    res['degree']           = count_rows(census['degree'], idx, weights)
+    res['country']          = count_rows(census['country'], idx, weights)
+    res['state']            = count_rows(census['state'], idx, weights)
+    res['education']        = count_rows(census['education'], idx, weights)
+
+    return res
+
+
+def student_ideal(table, idx, weights=None) -> dict:
+
+    student = table.student
+
+    ideal_salary_list = student['ideal_salary'].values[idx]
+    ideal_salary_list = ideal_salary_list[~np.isnan(ideal_salary_list)]
+
+    res = dict()
+    res['ideal_job_title_list'] = collect_rows(student['ideal_job_title'], idx)
+    res['ideal_value_chain'] = count_rows(student['ideal_value_chain'], idx, weights)
+    res['ideal_job_aspects'] = count_rows(student['ideal_job_aspects'], idx, weights)
+    res['ideal_salary_list'] = ideal_salary_list
+    res['ideal_salary_median'] = nanmedian(student['ideal_salary'].values[idx], weights)
+
+    return res
+
+
+def student_internship(table, idx, weights=None) -> dict:
+
+    student = table.student
+
+    # to be implemented with LLM: vc, role, skills
+
+    hourly_pay = student['internship_hourly_pay'].values[idx]
+    hours_per_week = student['internship_hours_per_week'].values[idx]
+
+    res = dict()
+    res['num_internships'] = count_rows(student['num_internships'], idx, weights)
+    res['internship_value_chain'] = count_rows(student['internship_value_chain'], idx, weights)
+    res['internship_role'] = count_rows(student['internship_role'], idx, weights)
+    res['internship_top_skills_list'] = collect_rows(student['internship_top_skills'], idx)
+    res['internship_skills_wish_learned_list'] = collect_rows(student['internship_skills_wish_learned'], idx)
+    res['internship_skills_unprepared_list'] = collect_rows(student['internship_skills_unprepared'], idx)
+    res['internship_hourly_pay_list'] = hourly_pay[~np.isnan(hourly_pay)]
+    res['internship_hours_per_week_list'] = hours_per_week[~np.isnan(hours_per_week)]
+
+    return res
+
+
+def stats(table) -> dict:
+    """
+    Respondent counts and survey durations of every respondent of a table
+    """
+
+    flags = table.flags
+    duration_mins = table.metadata['duration_mins'].values
+
+    # Initialize dictionary of counters
+    summary = defaultdict(lambda: 0)
+
+    summary['num_total'] = len(table)
+
+    # Tabulate the counts and completion times within each subgroup
+    mins = dict()
+    for group in ['working', 'unemployed', 'student']:
+
+        is_group     = flags[f'is_{group}']
+        is_completed = is_group & flags[f'is_{group}_and_completed_all_questions']
+
+        summary[f'num_{group}'] = int(is_group.sum())
+        summary[f'num_{group}_and_completed_all_questions'] = int(is_completed.sum())
+
+        mins[group] = duration_mins[is_group & ~is_completed].tolist()
+        mins[f'{group}_completed'] = duration_mins[is_completed].tolist()
+
+    # Assign duration metrics and list of raw values
+    groups = ['working', 'working_completed', 'student', 'student_completed',
+              'unemployed', 'unemployed_completed']
+
+    for group in groups:
+        summary[f'mins_{group}_median'] = np.median(mins[group])
+
+    for group in groups:
+        summary[f'mins_{group}_list'] = mins[group]
+
+    # For plotting number of response over time
+    # Sort the response times in ascending order and get corresponding count
+    submitted_at = table.submitted_at.values
+    summary['response_by_time_datetime'] = np.sort(submitted_at)
+    summary['response_by_time_num'] = np.arange(1, len(submitted_at) + 1)
+
+    return summary
+
+
+# Summaries by name (the `Analyst.summarize_*` method without its prefix),
+# with the population they cover
+SUMMARIES = {'census_backgrounds'    : ('all', census_backgrounds),
+             'census_sentiment'      : ('all', census_sentiment),
+             'census_skills_demand'  : ('all', census_skills_demand),
+             'company_salary'        : ('working', company_salary),
+             'company_info'          : ('working', company_info),
+             'company_role'          : ('working', company_role),
+             'company_skills'        : ('working', company_skills),
+             'company_retention'     : ('working', company_retention),
+             'company_benefits'      : ('working', company_benefits),
+             'company_satisfaction'  : ('working', company_satisfaction),
+             'student_sentiment'     : ('student', student_sentiment),
+             'student_backgrounds'   : ('student', student_backgrounds),
+             'student_ideal'         : ('student', student_ideal),
+             'student_internship'    : ('student', student_internship)}
+
+
+def report(populations : dict, weights=None, names=None) -> dict:
+    """
+    Compute summaries of shared populations in one pass
+
+    Parameters
+    ----------
+    populations : dict
+        Table and rows of each population, e.g., {'working': (table, idx)}
+    weights : np.ndarray, optional
+        Weight of every row of the tables
+    names : list of str, optional
+        Summaries to compute (all of `SUMMARIES` by default)
+
+    Returns
+    -------
+    dict from summary name to the summary
+    """
+
+    names = SUMMARIES if names is None else names
+
+    # Rows and weights of each population, selected once
+    selected = dict()
+    for population, (table, idx) in populations.items():
+        selected[population] = table, idx, select_weights(table, idx, weights)
+
+    res = dict()
+    for name in names:
+        population, summarize = SUMMARIES[name]
+        res[name] = summarize(*selected[population])
+    return res
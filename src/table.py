@@ -0,0 +1,709 @@
+"""
+Columnar storage of the parsed census responses.
+
+The `RespondentTable` keeps every question as one typed column (a struct of
+arrays) instead of a dictionary of answers per respondent:
+
+- `NumericColumn`      : numeric answers as a numpy array (NaN when missing)
+- `DatetimeColumn`     : timestamps as a datetime64 array (NaT when missing)
+- `CategoricalColumn`  : single-choice and text answers as integer codes into
+                         a list of categories (-1 when missing)
+- `MultiSelectColumn`  : multi-select answers as offset-encoded lists of codes
+- `LikertBlock`        : a block of Likert questions as a 2D array of small
+                         integers with rows holding each response and columns
+                         for each question (0 when missing)
+
+A `Respondent` is a lightweight view over one row of the table.
+"""
+
+from collections.abc import Mapping
+
+import pandas as pd
+import numpy as np
+
+import src.parser as parser
+import src.likert as likert
+import src.utils as utils
+
+
+class NumericColumn:
+
+    def __init__(self, values : np.ndarray):
+
+        self.values = np.asanyarray(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def row(self, i):
+        return self.values[i]
+
+    def rows(self, idx) -> list:
+        return list(self.values[idx])
+
+    def take(self, idx):
+        return NumericColumn(self.values[idx])
+
+    def to_arrays(self) -> tuple:
+        return {'values': self.values}, {'type': 'numeric'}
+
+    @classmethod
+    def from_arrays(cls, arrays, spec):
+        return cls(arrays['values'])
+
+
+class DatetimeColumn:
+
+    def __init__(self, values : np.ndarray):
+
+        self.values = np.asanyarray(values, dtype='datetime64[ns]')
+
+    def __len__(self):
+        return len(self.values)
+
+    def row(self, i):
+        return pd.Timestamp(self.values[i])
+
+    def rows(self, idx) -> list:
+        return pd.DatetimeIndex(self.values[idx]).tolist()
+
+    def take(self, idx):
+        return DatetimeColumn(self.values[idx])
+
+    def to_arrays(self) -> tuple:
+        return {'values': self.values}, {'type': 'datetime'}
+
+    @classmethod
+    def from_arrays(cls, arrays, spec):
+        return cls(arrays['values'])
+
+
+class CategoricalColumn:
+
+    def __init__(self, codes : np.ndarray, categories : list, na_value=np.nan):
+
+        self.codes      = np.asanyarray(codes, dtype=np.int32)
+        self.categories = list(categories)
+        self.na_value   = na_value
+
+        # Lookup table from code to value; the last entry holds the missing
+        # value so that a code of -1 maps onto it
+        self._lookup = np.array(self.categories + [na_value], dtype=object)
+
+    @classmethod
+    def from_values(cls, values, na_value=np.nan):
+        """
+        Encode a sequence of answers as codes into the list of unique answers,
+        in order of first appearance
+        """
+        codes, categories = pd.factorize(np.asarray(values, dtype=object),
+                                         use_na_sentinel=True)
+        return cls(codes, categories.tolist(), na_value)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def row(self, i):
+        return self._lookup[self.codes[i]]
+
+    def rows(self, idx) -> list:
+        return self._lookup[self.codes[idx]].tolist()
+
+    def take(self, idx):
+        return CategoricalColumn(self.codes[idx], self.categories, self.na_value)
+
+    def count(self, idx, weights=None) -> dict:
+        """
+        Dictionary counter of the answers at rows `idx`, as built by
+        `utils.update_dict_counter`: answers in order of first appearance, and
+        '_tot_' counting the rows that answered
+
+        With `weights` (one per row of `idx`), each row counts for its weight.
+        """
+        return utils.count_codes(self.codes[idx], self.categories, weights=weights)
+
+    def collect(self, idx) -> list:
+        """
+        List of the answers at rows `idx`, leaving out the missing ones
+        """
+        codes = self.codes[idx]
+        return self._lookup[codes[codes >= 0]].tolist()
+
+    def to_arrays(self) -> tuple:
+        spec = {'type': 'categorical',
+                'categories': self.categories,
+                'na_value': None if self.na_value is None else 'nan'}
+        return {'codes': self.codes}, spec
+
+    @classmethod
+    def from_arrays(cls, arrays, spec):
+        na_value = None if spec['na_value'] is None else np.nan
+        return cls(arrays['codes'], spec['categories'], na_value)
+
+    def code_of(self, value) -> int:
+        """
+        Return the code of an answer, or -1 if nobody gave that answer
+        """
+        try:
+            return self.categories.index(value)
+        except ValueError:
+            return -1
+
+    def mask_equal(self, value) -> np.ndarray:
+        """
+        Boolean mask of the rows whose answer is `value`
+        """
+        code = self.code_of(value)
+        if code < 0:
+            return np.zeros(len(self), dtype=bool)
+        return self.codes == code
+
+
+class MultiSelectColumn:
+
+    def __init__(self, offsets : np.ndarray, codes : np.ndarray, categories : list):
+
+        self.offsets    = np.asanyarray(offsets, dtype=np.int64)
+        self.codes      = np.asanyarray(codes, dtype=np.int32)
+        self.categories = list(categories)
+
+        self._lookup = np.array(self.categories, dtype=object)
+
+    @classmethod
+    def from_lists(cls, lists):
+        """
+        Encode a sequence of lists of selected options
+        """
+        lengths = np.fromiter((len(x) for x in lists), dtype=np.int64, count=len(lists))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        flat = np.empty(offsets[-1], dtype=object)
+        flat[:] = [option for options in lists for option in options]
+        codes, categories = pd.factorize(flat)
+
+        return cls(offsets, codes, categories.tolist())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def row_index(self) -> np.ndarray:
+        """
+        Row number of each entry in `codes`
+        """
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def row(self, i) -> list:
+        return self._lookup[self.codes[self.offsets[i]:self.offsets[i + 1]]].tolist()
+
+    def rows(self, idx) -> list:
+        return [self.row(i) for i in idx]
+
+    def take(self, idx):
+        offsets, positions = self._gather(idx)
+        return MultiSelectColumn(offsets, self.codes[positions], self.categories)
+
+    def _gather(self, idx) -> tuple:
+        """
+        Offsets of the rows `idx` and position of each of their entries in
+        `codes`
+        """
+        idx     = np.asarray(idx, dtype=np.int64)
+        starts  = self.offsets[idx]
+        lengths = self.offsets[idx + 1] - starts
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        return offsets, positions
+
+    def long_format(self, idx=None) -> tuple:
+        """
+        Return the answers as a long-format table of (row, option code) pairs,
+        one pair per selected option, for all rows or the rows `idx`
+
+        Rows are numbered by their position in `idx` if it is given.
+        """
+        if idx is None:
+            return self.row_index(), self.codes
+
+        offsets, positions = self._gather(idx)
+        rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+        return rows, self.codes[positions]
+
+    def count(self, idx, weights=None) -> dict:
+        """
+        Dictionary counter of the options selected at rows `idx`, as built by
+        `utils.update_dict_counter`: options in order of first appearance, and
+        '_tot_' counting the rows that selected at least one option
+
+        With `weights` (one per row of `idx`), each row counts for its weight.
+        """
+        rows, codes = self.long_format(idx)
+        return utils.count_codes(codes, self.categories, rows, len(idx), weights)
+
+    def to_arrays(self) -> tuple:
+        spec = {'type': 'multiselect', 'categories': self.categories}
+        return {'offsets': self.offsets, 'codes': self.codes}, spec
+
+    @classmethod
+    def from_arrays(cls, arrays, spec):
+        return cls(arrays['offsets'], arrays['codes'], spec['categories'])
+
+    def code_of(self, value) -> int:
+        try:
+            return self.categories.index(value)
+        except ValueError:
+            return -1
+
+    def mask_contains(self, value) -> np.ndarray:
+        """
+        Boolean mask of the rows that selected `value`
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        code = self.code_of(value)
+        if code >= 0:
+            mask[self.row_index()[self.codes == code]] = True
+        return mask
+
+
+class LikertBlock:
+
+    def __init__(self, keys : list, answers : np.ndarray):
+
+        self.keys    = list(keys)
+        self.answers = np.asanyarray(answers)
+
+    @classmethod
+    def from_values(cls, keys : list, values):
+        """
+        Encode a block of Likert answers given as floats (NaN when missing)
+        """
+        return cls(keys, likert.encode(values))
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        The answers as floats (NaN when missing)
+        """
+        return likert.decode(self.answers)
+
+    def __len__(self):
+        return len(self.answers)
+
+    def row(self, i) -> dict:
+        return {'keys': self.keys, 'values': likert.decode(self.answers[i])}
+
+    def take(self, idx):
+        return LikertBlock(self.keys, self.answers[idx])
+
+    def summarize(self, idx=None, weights=None) -> dict:
+        """
+        Statistics of each question at rows `idx`, optionally weighted (see
+        `src.likert`)
+        """
+        return likert.summarize(self, idx, weights=weights)
+
+    def to_arrays(self) -> tuple:
+        spec = {'type': 'likert', 'keys': self.keys, 'encoding': 'answers'}
+        return {'answers': self.answers}, spec
+
+    @classmethod
+    def from_arrays(cls, arrays, spec):
+        # Stores written before the answers were encoded hold the floats
+        if spec.get('encoding') != 'answers':
+            return cls.from_values(spec['keys'], arrays['values'])
+        return cls(spec['keys'], arrays['answers'])
+
+
+class SectionView(Mapping):
+    """
+    Read-only view of the answers of one respondent to one section, with the
+    same keys as the columns of that section
+    """
+
+    __slots__ = ('columns', 'index')
+
+    def __init__(self, columns : dict, index : int):
+
+        self.columns = columns
+        self.index   = index
+
+    def __getitem__(self, key):
+        return self.columns[key].row(self.index)
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RespondentTable:
+    """
+    Struct-of-arrays store of the parsed census responses
+    """
+
+    def __init__(self, tokens, census, company, student, flags,
+                       metadata=None, submitted_at=None):
+
+        self.tokens       = np.asanyarray(tokens)
+        self.census       = census    # census responses (everyone fills)
+        self.company      = company   # company responses (detailed; only some fill)
+        self.student      = student   # student responses (detailed; only some fill)
+        self.flags        = flags     # status flags as boolean arrays
+        self.metadata     = metadata  # metadata from the TypeForm export
+        self.submitted_at = submitted_at
+
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+    @classmethod
+    def from_frames(cls, df_gsheet : pd.DataFrame, df_metadata : pd.DataFrame = None):
+        """
+        Build the table from the Google Sheet export and, optionally, the
+        TypeForm metadata joined on token (see `parser.join_typeform_metadata`)
+
+        Rows follow the order of the unique tokens in the Google Sheet. The
+        company and student questions are only parsed for the respondents who
+        completed them; they are unanswered for everyone else.
+        """
+
+        df = df_gsheet.drop_duplicates(subset='Token', keep='first')
+
+        census_columns = parser.parse_census_columns(df)
+        flags = census_columns['flags']
+
+        census  = encode_columns(census_columns['census'])
+        company = encode_columns(parser.parse_company_columns(df,
+                    np.flatnonzero(flags['is_completed_industry_questions'])))
+        student = encode_columns(parser.parse_student_columns(df,
+                    np.flatnonzero(flags['is_completed_student_questions'])))
+
+        # Missing states are stored as None rather than NaN
+        census['state'] = CategoricalColumn.from_values(census_columns['census']['state'],
+                                                        na_value=None)
+
+        metadata = None
+        if df_metadata is not None:
+            df_metadata = df_metadata.reindex(pd.Index(df['Token']))
+            metadata = dict()
+            for key in df_metadata.columns:
+                values = df_metadata[key]
+                if pd.api.types.is_datetime64_any_dtype(values):
+                    metadata[key] = DatetimeColumn(values.to_numpy())
+                elif pd.api.types.is_numeric_dtype(values):
+                    metadata[key] = NumericColumn(values.to_numpy())
+                else:
+                    metadata[key] = CategoricalColumn.from_values(values.to_numpy())
+
+        submitted_at = DatetimeColumn(pd.to_datetime(df['Submitted At']).to_numpy())
+
+        return cls(df['Token'].to_numpy(), census, company, student,
+                   flags, metadata, submitted_at)
+
+
+    @classmethod
+    def from_respondents(cls, respondents_list : list) -> tuple:
+        """
+        Locate a list of `Respondent` views in their table
+
+        Returns
+        -------
+        table : RespondentTable
+        idx   : np.ndarray of row indices into `table`, in the order of
+                `respondents_list`
+        """
+
+        # All rows of a table, e.g., `RespondentViews`
+        table = getattr(respondents_list, 'table', None)
+        if table is not None:
+            return table, np.arange(len(table))
+
+        tables = {id(r.table): r.table for r in respondents_list}
+
+        if len(tables) == 1:
+            table = next(iter(tables.values()))
+            idx = np.fromiter((r.index for r in respondents_list), dtype=np.int64,
+                              count=len(respondents_list))
+            return table, idx
+
+        # Respondents from several tables are copied into a new table
+        table = cls.concat([r.table.take([r.index]) for r in respondents_list])
+        return table, np.arange(len(respondents_list))
+
+
+    def take(self, idx):
+        """
+        Return a new table holding the rows at `idx`
+        """
+
+        idx = np.asarray(idx, dtype=np.int64)
+
+        return RespondentTable(
+            self.tokens[idx],
+            {key: column.take(idx) for key, column in self.census.items()},
+            {key: column.take(idx) for key, column in self.company.items()},
+            {key: column.take(idx) for key, column in self.student.items()},
+            {flag: values[idx] for flag, values in self.flags.items()},
+            None if self.metadata is None else
+                {key: column.take(idx) for key, column in self.metadata.items()},
+            None if self.submitted_at is None else self.submitted_at.take(idx))
+
+
+    @classmethod
+    def concat(cls, tables : list):
+        """
+        Stack several tables with the same columns into one table
+
+        The optional sections (metadata) are only kept if all tables hold them.
+        """
+
+        first = tables[0]
+
+        def concat_section(section):
+            if any(getattr(t, section) is None for t in tables):
+                return None
+            return {key: concat_columns([getattr(t, section)[key] for t in tables])
+                    for key in getattr(first, section)}
+
+        return cls(np.concatenate([t.tokens for t in tables]),
+                   concat_section('census'),
+                   concat_section('company'),
+                   concat_section('student'),
+                   {flag: np.concatenate([t.flags[flag] for t in tables])
+                    for flag in first.flags},
+                   concat_section('metadata'),
+                   None if any(t.submitted_at is None for t in tables) else
+                       concat_columns([t.submitted_at for t in tables]))
+
+
+    def to_arrays(self) -> tuple:
+        """
+        Flatten the table into named numpy arrays and a JSON-serializable
+        manifest describing how to rebuild the columns from them
+
+        Array names are '<section>/<key>/<part>', e.g., 'census/gender/codes'.
+        """
+
+        arrays   = {'tokens': self.tokens.astype(str)}
+        manifest = {'num_rows': len(self), 'columns': dict()}
+
+        columns = {'submitted_at': self.submitted_at}
+        for section in SECTIONS:
+            for key, column in (getattr(self, section) or dict()).items():
+                columns[f'{section}/{key}'] = column
+
+        for name, column in columns.items():
+            if column is None:
+                continue
+            parts, spec = column.to_arrays()
+            for part, values in parts.items():
+                arrays[f'{name}/{part}'] = values
+            manifest['columns'][name] = spec
+
+        for flag, values in self.flags.items():
+            arrays[f'flags/{flag}'] = values
+        manifest['flags'] = list(self.flags)
+
+        return arrays, manifest
+
+
+    @classmethod
+    def from_arrays(cls, arrays, manifest : dict, lazy : bool = False):
+        """
+        Rebuild a table from the output of `to_arrays`
+
+        `arrays` can be any mapping from names to arrays, e.g., an open npz
+        file or a directory of memory-mapped `.npy` files. If `lazy` is set,
+        each column is only rebuilt, and its arrays only read, when it is
+        first accessed.
+        """
+
+        loaders = {section: dict() for section in SECTIONS}
+        submitted_at = None
+
+        for name, spec in manifest['columns'].items():
+            if name == 'submitted_at':
+                submitted_at = _column_loader(arrays, name, spec)
+                continue
+            section, key = name.split('/', 1)
+            loaders[section][key] = _column_loader(arrays, name, spec)
+
+        loaders['flags'] = {flag: _array_loader(arrays, f'flags/{flag}')
+                            for flag in manifest['flags']}
+
+        def build(section):
+            if not loaders[section]:
+                return None
+            if lazy:
+                return LazyMapping(loaders[section])
+            return {key: load() for key, load in loaders[section].items()}
+
+        return cls(arrays['tokens'],
+                   build('census') or dict(),
+                   build('company') or dict(),
+                   build('student') or dict(),
+                   build('flags') or dict(),
+                   build('metadata'),
+                   None if submitted_at is None else submitted_at())
+
+
+    def working_mask(self) -> np.ndarray:
+        """
+        Boolean mask of the rows who are working or used to work, and have
+        completed the "Company" questions
+        """
+
+        return self.flags['is_working_and_completed_all_questions'] | \
+               self.flags['is_unemployed_and_completed_all_questions']
+
+
+    def student_mask(self) -> np.ndarray:
+        """
+        Boolean mask of the students who completed the "Student" questions
+        """
+
+        return self.flags['is_student'] & self.flags['is_completed_all_questions']
+
+
+    def section_row(self, section : str, i : int):
+        """
+        Return a read-only view of the answers at row `i` of a section, or
+        None if the table does not hold that section
+        """
+
+        columns = getattr(self, section)
+        if columns is None:
+            return None
+        return SectionView(columns, i)
+
+
+SECTIONS = ('census', 'company', 'student', 'metadata')
+
+COLUMN_TYPES = {'numeric'     : NumericColumn,
+                'datetime'    : DatetimeColumn,
+                'categorical' : CategoricalColumn,
+                'multiselect' : MultiSelectColumn,
+                'likert'      : LikertBlock}
+
+
+class LazyMapping(Mapping):
+    """
+    Mapping whose values are built by a loader function on first access
+    """
+
+    def __init__(self, loaders : dict):
+
+        self.loaders = loaders
+        self.loaded  = dict()
+
+    def __getitem__(self, key):
+        if key not in self.loaded:
+            self.loaded[key] = self.loaders[key]()
+        return self.loaded[key]
+
+    def __iter__(self):
+        return iter(self.loaders)
+
+    def __len__(self):
+        return len(self.loaders)
+
+
+def _column_loader(arrays, name : str, spec : dict):
+    return lambda: COLUMN_TYPES[spec['type']].from_arrays(_ArrayPrefix(arrays, name), spec)
+
+
+def _array_loader(arrays, name : str):
+    return lambda: np.asanyarray(arrays[name])
+
+
+class _ArrayPrefix:
+    """
+    The arrays of one column, looked up by part name in a mapping of arrays
+    """
+
+    def __init__(self, arrays, prefix : str):
+
+        self.arrays = arrays
+        self.prefix = prefix
+
+    def __getitem__(self, part):
+        return self.arrays[f'{self.prefix}/{part}']
+
+
+def encode_columns(columns : dict) -> dict:
+    """
+    Wrap the parsed columns of one section into typed columns
+    """
+
+    encoded = dict()
+
+    for key, column in columns.items():
+        if isinstance(column, dict):
+            encoded[key] = LikertBlock.from_values(column['keys'], column['values'])
+        elif isinstance(column, parser.MultiSelectAnswers):
+            encoded[key] = MultiSelectColumn(*column)
+        elif isinstance(column, list):
+            encoded[key] = MultiSelectColumn.from_lists(column)
+        elif column.dtype == object:
+            encoded[key] = CategoricalColumn.from_values(column)
+        else:
+            encoded[key] = NumericColumn(column)
+
+    return encoded
+
+
+def concat_columns(columns : list):
+    """
+    Stack columns of the same type
+    """
+
+    first = columns[0]
+
+    if isinstance(first, LikertBlock):
+        return LikertBlock(first.keys, np.concatenate([c.answers for c in columns]))
+
+    if isinstance(first, DatetimeColumn):
+        return DatetimeColumn(np.concatenate([c.values for c in columns]))
+
+    if isinstance(first, NumericColumn):
+        return NumericColumn(np.concatenate([c.values for c in columns]))
+
+    if isinstance(first, CategoricalColumn):
+        categories, remaps = union_categories(columns)
+        # A code of -1 (missing) picks the -1 appended to each remap
+        codes = np.concatenate([np.append(remap, -1)[c.codes] for c, remap in zip(columns, remaps)])
+        return CategoricalColumn(codes, categories, first.na_value)
+
+    if isinstance(first, MultiSelectColumn):
+        categories, remaps = union_categories(columns)
+        starts  = np.cumsum([0] + [len(c.codes) for c in columns])
+        offsets = np.concatenate([c.offsets[:-1] + start for c, start in zip(columns, starts)]
+                                 + [starts[-1:]])
+        codes   = np.concatenate([remap[c.codes] for c, remap in zip(columns, remaps)])
+        return MultiSelectColumn(offsets, codes, categories)
+
+    raise TypeError(f'Cannot concatenate columns of type {type(first).__name__}')
+
+
+def union_categories(columns : list) -> tuple:
+    """
+    Union of the categories of several columns, in order of first appearance,
+    and the array mapping the codes of each column onto the union
+    """
+
+    lists      = [np.array(c.categories, dtype=object) for c in columns]
+    categories = pd.unique(np.concatenate(lists))
+    index      = pd.Index(categories, dtype=object)
+
+    remaps = [index.get_indexer(values).astype(np.int32) for values in lists]
+    return categories.tolist(), remaps
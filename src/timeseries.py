@@ -0,0 +1,208 @@
+"""
+Time series of the census responses.
+
+The submission times are parsed once when the table is built (`submitted_at`)
+and are bucketed here by integer division of their nanosecond timestamps, so
+any subset of respondents maps to its time buckets in one vectorized step.
+Every series is then read off per-bucket totals (one `np.bincount`) and their
+prefix sums along the buckets:
+
+- the number of responses per bucket (response velocity) and cumulative
+- rolling means of the Likert blocks (sentiment drift), from the prefix sums
+  of the distribution of the answers in each bucket
+- rolling medians of numeric questions, from the prefix sums of the histogram
+  of the distinct values in each bucket
+
+A rolling statistic at bucket `i` covers the trailing `window` buckets up to
+and including `i`; the total of any window is the difference of two prefix
+sums, so the cost does not grow with the window.
+"""
+
+import numpy as np
+import pandas as pd
+
+import src.utils as utils
+from src.filters import resolve_field
+from src.table import DatetimeColumn, LikertBlock, NumericColumn
+
+# Default bucket width and rolling window (in buckets)
+FREQ   = 'D'
+WINDOW = 7
+
+
+def bucket_times(times : np.ndarray, freq : str = FREQ) -> tuple:
+    """
+    Bucket the times into intervals of fixed width `freq`, e.g., 'h', 'D' or
+    '7D', aligned on the epoch
+
+    Returns the start of every bucket from the first to the last time, and
+    the bucket of each time (-1 for missing times).
+    """
+
+    try:
+        width = pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).value
+    except ValueError:
+        raise ValueError(f'Time buckets need a fixed width, e.g., "D" or "7D"; got {freq}')
+
+    times   = np.asarray(times, dtype='datetime64[ns]')
+    is_time = ~np.isnat(times)
+    periods = times[is_time].view(np.int64) // width
+
+    if len(periods) == 0:
+        return np.array([], dtype='datetime64[ns]'), np.full(len(times), -1, dtype=np.int64)
+
+    first  = periods.min()
+    starts = ((first + np.arange(periods.max() - first + 1)) * width).astype('datetime64[ns]')
+
+    buckets = np.full(len(times), -1, dtype=np.int64)
+    buckets[is_time] = periods - first
+    return starts, buckets
+
+
+def prefix_sums(totals : np.ndarray) -> np.ndarray:
+    """
+    Prefix sums of per-bucket totals along the buckets, starting from 0
+    """
+
+    zeros = np.zeros((1,) + totals.shape[1:], dtype=totals.dtype)
+    return np.concatenate([zeros, np.cumsum(totals, axis=0)])
+
+
+def rolling_sums(totals : np.ndarray, window : int) -> np.ndarray:
+    """
+    Sum of per-bucket totals over the trailing `window` buckets
+    """
+
+    if window < 1:
+        raise ValueError(f'The rolling window must cover at least one bucket; got {window}')
+
+    sums  = prefix_sums(totals)
+    upper = np.arange(1, len(totals) + 1)
+    return sums[upper] - sums[np.maximum(upper - window, 0)]
+
+
+def rolling_likert(answers : np.ndarray, buckets : np.ndarray, num_buckets : int,
+                   window : int, weights=None) -> dict:
+    """
+    Rolling count and mean of the answers of each question of a Likert block
+
+    `answers` are the encoded answers (0 when missing, see `src.likert`) of
+    the rows in `buckets`. Returns arrays of shape (buckets, questions).
+    """
+
+    num_questions = answers.shape[1]
+    levels = int(answers.max(initial=0)) + 1
+
+    if weights is not None:
+        weights = np.repeat(np.asarray(weights, dtype=float), num_questions)
+
+    keys = (buckets[:, None] * num_questions + np.arange(num_questions)) * levels + answers
+    counts = np.bincount(keys.ravel(), weights, minlength=num_buckets * num_questions * levels)
+    counts = rolling_sums(counts.reshape(num_buckets, num_questions, levels), window)
+
+    answered = counts[:, :, 1:]
+    n = answered.sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = answered @ np.arange(1, levels) / n
+
+    return {'count': n, 'mean': mean}
+
+
+def rolling_median(values : np.ndarray, buckets : np.ndarray, num_buckets : int,
+                   window : int, weights=None) -> dict:
+    """
+    Rolling count and median of the non-missing values of a numeric question
+
+    With `weights`, the median of each window is the weighted median of
+    `utils.weighted_medians`, which only depends on the relative weights.
+    """
+
+    is_value = ~np.isnan(values)
+    distinct, codes = np.unique(values[is_value], return_inverse=True)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[is_value]
+
+    # Histogram of the distinct values in each bucket, then in each window
+    counts = np.bincount(buckets[is_value] * len(distinct) + codes, weights,
+                         minlength=num_buckets * len(distinct))
+    counts = rolling_sums(counts.reshape(num_buckets, len(distinct)), window)
+
+    n = counts.sum(axis=1)
+    return {'count': n, 'median': utils.weighted_medians(distinct, counts)}
+
+
+def time_series(table, idx=None, likert=(), numeric=(), freq : str = FREQ,
+                window : int = WINDOW, weights=None, time : str = 'submitted_at') -> dict:
+    """
+    Responses over time, and rolling statistics of Likert blocks and numeric
+    questions
+
+    Parameters
+    ----------
+    table : RespondentTable
+        Respondent data
+    idx : np.ndarray, optional
+        Rows of the table (all rows by default)
+    likert : list of str
+        Likert blocks to follow, named as in `src.filters`, e.g., 'sentiment'
+    numeric : list of str
+        Numeric questions to follow, e.g., 'salary_base'
+    freq : str
+        Width of the time buckets, e.g., 'h', 'D' or '7D'
+    window : int
+        Number of trailing buckets covered by the rolling statistics
+    weights : np.ndarray, optional
+        Weight of each row of `idx`
+    time : str
+        Datetime field that orders the responses
+
+    Returns
+    -------
+    dict with the 'bucket_start' of every bucket, the 'num_responses' in
+    each bucket, the 'cumulative_responses' and the 'rolling_responses' over
+    the window, and for every Likert block and numeric question a dictionary
+    of its rolling 'count' and 'mean' (one column per question of the block)
+    or 'median'
+    """
+
+    idx = np.arange(len(table)) if idx is None else np.asarray(idx, dtype=np.int64)
+
+    column = resolve_field(table, time)
+    if not isinstance(column, DatetimeColumn):
+        raise TypeError(f'{time} is not a datetime field')
+
+    starts, buckets = bucket_times(column.values[idx], freq)
+    num_buckets = len(starts)
+
+    # Respondents without a time are left out of every series
+    has_time = buckets >= 0
+    rows, buckets = idx[has_time], buckets[has_time]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[has_time]
+
+    responses = np.bincount(buckets, weights, minlength=num_buckets)
+    if weights is None:
+        responses = responses.astype(np.int64)
+
+    res = dict()
+    res['bucket_start']         = starts
+    res['num_responses']        = responses
+    res['cumulative_responses'] = np.cumsum(responses)
+    res['rolling_responses']    = rolling_sums(responses, window)
+
+    for name in likert:
+        block = resolve_field(table, name)
+        if not isinstance(block, LikertBlock):
+            raise TypeError(f'{name} is not a Likert block')
+        res[name] = {'keys': block.keys}
+        res[name].update(rolling_likert(block.answers[rows], buckets, num_buckets,
+                                        window, weights))
+
+    for name in numeric:
+        values = resolve_field(table, name)
+        if not isinstance(values, NumericColumn):
+            raise TypeError(f'{name} is not a numeric question')
+        res[name] = rolling_median(values.values[rows].astype(float), buckets, num_buckets,
+                                   window, weights)
+
+    return res
@@ -1,6 +1,7 @@
 """
 Utility functions
 """
+import numpy as np
 import pandas as pd
 
 def sort_dict(this_dict, by='values', reverse=True):
@@ -85,3 +86,135 @@ def nanappend(this_list, item):
         pass
     else:
         this_list.append(item)
+
+
+def count_codes(codes, categories : list, rows=None, num_rows : int = None,
+                weights=None) -> dict:
+    """
+    Dictionary counter of answers coded as integers into `categories`, in
+    one vectorized pass
+
+    The counter has the same shape as one built by calling
+    `update_dict_counter` once per respondent: '_tot_' first, counting the
+    respondents with at least one answer, then the answers in order of first
+    appearance. It is empty if there are no respondents.
+
+    Parameters
+    ----------
+    codes : array of int
+        Code of each answer (-1 when missing)
+    categories : list
+        Answer of each code
+    rows : array of int, optional
+        Respondent of each answer (numbered from 0), for the long format of
+        multi-select answers; by default each answer is its own respondent
+    num_rows : int, optional
+        Number of respondents, including those without any answer (by
+        default, the number of answers, or the largest row + 1)
+    weights : array of float, optional
+        Weight of each respondent; respondents of zero weight are left out
+
+    Returns
+    -------
+    dict counter
+    """
+
+    codes = np.asarray(codes, dtype=np.int64)
+    rows  = np.arange(len(codes)) if rows is None else np.asarray(rows, dtype=np.int64)
+
+    if num_rows is None:
+        num_rows = int(rows.max(initial=-1)) + 1
+    if num_rows == 0:
+        return dict()
+
+    is_counted = codes >= 0
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        is_counted &= weights[rows] != 0
+    codes, rows = codes[is_counted], rows[is_counted]
+
+    has_answer = np.zeros(num_rows, dtype=bool)
+    has_answer[rows] = True
+
+    if weights is None:
+        counts = np.bincount(codes, minlength=len(categories))
+        total  = int(np.count_nonzero(has_answer))
+    else:
+        counts = np.bincount(codes, weights[rows], minlength=len(categories))
+        total  = float(weights[has_answer].sum())
+
+    unique, first = np.unique(codes, return_index=True)
+
+    counter = {'_tot_': total}
+    for code in unique[np.argsort(first)].tolist():
+        counter[categories[code]] = counts[code].item()
+
+    return counter
+
+
+def count_values(values, rows=None, num_rows : int = None, weights=None) -> dict:
+    """
+    Dictionary counter of a whole column of answers, with the same result as
+    `update_dict_counter` called once per respondent, in one vectorized pass
+
+    `values` holds one single-choice answer per respondent, or the
+    long-format table of multi-select answers together with the respondent
+    of each answer in `rows` (see `count_codes`). Missing answers are ignored.
+    """
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return count_codes(codes, uniques.tolist(), rows, num_rows, weights)
+
+
+def merge_counters(*counters) -> dict:
+    """
+    Combine dictionary counters of disjoint groups of respondents, e.g., of
+    the chunks of an export, into the counter of all of them
+
+    Answers keep their order of first appearance across the counters.
+    """
+
+    merged = dict()
+
+    for counter in counters:
+        for key, count in counter.items():
+            merged[key] = merged.get(key, 0) + count
+
+    return merged
+
+
+def weighted_medians(values, weights) -> np.ndarray:
+    """
+    Weighted median of sorted `values` for each row of `weights`
+
+    The median is the first value at which the cumulative share of the
+    weights reaches one half, averaged with the next value of positive weight
+    if the share is exactly one half there. It only depends on the relative
+    weights, e.g., on raking weights of any scale, and with integer counts it
+    is the median of the values repeated as many times, as `np.median` would
+    return. Rows of zero total weight have a NaN median.
+    """
+
+    values  = np.asarray(values, dtype=float)
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    rows    = np.arange(len(weights))
+
+    medians = np.full(len(weights), np.nan)
+    if weights.shape[1] == 0:
+        return medians
+
+    cumulative = np.cumsum(weights, axis=1)
+    total = cumulative[:, -1]
+
+    # Shares within rounding of one half count as one half, e.g., for weights
+    # summed over rolling windows
+    half = total[:, None] / 2
+    tolerance = 1e-9 * total[:, None]
+
+    lower  = np.argmax(cumulative >= half - tolerance, axis=1)
+    is_tie = np.abs(cumulative[rows, lower] - half[:, 0]) <= tolerance[:, 0]
+    upper  = np.where(is_tie, np.argmax(cumulative > half + tolerance, axis=1), lower)
+
+    has_weight = total > 0
+    medians[has_weight] = ((values[lower] + values[upper]) / 2)[has_weight]
+    return medians
@@ -0,0 +1,137 @@
+"""
+Survey weights by raking (iterative proportional fitting).
+
+The census sample over-represents whoever the outreach happened to reach, so
+respondents can be weighted to match known margins of the population, e.g.,
+the share of each country, gender or employment status. Raking adjusts the
+weights one field at a time so that the weighted share of each answer
+matches its target, and repeats until every margin matches at once. Each
+adjustment is a `np.bincount` of the weights over the integer codes of the
+answers, and respondents who gave the same answers to every raked field are
+fitted together as one cell, so raking converges in milliseconds even for
+large tables.
+
+Respondents who did not answer a raked field keep their weight for that
+field. The weights are scaled so that they sum to the number of weighted
+respondents, i.e., their mean is 1.
+"""
+
+import warnings
+
+import numpy as np
+
+from src.filters import resolve_field
+from src.table import CategoricalColumn
+
+MAX_ITERATIONS = 100
+TOLERANCE      = 1e-6
+
+
+def margin_codes(table, name : str, targets : dict, idx : np.ndarray) -> tuple:
+    """
+    Codes of the answers to a raked field at rows `idx`, and the target
+    share of each code (-1 for missing answers)
+    """
+
+    column = resolve_field(table, name)
+
+    if isinstance(column, np.ndarray) and column.dtype == bool:
+        codes, categories = column[idx].astype(np.int64), [False, True]
+    elif isinstance(column, CategoricalColumn):
+        codes, categories = column.codes[idx].astype(np.int64), column.categories
+    else:
+        raise TypeError(f'{name} cannot be raked on; use a single-choice or flag field')
+
+    # Targets without respondents cannot be reached
+    observed = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+    unknown  = [value for value in targets
+                if value not in categories or not observed[categories.index(value)]]
+    if len(unknown) > 0:
+        raise ValueError(f'No respondent answered {name} with {unknown}')
+
+    shares = np.zeros(len(categories))
+    for value, target in targets.items():
+        shares[categories.index(value)] = target
+
+    # Answers without a target cannot be weighted towards one
+    missing = [categories[code] for code in np.flatnonzero(observed & (shares == 0))]
+    if len(missing) > 0:
+        raise ValueError(f'No target for {name}: {missing}')
+
+    return codes, shares / shares.sum()
+
+
+def rake(table, targets : dict, idx=None, base_weights=None,
+         max_iterations : int = MAX_ITERATIONS, tolerance : float = TOLERANCE) -> np.ndarray:
+    """
+    Rake respondent weights to marginal targets
+
+    Parameters
+    ----------
+    table : RespondentTable
+        Respondent data
+    targets : dict
+        Target margins, from field (a single-choice question or a flag, named
+        as in `src.filters`) to a dictionary from answer to its share or
+        count in the population, e.g., {'gender': {'Male': 0.5, 'Female': 0.5}}
+    idx : np.ndarray, optional
+        Rows to weight (all rows by default)
+    base_weights : np.ndarray, optional
+        Starting weight of each row of `idx`, e.g., design weights
+    max_iterations : int
+        Maximum number of passes over the fields
+    tolerance : float
+        Largest difference between a weighted share and its target at
+        convergence
+
+    Returns
+    -------
+    np.ndarray of the weight of each row of `idx`
+    """
+
+    idx = np.arange(len(table)) if idx is None else np.asarray(idx, dtype=np.int64)
+    weights = np.ones(len(idx)) if base_weights is None else np.array(base_weights, dtype=float)
+
+    margins = [margin_codes(table, name, field_targets, idx)
+               for name, field_targets in targets.items()]
+
+    # Respondents with the same answers to every raked field get the same
+    # adjustment, so the fitting runs on the cells of distinct answers
+    keys = np.zeros(len(idx), dtype=np.int64)
+    for codes, shares in margins:
+        keys = keys * (len(shares) + 1) + codes + 1
+    cells, inverse = np.unique(keys, return_inverse=True)
+    cell_weights = np.bincount(inverse, weights, minlength=len(cells))
+
+    cell_codes = []
+    for codes, shares in reversed(margins):
+        cells, cell_code = np.divmod(cells, len(shares) + 1)
+        cell_codes.insert(0, (cell_code - 1, shares))
+
+    factors = np.ones(len(cell_weights))
+
+    for _ in range(max_iterations):
+
+        for codes, shares in cell_codes:
+            answered = codes >= 0
+            totals = np.bincount(codes[answered], (cell_weights * factors)[answered],
+                                 minlength=len(shares))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                adjustment = np.where(totals > 0, shares * totals.sum() / totals, 0)
+            factors[answered] *= adjustment[codes[answered]]
+
+        error = 0
+        for codes, shares in cell_codes:
+            answered = codes >= 0
+            totals = np.bincount(codes[answered], (cell_weights * factors)[answered],
+                                 minlength=len(shares))
+            error = max(error, np.abs(totals / totals.sum() - shares).max())
+
+        if error < tolerance:
+            break
+    else:
+        warnings.warn(f'Raking did not converge in {max_iterations} iterations '
+                      f'(largest margin error {error:.2g})')
+
+    weights = weights * factors[inverse]
+    return weights * np.count_nonzero(weights) / weights.sum()
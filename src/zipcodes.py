@@ -0,0 +1,100 @@
+"""
+Resolve US ZIP codes to states in bulk.
+
+The ZIP code database of `pyzipcode` is read once, the first time a state is
+looked up, into an in-memory table indexed by the 5-digit ZIP code. Nothing is
+opened on import.
+
+Only the answers of respondents living in the United States (or who did not
+say) are looked up: postal codes of other countries are often 4-digit codes
+(e.g., 8020 in Austria or 1050 in Belgium) that would otherwise pass for US
+ZIP codes that lost their leading zero.
+"""
+
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+from pyzipcode import ZipCodeDatabase
+
+# 5-digit ZIP codes, optionally ZIP+4 ('94305-1234', '94305 1234' or
+# '943051234'). Codes of 3 or 4 digits are ZIP codes that lost their leading
+# zeros, e.g., when the export was opened in a spreadsheet.
+US_ZIP = re.compile(r'(\d{3,5})(?:[-\s]\d{4})?|(\d{5})\d{4}')
+
+# Answer to the country question of respondents living in the United States
+US_COUNTRY = 'United States'
+
+
+def normalize_zip(zip_code) -> str:
+    """
+    Normalize one answer to the ZIP code question to a 5-digit ZIP code
+
+    Returns None for missing answers and for codes that are not shaped like
+    a US ZIP code (e.g., 'SW1A 1AA' or '560064').
+    """
+
+    if isinstance(zip_code, float):
+        if not zip_code.is_integer():
+            return None
+        zip_code = int(zip_code)
+
+    if zip_code is None or pd.isna(zip_code):
+        return None
+
+    match = US_ZIP.fullmatch(str(zip_code).strip())
+    if match is None:
+        return None
+
+    return (match.group(1) or match.group(2)).zfill(5)
+
+
+@functools.lru_cache(maxsize=None)
+def zip_state_table() -> np.ndarray:
+    """
+    State of every 5-digit ZIP code, as an array indexed by the ZIP code as
+    an integer (None for unknown ZIP codes)
+
+    Read from the ZIP code database on first use.
+    """
+
+    rows = ZipCodeDatabase().conn_manager.query('SELECT zip, state FROM ZipCodes')
+
+    table = np.full(100000, None, dtype=object)
+    for zip_code, state in rows:
+        table[int(zip_code)] = state
+
+    return table
+
+
+def resolve_states(zip_codes, countries=None) -> np.ndarray:
+    """
+    Look up the state for each ZIP code (None for invalid ZIP codes)
+
+    The codes are normalized with `normalize_zip`; each distinct code is only
+    normalized once, and the states are looked up in `zip_state_table` in one
+    vectorized pass. If `countries` (the answers to the country question) is
+    given, only the codes of respondents in the United States or of unknown
+    country are looked up; the others get None.
+    """
+
+    zip_codes = np.asarray(zip_codes, dtype=object)
+    if countries is not None:
+        countries = np.asarray(countries, dtype=object)
+        is_us     = pd.isna(countries) | (countries == US_COUNTRY)
+        zip_codes = np.where(is_us, zip_codes, None)
+
+    codes, uniques = pd.factorize(zip_codes)
+    if len(codes) == 0:
+        return np.empty(0, dtype=object)
+
+    normalized = [normalize_zip(code) for code in uniques]
+    numbers    = np.array([-1 if z is None else int(z) for z in normalized], dtype=np.int64)
+
+    # Missing answers (code -1) map to the trailing None
+    states = np.full(len(uniques) + 1, None, dtype=object)
+    is_zip = numbers >= 0
+    states[:-1][is_zip] = zip_state_table()[numbers[is_zip]]
+
+    return states[codes]
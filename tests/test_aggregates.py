@@ -0,0 +1,130 @@
+import json
+import numpy as np
+import pytest
+from src.analyst import Analyst
+from src.parser import read_google_sheet
+from src.table import RespondentTable
+from src.aggregates import NumericAggregate, SummaryAggregator, merge_partials
+
+FILE_GSHEET = 'data/talent_census_data_20241216_gsheet_export.csv'
+
+@pytest.fixture
+def analyst():
+    analyst = Analyst()
+    analyst.load_data(file_gsheet=FILE_GSHEET, cache_dir=None)
+    analyst.build_respondents_list()
+    return analyst
+
+def test_stream_summaries_match_batch(analyst):
+    summaries = analyst.stream_summaries(FILE_GSHEET, chunksize=100)
+
+    salary = analyst.summarize_company_salary()
+    assert summaries['company_salary']['salary_comp_types'] == salary['salary_comp_types']
+    assert summaries['company_salary']['salary_num_raises'] == salary['salary_num_raises']
+    assert summaries['company_salary']['salary_base_median'] == salary['salary_base_median']
+    assert np.isclose(summaries['company_salary']['salary_base_std'], salary['salary_base_std'])
+
+    sentiment = analyst.summarize_census_sentiment()
+    np.testing.assert_allclose(summaries['census_sentiment']['mean'], sentiment['mean'])
+    np.testing.assert_allclose(summaries['census_sentiment']['stdev'], sentiment['stdev'])
+
+    stats = analyst.summarize_stats()
+    for key, value in summaries['stats'].items():
+        assert value == stats[key]
+
+def test_aggregator_is_independent_of_chunks():
+    df = read_google_sheet(FILE_GSHEET)
+
+    whole = SummaryAggregator()
+    whole.update(RespondentTable.from_frames(df))
+
+    chunked = SummaryAggregator()
+    for start in range(0, len(df), 333):
+        chunked.update(RespondentTable.from_frames(df.iloc[start:start + 333]))
+
+    assert chunked.result()['census_backgrounds'] == whole.result()['census_backgrounds']
+    assert chunked.result()['stats'] == whole.result()['stats']
+
+def test_merged_shards_match_whole(tmp_path):
+    df = read_google_sheet(FILE_GSHEET)
+
+    whole = SummaryAggregator()
+    whole.update(RespondentTable.from_frames(df))
+
+    partials = []
+    for i, start in enumerate([0, 250, 600]):
+        shard = df.iloc[start:[250, 600, len(df)][i]]
+        shard.to_csv(tmp_path / f'shard_{i}.csv', index=False)
+        partial = Analyst().partial_summaries(str(tmp_path / f'shard_{i}.csv'), chunksize=100)
+        partials.append(json.loads(json.dumps(partial.to_dict())))
+
+    merged = merge_partials(partials).result()
+    assert list(merged) == list(whole.result())
+    for name, summary in whole.result().items():
+        assert list(merged[name]) == list(summary)
+        np.testing.assert_equal(merged[name], summary)
+
+def test_numeric_min_max():
+    aggregate = NumericAggregate('company', 'salary_base', 'salary_base', ('min', 'max', 'median'))
+    table = RespondentTable.from_frames(read_google_sheet(FILE_GSHEET))
+    idx = np.flatnonzero(table.working_mask())
+    aggregate.update(table, idx[:300])
+    other = NumericAggregate('company', 'salary_base', 'salary_base', ('min', 'max', 'median'))
+    other.update(table, idx[300:])
+    aggregate.merge(other)
+
+    values = table.company['salary_base'].values[idx]
+    assert aggregate.result() == {'salary_base_min': np.nanmin(values),
+                                  'salary_base_max': np.nanmax(values),
+                                  'salary_base_median': np.nanmedian(values)}
+
+def test_numeric_goes_over_to_sketch():
+    table = RespondentTable.from_frames(read_google_sheet(FILE_GSHEET))
+    idx = np.flatnonzero(table.working_mask())
+    statistics = ('median', 'std', 'min', 'max')
+
+    # Shards with few distinct salaries stay exact; too many go over to a
+    # sketch, which merges with both kinds of shards
+    partials = []
+    for shard, max_values in [(idx[:20], 50), (idx[20:300], 50), (idx[300:], 10 ** 6)]:
+        partial = NumericAggregate('company', 'salary_base', 'salary_base', statistics,
+                                   max_values=max_values, k=32)
+        partial.update(table, shard)
+        partials.append(partial)
+    assert [partial.is_exact for partial in partials] == [True, False, True]
+
+    merged = partials[0]
+    for partial in partials[1:]:
+        state = json.loads(json.dumps(partial.to_dict()))
+        loaded = NumericAggregate('company', 'salary_base', 'salary_base', statistics, k=32)
+        loaded.load(state)
+        merged.merge(loaded)
+    assert not merged.is_exact and merged.sketch.size < 200
+
+    values = table.company['salary_base'].values[idx]
+    values = np.sort(values[~np.isnan(values)])
+    res = merged.result()
+    assert res['salary_base_min'] == values[0] and res['salary_base_max'] == values[-1]
+    assert np.isclose(res['salary_base_std'], np.std(values))
+
+    # Many salaries are tied, so the median stands for a range of ranks
+    low  = np.searchsorted(values, res['salary_base_median'], side='left') / len(values)
+    high = np.searchsorted(values, res['salary_base_median'], side='right') / len(values)
+    error = merged.sketch.rank_error + 1 / len(values)
+    assert low - error <= 0.5 <= high + error
+
+    with pytest.raises(ValueError):
+        merged.retract(table, idx[:10])
+
+def test_aggregator_with_sketches_cannot_retract():
+    table = RespondentTable.from_frames(read_google_sheet(FILE_GSHEET))
+    aggregator = SummaryAggregator()
+    aggregator.update(table)
+    assert aggregator.can_retract
+
+    aggregate = aggregator.fields['company_salary'][1][0][1]
+    aggregate.max_values = 10
+    aggregate.check_size()
+    assert not aggregator.can_retract
+    with pytest.raises(ValueError):
+        aggregator.retract(table.take([0]))
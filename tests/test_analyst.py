@@ -0,0 +1,138 @@
+import warnings
+import numpy as np
+import pytest
+from src.analyst import Analyst
+from src.parser import read_google_sheet
+
+FILE_GSHEET_1216   = 'data/talent_census_data_20241216_gsheet_export.csv'
+FILE_TYPEFORM_1216 = 'data/talent_census_data_20241216_typeform_export.csv'
+FILE_GSHEET_1230   = 'data/talent_census_data_20241230_gsheet_export.csv'
+FILE_TYPEFORM_1230 = 'data/talent_census_data_20241230_typeform_export.csv'
+
+def load(file_gsheet, file_typeform):
+    analyst = Analyst()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        analyst.load_data(file_gsheet, file_typeform, cache_dir=None)
+    analyst.build_respondents_list()
+    return analyst
+
+@pytest.fixture
+def export_1230(tmp_path):
+    # Later export with one deleted and one edited response
+    df = read_google_sheet(FILE_GSHEET_1230).drop(index=3)
+    df.loc[10, 'What is your annual base salary?'] = '123456'
+    df.to_csv(tmp_path / 'gsheet.csv', index=False)
+    return str(tmp_path / 'gsheet.csv')
+
+def test_refresh_matches_full_load(export_1230):
+    analyst = load(FILE_GSHEET_1216, FILE_TYPEFORM_1216)
+    summaries = analyst.summaries()
+
+    report = analyst.refresh(export_1230, FILE_TYPEFORM_1230)
+    assert len(report['new']) == 73
+    assert len(report['changed']) == 1
+    assert len(report['deleted']) == 1
+
+    expected = load(export_1230, FILE_TYPEFORM_1230)
+    assert analyst.table.tokens.tolist() == expected.table.tokens.tolist()
+    assert analyst.summarize_company_salary()['salary_comp_types'] == \
+           expected.summarize_company_salary()['salary_comp_types']
+    assert analyst.summarize_stats()['num_total'] == len(expected.respondents_list)
+
+    # The summaries are updated from the delta, not recomputed
+    refreshed = analyst.summaries()
+    assert refreshed['stats'] == expected.summaries()['stats']
+    assert refreshed['company_salary']['salary_base_median'] == \
+           expected.summaries()['company_salary']['salary_base_median']
+    assert refreshed['census_backgrounds'] == expected.summaries()['census_backgrounds']
+    assert refreshed['stats']['num_total'] == summaries['stats']['num_total'] + 72
+
+def test_refresh_without_changes():
+    analyst = load(FILE_GSHEET_1230, FILE_TYPEFORM_1230)
+    report = analyst.refresh(FILE_GSHEET_1230, FILE_TYPEFORM_1230)
+    assert report == {'new': [], 'changed': [], 'deleted': []}
+
+def test_memoized_summaries(export_1230):
+    analyst = load(FILE_GSHEET_1216, FILE_TYPEFORM_1216)
+    working = analyst.filter_for_working()
+
+    first = analyst.summarize_company_salary(working)
+    first['salary_comp_types'].pop('_tot_')
+    second = analyst.summarize_company_salary(list(working))
+    assert '_tot_' in second['salary_comp_types']
+    assert analyst.summary_cache_stats()['hits'] == 1
+    assert analyst.summary_cache_stats()['misses'] == 1
+
+    # A different subset misses
+    analyst.summarize_company_salary(working[:10])
+    assert analyst.summary_cache_stats()['misses'] == 2
+
+    # New respondent data drops the cached summaries
+    num_total = analyst.summarize_stats()['num_total']
+    analyst.refresh(export_1230, FILE_TYPEFORM_1230)
+    assert analyst.summarize_stats()['num_total'] == num_total + 72
+    assert analyst.summary_cache_stats()['size'] == 1
+
+def test_memoized_summaries_eviction():
+    analyst = load(FILE_GSHEET_1216, FILE_TYPEFORM_1216)
+    analyst.summary_cache.maxsize = 2
+
+    analyst.summarize_census_sentiment()
+    analyst.summarize_census_backgrounds()
+    analyst.summarize_census_sentiment()
+    analyst.summarize_company_info()
+
+    stats = analyst.summary_cache_stats()
+    assert stats['evictions'] == 1
+    assert stats['size'] == 2
+    analyst.summarize_census_sentiment()
+    assert analyst.summary_cache_stats()['hits'] == 2
+
+def test_bootstrap_ci_matches_summaries():
+    analyst = load(FILE_GSHEET_1216, FILE_TYPEFORM_1216)
+
+    res = analyst.bootstrap_ci('salary_base', num_resamples=200)
+    assert res['estimate'] == analyst.summarize_company_salary()['salary_base_median']
+    assert res['lower'] <= res['estimate'] <= res['upper']
+
+    by_level = analyst.bootstrap_ci('salary_base', by='role_level', num_resamples=200)
+    counts = analyst.group_by('role_level', {'salary_base': ['count', 'median']})
+    assert by_level['n'].tolist() == counts['salary_base_count'].tolist()
+    assert by_level['estimate'].tolist() == counts['salary_base_median'].tolist()
+
+def test_integer_weights_repeat_respondents():
+    analyst = load(FILE_GSHEET_1216, FILE_TYPEFORM_1216)
+    weights = np.random.default_rng(0).integers(0, 4, size=len(analyst.respondents_list))
+    repeated = [r for r, w in zip(analyst.respondents_list, weights) for _ in range(w)]
+
+    weighted = analyst.summarize_company_salary(weights=weights)
+    expected = analyst.summarize_company_salary(repeated)
+    assert weighted['salary_base_median'] == expected['salary_base_median']
+    assert weighted['salary_base_std'] == pytest.approx(expected['salary_base_std'])
+    assert weighted['salary_comp_types'] == expected['salary_comp_types']
+
+    weighted = analyst.summarize_census_sentiment(weights=weights)
+    expected = analyst.summarize_census_sentiment(repeated)
+    np.testing.assert_allclose(weighted['mean'], expected['mean'])
+    np.testing.assert_allclose(weighted['stdev'], expected['stdev'])
+    assert analyst.summarize_census_backgrounds(weights=weights)['state'] == \
+           analyst.summarize_census_backgrounds(repeated)['state']
+
+def test_report_matches_summaries():
+    analyst = load(FILE_GSHEET_1216, FILE_TYPEFORM_1216)
+    analyst.summary_cache = None
+    subset  = analyst.filter_respondents_on(country='United States')
+    weights = np.random.default_rng(0).random(len(analyst.respondents_list))
+
+    for respondents_list in [None, subset]:
+        report = analyst.report(respondents_list, weights)
+        assert set(report) == {name[len('summarize_'):] for name in dir(analyst)
+                               if name.startswith('summarize_') and name != 'summarize_likert'}
+        for name, summary in report.items():
+            if name == 'stats':
+                expected = analyst.summarize_stats()
+            else:
+                expected = getattr(analyst, f'summarize_{name}')(respondents_list, weights)
+            assert list(summary) == list(expected)
+            np.testing.assert_equal(summary, expected)
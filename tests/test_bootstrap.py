@@ -0,0 +1,45 @@
+import numpy as np
+import src.bootstrap as bootstrap
+
+def test_confidence_interval_is_reproducible():
+    values = np.random.default_rng(1).lognormal(11, 0.5, size=500)
+    values[::7] = np.nan
+
+    res = bootstrap.confidence_interval(values, 'median', num_resamples=500, seed=42)
+    assert res['n'] == np.sum(~np.isnan(values))
+    assert res['estimate'] == np.nanmedian(values)
+    assert res['lower'] < res['estimate'] < res['upper']
+    assert res == bootstrap.confidence_interval(values, 'median', num_resamples=500, seed=42)
+    assert res != bootstrap.confidence_interval(values, 'median', num_resamples=500, seed=43)
+
+def test_batches_match_one_draw():
+    values = np.arange(100, dtype=float)
+    rng = np.random.default_rng(0)
+    expected = np.median(values[rng.integers(0, 100, size=(50, 100))], axis=1)
+
+    bootstrap.BATCH_VALUES, batch_values = 700, bootstrap.BATCH_VALUES
+    try:
+        res = bootstrap.resample(values, 'median', 50, np.random.default_rng(0))
+    finally:
+        bootstrap.BATCH_VALUES = batch_values
+    np.testing.assert_array_equal(res, expected)
+
+def test_likert_means():
+    values = np.random.default_rng(2).integers(1, 6, size=(300, 3)).astype(float)
+    values[0] = np.nan
+    values[1:50, 1] = np.nan
+
+    res = bootstrap.confidence_interval(values, 'mean', num_resamples=200)
+    assert res['n'] == 299
+    np.testing.assert_allclose(res['estimate'], np.nanmean(values, axis=0))
+    assert (res['lower'] < res['estimate']).all() and (res['estimate'] < res['upper']).all()
+
+def test_process_pool_matches_serial():
+    rng = np.random.default_rng(3)
+    segments = [rng.normal(size=n) for n in [10, 200, 0, 50]]
+
+    serial   = bootstrap.segment_intervals(segments, 'mean', num_resamples=100, seed=7)
+    parallel = bootstrap.segment_intervals(segments, 'mean', num_resamples=100, seed=7, processes=2)
+    for a, b in zip(serial, parallel):
+        np.testing.assert_equal(a, b)
+    assert serial[2]['n'] == 0 and np.isnan(serial[2]['estimate'])
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import pandas as pd
+import src.cache as cache
+from src.table import RespondentTable
+
+FILE_GSHEET = 'data/talent_census_data_20241216_gsheet_export.csv'
+FILE_TYPEFORM = 'data/talent_census_data_20241216_typeform_export.csv'
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv(FILE_GSHEET))
+
+def test_fingerprint_changes_with_export(tmp_path):
+    copy = tmp_path / 'gsheet.csv'
+    copy.write_bytes(open(FILE_GSHEET, 'rb').read())
+
+    key = cache.fingerprint(copy, FILE_TYPEFORM)
+    assert key == cache.fingerprint(FILE_GSHEET, FILE_TYPEFORM)
+
+    with open(copy, 'a') as f:
+        f.write('\n')
+    assert key != cache.fingerprint(copy, FILE_TYPEFORM)
+
+def test_cache_round_trip(tmp_path, table):
+    assert cache.load(tmp_path, 'abc') is None
+
+    cache.save(tmp_path, 'abc', table, extras={'note': 'hello'})
+    loaded, extras = cache.load(tmp_path, 'abc')
+
+    assert extras == {'note': 'hello'}
+    assert loaded.tokens.tolist() == table.tokens.tolist()
+    assert loaded.census['state'].rows(range(20)) == table.census['state'].rows(range(20))
+    assert loaded.company['role_role'].rows(range(20)) == table.company['role_role'].rows(range(20))
+    np.testing.assert_array_equal(loaded.flags['is_student'], table.flags['is_student'])
+    np.testing.assert_array_equal(loaded.student['student_sentiment'].values,
+                                  table.student['student_sentiment'].values)
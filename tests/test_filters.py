@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+import pandas as pd
+from src.table import RespondentTable
+from src.filters import field, parse
+
+SENIOR = ['Senior', 'Expert', 'Manager', 'Director/VP', 'Executive']
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def brute_force(table, predicate):
+    rows = range(len(table))
+    return np.array([predicate(i) for i in rows], dtype=bool)
+
+def test_parse_matches_operators(table):
+    text = ("(is_working or is_unemployed) and role_level in " + repr(SENIOR) +
+            " and company_state in ['California', 'Michigan'] and salary_base > 120000")
+    built = (field('is_working') | field('is_unemployed')) & field('role_level').isin(SENIOR) & \
+            field('company.company_state').isin(['California', 'Michigan']) & \
+            (field('salary_base') > 120000)
+
+    mask = parse(text).mask(table)
+    np.testing.assert_array_equal(mask, built.mask(table))
+
+    company = table.company
+    expected = brute_force(table, lambda i:
+        (table.flags['is_working'][i] or table.flags['is_unemployed'][i])
+        and company['role_level'].row(i) in SENIOR
+        and company['company_state'].row(i) in ['California', 'Michigan']
+        and company['salary_base'].row(i) > 120000)
+    np.testing.assert_array_equal(mask, expected)
+    assert mask.sum() > 0
+
+def test_ranges_and_negation(table):
+    mask = parse('50000 <= salary_base < 100000 and not gender == "Male"').mask(table)
+    salary = table.company['salary_base'].values
+    gender = np.array(table.census['gender'].rows(range(len(table))), dtype=object)
+    expected = (salary >= 50000) & (salary < 100000) & (gender != 'Male')
+    np.testing.assert_array_equal(mask, expected)
+
+def test_multiselect_predicates(table):
+    ethnicity = table.census['ethnicity']
+    rows = [set(r) for r in ethnicity.rows(range(len(table)))]
+
+    np.testing.assert_array_equal(parse("'Asian' in ethnicity").mask(table),
+                                  [('Asian' in r) for r in rows])
+    np.testing.assert_array_equal(parse("contains_any(ethnicity, ['Asian', 'Black or African American'])").mask(table),
+                                  [bool(r & {'Asian', 'Black or African American'}) for r in rows])
+    np.testing.assert_array_equal(field('ethnicity').contains_all(['Asian', 'White']).mask(table),
+                                  [{'Asian', 'White'} <= r for r in rows])
+    np.testing.assert_array_equal(parse("isna(ethnicity)").mask(table),
+                                  [len(r) == 0 for r in rows])
+
+def test_membership_on_single_choice(table):
+    state = np.array(table.census['state'].rows(range(len(table))), dtype=object)
+    np.testing.assert_array_equal(parse("'CA' in state").mask(table), state == 'CA')
+    np.testing.assert_array_equal(parse("'Senior' not in role_level").mask(table),
+                                  parse("role_level != 'Senior'").mask(table))
+    assert parse("'CA' in state").mask(table).sum() > 0
+
+def test_unknown_values_match_nothing(table):
+    for text in ["state == 'ZZ'", "role_level == 'Senior '", "gender == 'Typo'",
+                 "'ZZ' in state", "state in ['ZZ', 'YY']", "contains_any(state, ['ZZ'])"]:
+        assert not parse(text).mask(table).any(), text
+
+def test_values_do_not_match_missing_answers(table):
+    company_state = table.company['company_state']
+    assert (company_state.codes < 0).any()
+
+    mask = parse("company.company_state in ['California', 'CA']").mask(table)
+    np.testing.assert_array_equal(mask, company_state.mask_equal('California'))
+    assert not mask[company_state.codes < 0].any()
+
+def test_contains_all_of_nothing(table):
+    np.testing.assert_array_equal(field('ethnicity').contains_all([]).mask(table),
+                                  np.ones(len(table), dtype=bool))
+    assert not parse("contains_any(ethnicity, [])").mask(table).any()
+
+def test_flag_comparisons(table):
+    is_working = table.flags['is_working']
+    np.testing.assert_array_equal(parse('is_working == True').mask(table), is_working)
+    np.testing.assert_array_equal(parse('is_working != True').mask(table), ~is_working)
+    np.testing.assert_array_equal((field('is_working') == False).mask(table), ~is_working)
+    with pytest.raises(TypeError):
+        parse('is_working > 0').mask(table)
+
+def test_ordered_comparisons_on_single_choice(table):
+    # Numbers stored as text are compared as numbers; '5+' never matches
+    internships = table.student['num_internships'].rows(range(len(table)))
+    np.testing.assert_array_equal(parse('num_internships >= 2').mask(table),
+                                  [isinstance(v, str) and v.isdigit() and int(v) >= 2
+                                   for v in internships])
+
+    # Bands like '11-20' are not numbers
+    with pytest.raises(TypeError, match='company_team_count'):
+        parse('company_team_count > 5').mask(table)
+
+def test_negation_leaves_out_missing_answers(table):
+    salary = table.company['salary_base'].values
+    assert np.isnan(salary).any()
+    np.testing.assert_array_equal(parse('not salary_base < 100000').mask(table), salary >= 100000)
+    np.testing.assert_array_equal((~(field('salary_base') < 100000)).mask(table), salary >= 100000)
+
+    # Pushed down to the predicates: not (a or b) == not a and not b
+    np.testing.assert_array_equal(
+        parse("not (salary_base < 100000 or gender == 'Male')").mask(table),
+        parse("salary_base >= 100000 and gender != 'Male'").mask(table))
+    np.testing.assert_array_equal(parse('not not salary_base < 100000').mask(table),
+                                  parse('salary_base < 100000').mask(table))
+
+    # Flags and missing-answer tests negate over every row
+    np.testing.assert_array_equal(parse('not is_working').mask(table), ~table.flags['is_working'])
+    np.testing.assert_array_equal(parse('not isna(salary_base)').mask(table), ~np.isnan(salary))
+
+def test_invalid_expressions(table):
+    with pytest.raises(KeyError):
+        parse('no_such_question == 1').mask(table)
+    with pytest.raises(ValueError):
+        parse('salary_base > max_salary')
+    with pytest.raises(TypeError):
+        parse("ethnicity == 'Asian'").mask(table)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import pandas as pd
+from src.table import RespondentTable
+from src.summaries import count_rows
+from src.groupby import group_by
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def test_cells_match_filtered_summaries(table):
+    idx = np.flatnonzero(table.working_mask())
+    res = group_by(table, ['state', 'company.role_level'],
+                   {'salary_base': ['median', 'std', 'count', 'max'],
+                    'company_satisfaction': ['mean', 'stdev'],
+                    'salary_comp_types': 'counts',
+                    'gender': None}, idx)
+
+    state = np.array(table.census['state'].rows(range(len(table))), dtype=object)
+    level = np.array(table.company['role_level'].rows(range(len(table))), dtype=object)
+
+    assert res['num_respondents'].sum() == sum(1 for i in idx if isinstance(state[i], str)
+                                                              and isinstance(level[i], str))
+    for _, cell in res.iterrows():
+        rows = idx[(state[idx] == cell['state']) & (level[idx] == cell['company.role_level'])]
+        salary = table.company['salary_base'].values[rows]
+        satisfaction = table.company['company_satisfaction'].values[rows].astype(float)
+
+        assert cell['num_respondents'] == len(rows)
+        np.testing.assert_equal(cell['salary_base_median'], np.nanmedian(salary))
+        np.testing.assert_allclose(cell['salary_base_std'], np.nanstd(salary))
+        assert cell['salary_base_count'] == np.sum(~np.isnan(salary))
+        np.testing.assert_equal(cell['salary_base_max'], np.nanmax(salary))
+        np.testing.assert_allclose(cell['company_satisfaction_mean'], np.nanmean(satisfaction, axis=0))
+        np.testing.assert_allclose(cell['company_satisfaction_stdev'], np.nanstd(satisfaction, axis=0))
+        assert cell['salary_comp_types_counts'] == count_rows(table.company['salary_comp_types'], rows)
+        assert list(cell['gender_counts'].items()) == list(count_rows(table.census['gender'], rows).items())
+
+def test_multiselect_key(table):
+    res = group_by(table, 'ethnicity', {'degree': 'counts'})
+    ethnicity = table.census['ethnicity']
+
+    assert res['ethnicity'].tolist() == [e for e in ethnicity.categories
+                                         if ethnicity.mask_contains(e).any()]
+    for _, cell in res.iterrows():
+        rows = np.flatnonzero(ethnicity.mask_contains(cell['ethnicity']))
+        assert cell['num_respondents'] == len(rows)
+        assert cell['degree_counts'] == count_rows(table.census['degree'], rows)
+
+def test_invalid_metrics(table):
+    with pytest.raises(TypeError):
+        group_by(table, 'salary_base')
+    with pytest.raises(ValueError):
+        group_by(table, 'gender', {'salary_base': 'stdev'})
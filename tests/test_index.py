@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import pandas as pd
+from src.table import RespondentTable
+from src.index import FilterIndex, ValueIndex
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def test_value_index_matches_masks(table):
+    for key in ['country', 'degree', 'ethnicity']:
+        column = table.census[key]
+        index = ValueIndex(column)
+
+        # Both rare values (row lists) and common values (bitmaps) are indexed
+        kinds = {bitset.dtype for bitset in index.bitsets.values()}
+        assert kinds == {np.dtype(np.int32), np.dtype(np.uint8)}
+
+        for value in index.values:
+            if key == 'ethnicity':
+                expected = column.mask_contains(value)
+            else:
+                expected = column.mask_equal(value)
+            bitmap = np.unpackbits(index.bitmap(value), count=len(table)).astype(bool)
+            np.testing.assert_array_equal(bitmap, expected)
+            assert index.count(value) == expected.sum()
+
+def test_filter_index_mask(table):
+    index = FilterIndex(table)
+
+    mask = index.mask(['is_working', 'is_completed_all_questions'],
+                      country='United States', gender='Female', state=None)
+    expected = table.flags['is_working'] & table.flags['is_completed_all_questions'] & \
+               table.census['country'].mask_equal('United States') & \
+               table.census['gender'].mask_equal('Female')
+    np.testing.assert_array_equal(mask, expected)
+
+    catalog = index.catalog()
+    assert 'United States' in catalog['country']
+    assert 'Asian' in catalog['ethnicity']
+    assert None not in catalog['state']
+    assert not index.mask(country='Atlantis').any()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import pandas as pd
+import src.likert as likert
+from src.table import RespondentTable
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def test_encode_roundtrip():
+    values = np.array([[1, np.nan, 5], [3, 2, np.nan]])
+    answers = likert.encode(values)
+    assert answers.dtype == np.int8
+    assert answers.tolist() == [[1, 0, 5], [3, 2, 0]]
+    np.testing.assert_array_equal(likert.decode(answers), values)
+
+    with pytest.raises(ValueError):
+        likert.encode([[2.5]])
+
+def test_summarize_matches_numpy(table):
+    block = table.company['retention_sentiment']
+    idx = np.flatnonzero(table.working_mask())[::3]
+    values = block.values[idx]
+
+    res = block.summarize(idx)
+    assert res['keys'] == block.keys
+    np.testing.assert_array_equal(res['count'], np.sum(~np.isnan(values), axis=0))
+    np.testing.assert_allclose(res['mean'], np.nanmean(values, axis=0))
+    np.testing.assert_allclose(res['stdev'], np.nanstd(values, axis=0))
+    for q in likert.PERCENTILES:
+        np.testing.assert_allclose(res['percentiles'][q], np.nanpercentile(values, q, axis=0))
+
+    for level in range(1, likert.LEVELS + 1):
+        np.testing.assert_array_equal(res['distribution'][:, level - 1], np.sum(values == level, axis=0))
+    np.testing.assert_allclose(res['top_box'], np.sum(values >= 4, axis=0) / res['count'])
+    np.testing.assert_allclose(res['bottom_box'], np.sum(values <= 2, axis=0) / res['count'])
+
+def test_summarize_empty_subset(table):
+    res = table.census['sentiment'].summarize(np.zeros(0, dtype=np.int64))
+    assert (res['count'] == 0).all()
+    assert np.isnan(res['mean']).all()
+    assert np.isnan(res['percentiles'][50]).all()
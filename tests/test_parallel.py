@@ -0,0 +1,43 @@
+import warnings
+import numpy as np
+import pytest
+import src.parallel as parallel
+from src.analyst import Analyst
+
+@pytest.fixture(scope='module')
+def analyst():
+    analyst = Analyst()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        analyst.load_data('data/talent_census_data_20241216_gsheet_export.csv',
+                          'data/talent_census_data_20241216_typeform_export.csv', cache_dir=None)
+    analyst.build_respondents_list()
+    return analyst
+
+def assert_frames_equal(res, expected):
+    assert list(res.columns) == list(expected.columns)
+    for name in res.columns:
+        for value, expected_value in zip(res[name], expected[name]):
+            np.testing.assert_equal(value, expected_value)
+
+def test_segments_match_filtered_reports(analyst):
+    weights = np.random.default_rng(0).random(len(analyst.respondents_list))
+    res = analyst.segment_report('degree', ['census_backgrounds', 'company_salary'],
+                                 weights=weights)
+
+    for _, segment in res.iterrows():
+        report = analyst.report(analyst.filter_respondents_on(degree=segment['degree']), weights)
+        np.testing.assert_equal(segment['census_backgrounds'], report['census_backgrounds'])
+        np.testing.assert_equal(segment['company_salary'], report['company_salary'])
+
+@pytest.mark.parametrize('start_methods', [None, ['spawn']])
+def test_process_pool_matches_serial(analyst, monkeypatch, start_methods):
+    if start_methods is not None:
+        monkeypatch.setattr(parallel.multiprocessing, 'get_all_start_methods',
+                            lambda: start_methods)
+
+    by = ['country', 'employment_status']
+    serial = analyst.segment_report(by, ['company_salary', 'student_ideal', 'census_sentiment'])
+    pooled = analyst.segment_report(by, ['company_salary', 'student_ideal', 'census_sentiment'],
+                                    processes=2)
+    assert_frames_equal(pooled, serial)
@@ -1,7 +1,8 @@
 import numpy as np
 import pytest
 import pandas as pd
-from src.respondent import Respondent
+from src.respondent import Respondent, build_respondents
+from src.parser import join_typeform_metadata
 
 @pytest.fixture
 def resp():
@@ -48,3 +49,32 @@ def test_set_properties_from_typeform(resp, df_typeform):
     resp.set_properties_from_typeform(df_typeform)
 
     assert resp.df_typ is not None
+
+def test_build_respondents_matches_google_sheet(df_gsheet):
+    respondents = build_respondents(df_gsheet)
+
+    assert len(respondents) == df_gsheet['Token'].nunique()
+
+    for built in respondents[:25]:
+        resp = Respondent(built.respondent_id)
+        resp.set_properties_from_google_sheet(df_gsheet)
+
+        assert built.census['country'] == resp.census['country']
+        assert built.census['ethnicity'] == resp.census['ethnicity']
+        assert built.company['salary_comp_types'] == resp.company['salary_comp_types']
+        np.testing.assert_array_equal(built.census['sentiment']['values'],
+                                      resp.census['sentiment']['values'])
+        assert built.is_working == resp.is_working
+        assert built.is_completed_all_questions == resp.is_completed_all_questions
+
+def test_join_typeform_metadata(df_gsheet, df_typeform):
+    metadata, report = join_typeform_metadata(df_gsheet.iloc[:-1], df_typeform.iloc[1:])
+
+    assert report['missing_from_typeform'] == [df_typeform['#'].iloc[0]]
+    assert report['missing_from_gsheet'] == [df_gsheet['Token'].iloc[-1]]
+    assert metadata.index.tolist() == df_gsheet['Token'].iloc[:-1].tolist()
+
+    resp = Respondent(df_gsheet['Token'].iloc[1])
+    resp.set_properties_from_typeform(df_typeform)
+    assert metadata.loc[resp.respondent_id, 'submit_time'] == resp.metadata['submit_time']
+    assert metadata.loc[resp.respondent_id, 'duration_mins'] == resp.metadata['duration_mins']
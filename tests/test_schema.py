@@ -0,0 +1,33 @@
+import pytest
+from src.analyst import Analyst
+from src.parser import read_google_sheet
+import src.schema as schema
+
+FILE_GSHEET = 'data/talent_census_data_20241216_gsheet_export.csv'
+
+@pytest.fixture
+def df():
+    return read_google_sheet(FILE_GSHEET)
+
+def test_registry_covers_export(df):
+    plan = schema.compile_schema(df.columns)
+    assert plan.report() == {'missing': [], 'unexpected': []}
+    assert len(plan.positions) == len(schema.QUESTIONS)
+
+    # Plans are compiled once per set of columns
+    assert schema.compile_schema(df.columns) is plan
+
+def test_schema_drift_is_reported_at_load(tmp_path, df):
+    salary = 'What is your annual base salary?'
+    df = df.drop(columns=[salary, 'Mental health support'])
+    df['A new question?'] = 'yes'
+    df.to_csv(tmp_path / 'gsheet.csv', index=False)
+
+    analyst = Analyst()
+    with pytest.warns(UserWarning, match='not in the question registry'):
+        with pytest.raises(schema.SchemaDriftError) as error:
+            analyst.load_data(tmp_path / 'gsheet.csv', cache_dir=None)
+
+    assert ('company', 'salary_base', salary) in error.value.missing
+    assert ('company', 'benefits_priorities', 'Mental health support') in error.value.missing
+    assert analyst.schema_report['unexpected'] == ['A new question?']
@@ -0,0 +1,142 @@
+import collections
+import json
+import warnings
+import numpy as np
+import pytest
+from src.analyst import Analyst
+from src.sketches import HeavyHitterSketch, QuantileSketch, text_terms, count_terms, sketch_terms
+
+QUANTILES = np.array([0, 0.01, 0.25, 0.5, 0.75, 0.99, 1])
+
+def rank_errors(sketch, values):
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(QUANTILES), side='right') / len(values)
+    return np.abs(ranks - QUANTILES)[1:-1]
+
+def test_small_sketches_are_exact():
+    values = np.random.default_rng(0).lognormal(11, 0.5, size=200)
+    values[::9] = np.nan
+
+    sketch = QuantileSketch().update(values)
+    assert len(sketch) == np.sum(~np.isnan(values))
+    assert sketch.rank_error == 0
+    np.testing.assert_allclose(sketch.quantile(QUANTILES), np.nanquantile(values, QUANTILES))
+    assert sketch.median() == np.nanmedian(values)
+    assert sketch.percentiles([10, 90]) == {10: np.nanpercentile(values, 10),
+                                            90: np.nanpercentile(values, 90)}
+
+def test_chunked_sketches_within_bound():
+    values = np.random.default_rng(1).lognormal(11, 0.5, size=100000)
+
+    sketch = QuantileSketch(k=128)
+    for chunk in np.array_split(values, 100):
+        sketch.update(chunk)
+
+    assert sketch.size < 3 * 128 + 2 * 32
+    assert 0 < sketch.rank_error < 0.1
+    assert (rank_errors(sketch, values) <= sketch.rank_error).all()
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+def test_merged_shards_within_bound():
+    values = np.random.default_rng(2).normal(size=50000)
+
+    shards = [QuantileSketch().update(shard) for shard in np.array_split(values, 7)]
+    shards = [QuantileSketch.from_dict(json.loads(json.dumps(shard.to_dict()))) for shard in shards]
+
+    merged = QuantileSketch()
+    for shard in shards:
+        merged.merge(shard)
+
+    assert len(merged) == len(values)
+    assert (rank_errors(merged, values) <= merged.rank_error).all()
+
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(k=64))
+
+def load():
+    analyst = Analyst()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        analyst.load_data('data/talent_census_data_20241216_gsheet_export.csv',
+                          'data/talent_census_data_20241216_typeform_export.csv', cache_dir=None)
+    analyst.build_respondents_list()
+    return analyst
+
+def test_analyst_sketches_match_summaries():
+    analyst = load()
+
+    sketch = analyst.quantile_sketch('salary_base', k=1024)
+    assert sketch.median() == analyst.summarize_company_salary()['salary_base_median']
+
+    by_level = analyst.quantile_sketch('salary_base', by='role_level', k=1024)
+    counts = analyst.group_by('role_level', {'salary_base': ['count', 'median']})
+    assert [len(sketch) for sketch in by_level['sketch']] == counts['salary_base_count'].tolist()
+    assert [sketch.median() for sketch in by_level['sketch']] == counts['salary_base_median'].tolist()
+
+def test_text_terms():
+    assert text_terms("Python, C++ and data-analysis; Li-ion battery's design!") == \
+           ['python', 'c++', 'data-analysis', 'li-ion', 'battery', 'design',
+            'c++ data-analysis', 'li-ion battery', 'battery design']
+    assert text_terms('Cell design, cell design', ngrams=(2,)) == ['cell design']
+
+def test_heavy_hitters_within_bounds():
+    rng = np.random.default_rng(3)
+    terms = [f'term {i}' for i in range(2000)]
+    p = 1 / np.arange(1, 2001) ** 1.5
+    shards = [dict(collections.Counter(rng.choice(terms, size=5000, p=p / p.sum()).tolist()))
+              for _ in range(6)]
+    exact = collections.Counter()
+    for shard in shards:
+        exact.update(shard)
+
+    sketches = [HeavyHitterSketch(200).update(shard) for shard in shards]
+    sketches = [HeavyHitterSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+                for sketch in sketches]
+    merged = HeavyHitterSketch(200)
+    for sketch in sketches:
+        merged.merge(sketch)
+
+    assert merged.n == sum(exact.values()) and len(merged) == 200
+    for term, count, error in merged.top(200):
+        assert count - error <= exact[term] <= count
+    assert max(count for term, count in exact.items() if term not in merged.counts) <= merged.floor
+    assert [term for term, _, _ in merged.top(5)] == [term for term, _ in exact.most_common(5)]
+
+def test_term_sketch_counts_respondents():
+    analyst = load()
+    sketch = analyst.term_sketch('opinion_barriers', analyst.filter_for_working(), capacity=10 ** 6)
+    answers = analyst.summarize_company_skills()['barriers_to_talent_list']
+
+    exact = collections.Counter(term for answer in answers for term in text_terms(answer))
+    assert sketch.floor == 0
+    assert sketch.top(20) == [(term, count, 0) for term, count in
+                              sorted(exact.items(), key=lambda item: (-item[1], item[0]))[:20]]
+
+    by_degree = analyst.term_sketch('skills_demand', by='degree', capacity=50)
+    assert all(len(sketch) <= 50 for sketch in by_degree['sketch'])
+
+def test_sketch_terms_in_chunks():
+    analyst = load()
+    column = analyst.table.census['skills_demand']
+    idx = np.arange(len(analyst.table))
+    exact = count_terms(column, idx)
+
+    sketch = sketch_terms(column, idx, capacity=100, chunksize=128)
+    assert len(sketch) == 100
+    assert sketch.n == sum(exact.values())
+    for term, count, error in sketch.top(100):
+        assert count - error <= exact[term] <= count
+    assert max(count for term, count in exact.items() if term not in sketch.counts) <= sketch.floor
+
+    # The most mentioned terms stand out of the chunking error
+    top = sorted(exact.items(), key=lambda item: (-item[1], item[0]))
+    assert [term for term, _, _ in sketch.top(3)] == [term for term, _ in top[:3]]
+
+def test_terms_of_other_columns():
+    analyst = load()
+    idx = np.arange(len(analyst.table))
+    for column in [analyst.table.census['ethnicity'], analyst.table.company['salary_base'],
+                   analyst.table.census['sentiment'], analyst.table.flags['is_working']]:
+        with pytest.raises(TypeError):
+            count_terms(column, idx)
+    with pytest.raises(TypeError):
+        analyst.term_sketch('skills_value_chain')
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import pandas as pd
+import src.store as store
+from src.table import RespondentTable
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def test_store_round_trip(tmp_path, table):
+    store.save(table, tmp_path / 'store')
+    opened = store.open_store(tmp_path / 'store')
+
+    # Nothing is loaded until a column is accessed
+    assert len(opened.company.loaded) == 0
+
+    salary = opened.company['salary_base'].values
+    assert isinstance(salary, np.memmap)
+    np.testing.assert_array_equal(salary, table.company['salary_base'].values)
+    assert list(opened.company.loaded) == ['salary_base']
+
+    assert opened.census['ethnicity'].rows(range(10)) == table.census['ethnicity'].rows(range(10))
+    assert opened.flags['is_working'].tolist() == table.flags['is_working'].tolist()
+
+def test_store_does_not_overwrite(tmp_path, table):
+    store.save(table, tmp_path / 'store')
+
+    with pytest.raises(FileExistsError):
+        store.save(table, tmp_path / 'store')
+
+    store.save(table.take([0, 1]), tmp_path / 'store', overwrite=True)
+    assert len(store.open_store(tmp_path / 'store')) == 2
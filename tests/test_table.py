@@ -0,0 +1,137 @@
+import time
+import numpy as np
+import pytest
+import pandas as pd
+from src.table import RespondentTable, CategoricalColumn, MultiSelectColumn, concat_columns
+from src.respondent import Respondent
+import src.parser as parser
+import src.utils as utils
+
+@pytest.fixture
+def df_gsheet():
+    return pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv')
+
+@pytest.fixture
+def table(df_gsheet):
+    return RespondentTable.from_frames(df_gsheet)
+
+def test_table_matches_respondent(table, df_gsheet):
+    token = 'xgiqw1z6r37pu305hiipxgiqw11r00jc'
+    i = int(np.flatnonzero(table.tokens == token)[0])
+
+    resp = Respondent(token)
+    resp.set_properties_from_google_sheet(df_gsheet)
+
+    assert table.census['gender'].row(i) == resp.census['gender']
+    assert table.census['ethnicity'].row(i) == resp.census['ethnicity']
+    assert table.company['company_satisfaction'].row(i)['values'][0] == 4
+    assert table.flags['is_working'][i]
+
+def test_multiselect_take():
+    column = MultiSelectColumn.from_lists([['a', 'b'], [], ['c'], ['b', 'a', 'd']])
+
+    assert column.take([3, 1, 0]).rows(range(3)) == [['b', 'a', 'd'], [], ['a', 'b']]
+    assert column.mask_contains('a').tolist() == [True, False, False, True]
+
+def test_take_and_concat(table):
+    first = table.take([0, 1])
+    second = table.take([2])
+    joined = RespondentTable.concat([first, second])
+
+    assert len(joined) == 3
+    assert joined.tokens.tolist() == table.tokens[:3].tolist()
+    assert joined.census['skills_value_chain'].rows(range(3)) == \
+        table.census['skills_value_chain'].rows(range(3))
+    np.testing.assert_array_equal(joined.census['sentiment'].values,
+                                  table.census['sentiment'].values[:3])
+
+def test_concat_unions_categories():
+    first = MultiSelectColumn.from_lists([['a', 'b'], []])
+    second = MultiSelectColumn.from_lists([['c', 'a'], ['b']])
+    joined = concat_columns([first, second])
+
+    assert joined.categories == ['a', 'b', 'c']
+    assert joined.rows(range(4)) == [['a', 'b'], [], ['c', 'a'], ['b']]
+
+    first = CategoricalColumn.from_values(['x', None, 'y'])
+    second = CategoricalColumn.from_values(['z', 'y', None])
+    joined = concat_columns([first, second])
+
+    assert joined.categories == ['x', 'y', 'z']
+    assert joined.codes.tolist() == [0, -1, 1, 2, 1, -1]
+
+def test_concat_scales_with_the_arrays(table):
+    # A refresh stacks a few new responses onto a large table; this must not
+    # go back through the answers row by row
+    large = table.take(np.tile(np.arange(len(table)), 100))
+    delta = table.take(np.arange(50))
+
+    start = time.perf_counter()
+    joined = RespondentTable.concat([large, delta])
+    assert time.perf_counter() - start < 1.0
+
+    assert len(joined) == len(large) + 50
+    for key in ['ethnicity', 'gender']:
+        assert joined.census[key].rows(range(len(large) - 2, len(large) + 2)) == \
+            table.census[key].rows([len(table) - 2, len(table) - 1, 0, 1])
+
+def test_sections_skipped_for_non_completers(table):
+    i = int(np.flatnonzero(~table.flags['is_completed_industry_questions'])[0])
+    j = int(np.flatnonzero(~table.flags['is_completed_student_questions'])[0])
+
+    # Same keys as for everyone else, without answers
+    company = table.section_row('company', i)
+    assert list(company) == list(table.company)
+    assert np.isnan(company['salary_base'])
+    assert company['salary_comp_types'] == []
+    assert np.isnan(company['company_satisfaction']['values']).all()
+
+    student = table.section_row('student', j)
+    assert pd.isna(student['num_internships'])
+
+def test_multiselect_labels_with_commas():
+    answers = pd.Series(['Product integration (vehicles, mobility), Mining',
+                         np.nan,
+                         'Equity (stock, options, etc.),Bonuses',
+                         'Mining'])
+    column = MultiSelectColumn(*parser.split_multiselect(answers))
+
+    assert column.rows(range(4)) == [['Product integration (vehicles, mobility)', 'Mining'],
+                                     [],
+                                     ['Equity (stock, options, etc.)', 'Bonuses'],
+                                     ['Mining']]
+
+    rows, codes = column.long_format([3, 0])
+    assert rows.tolist() == [0, 1, 1]
+    assert [column.categories[c] for c in codes] == ['Mining', 'Product integration (vehicles, mobility)', 'Mining']
+
+def test_multiselect_known_options_with_commas():
+    answers = pd.Series(['Salary, bonuses, Equity', 'Salary'])
+    column = MultiSelectColumn(*parser.split_multiselect(answers, ['Salary, bonuses']))
+
+    assert column.rows(range(2)) == [['Salary, bonuses', 'Equity'], ['Salary']]
+
+def test_multiselect_count_matches_dict_counter(table):
+    column = table.company['salary_comp_types']
+    idx = np.flatnonzero(table.working_mask())
+
+    counter = dict()
+    for value in column.rows(idx):
+        utils.update_dict_counter(counter, value)
+
+    assert column.count(idx) == counter
+    assert list(column.count(idx)) == list(counter)
+    assert column.count([]) == {}
+
+def test_non_numeric_answers_count_as_missing():
+    df = parser.read_google_sheet('data/talent_census_data_20241216_gsheet_export.csv')
+    question = 'What is your annual base salary?'
+    i = int(np.flatnonzero(df[question].notna())[0])
+    expected = pd.to_numeric(df[question]).to_numpy(dtype=float)
+    expected[i] = np.nan
+    df.loc[df.index[i], question] = '120k'
+
+    with pytest.warns(UserWarning, match='1 non-numeric answer'):
+        table = RespondentTable.from_frames(df)
+
+    np.testing.assert_array_equal(table.company['salary_base'].values, expected)
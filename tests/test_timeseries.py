@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import pandas as pd
+from src.table import RespondentTable
+from src.timeseries import bucket_times, rolling_sums, time_series
+import src.summaries as summaries
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def test_bucket_times():
+    times = np.array(['2024-10-04T20:36', 'NaT', '2024-10-02T01:00', '2024-10-04T00:00'],
+                     dtype='datetime64[ns]')
+    starts, buckets = bucket_times(times, 'D')
+
+    np.testing.assert_array_equal(starts, np.array(['2024-10-02', '2024-10-03', '2024-10-04'],
+                                                   dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(buckets, [2, -1, 0, 2])
+
+    with pytest.raises(ValueError):
+        bucket_times(times, 'MS')
+
+def test_rolling_sums():
+    totals = np.array([3, 0, 1, 4, 2])
+    np.testing.assert_array_equal(rolling_sums(totals, 2), [3, 3, 1, 5, 6])
+    np.testing.assert_array_equal(rolling_sums(totals, 10), np.cumsum(totals))
+
+def test_series_match_rolling_windows(table):
+    idx = np.flatnonzero(table.working_mask())
+    res = time_series(table, idx, ['sentiment'], ['salary_base'], freq='7D', window=3)
+
+    times = table.submitted_at.values[idx]
+    assert res['cumulative_responses'][-1] == len(idx)
+    assert res['num_responses'].sum() == len(idx)
+
+    sentiment = table.census['sentiment'].values[idx]
+    salary    = table.company['salary_base'].values[idx]
+    width = np.timedelta64(7, 'D')
+    for i, start in enumerate(res['bucket_start']):
+        in_window = (times >= start - 2 * width) & (times < start + width)
+
+        assert res['rolling_responses'][i] == in_window.sum()
+        np.testing.assert_allclose(res['sentiment']['mean'][i],
+                                   np.nanmean(sentiment[in_window], axis=0))
+        np.testing.assert_array_equal(res['sentiment']['count'][i],
+                                      np.sum(~np.isnan(sentiment[in_window]), axis=0))
+        assert res['salary_base']['median'][i] == np.nanmedian(salary[in_window])
+
+def test_integer_weights_repeat_respondents(table):
+    idx = np.flatnonzero(table.working_mask())[:200]
+    weights = np.random.default_rng(0).integers(0, 4, size=len(idx))
+
+    res = time_series(table, idx, ['sentiment'], ['salary_base'], weights=weights)
+    repeated = time_series(table, np.repeat(idx, weights), ['sentiment'], ['salary_base'])
+
+    np.testing.assert_array_equal(res['cumulative_responses'][-1], weights.sum())
+    np.testing.assert_allclose(res['sentiment']['mean'], repeated['sentiment']['mean'])
+    np.testing.assert_array_equal(res['salary_base']['median'], repeated['salary_base']['median'])
+
+def test_fractional_weights(table):
+    idx = np.flatnonzero(table.working_mask())
+    weights = np.random.default_rng(1).integers(1, 4, size=len(idx))
+
+    # Weights summing to much less than one per window give the same medians
+    res = time_series(table, idx, numeric=['salary_base'], weights=weights)
+    scaled = time_series(table, idx, numeric=['salary_base'], weights=weights * 0.001)
+    np.testing.assert_array_equal(scaled['salary_base']['median'], res['salary_base']['median'])
+
+    # Each window's median is the weighted median of its answers
+    fractional = np.random.default_rng(2).random(len(idx)) / 100
+    res = time_series(table, idx, numeric=['salary_base'], freq='7D', window=3, weights=fractional)
+    times  = table.submitted_at.values[idx]
+    salary = table.company['salary_base'].values[idx]
+    width = np.timedelta64(7, 'D')
+    for i, start in enumerate(res['bucket_start']):
+        in_window = (times >= start - 2 * width) & (times < start + width)
+        assert res['salary_base']['median'][i] == \
+            pytest.approx(summaries.nanmedian(salary[in_window], fractional[in_window]), nan_ok=True)
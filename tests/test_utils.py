@@ -0,0 +1,31 @@
+import numpy as np
+import src.utils as utils
+
+def loop_counter(values):
+    counter = dict()
+    for value in values:
+        utils.update_dict_counter(counter, value)
+    return counter
+
+def test_count_values_single_choice():
+    values = ['b', np.nan, 'a', 'b', None, True, 3.0]
+    counter = utils.count_values(values)
+    assert list(counter.items()) == list(loop_counter(values).items())
+    assert utils.count_values([np.nan]) == {'_tot_': 0}
+    assert utils.count_values([]) == {}
+
+def test_count_values_long_format():
+    lists = [['a', 'b', 'a'], [], [np.nan], ['c', 'a'], ['b']]
+    rows   = [i for i, options in enumerate(lists) for _ in options]
+    values = [option for options in lists for option in options]
+
+    counter = utils.count_values(values, rows, num_rows=len(lists))
+    assert list(counter.items()) == list(loop_counter(lists).items())
+    assert counter['_tot_'] == 3
+    assert utils.count_values([], [], num_rows=2) == {'_tot_': 0}
+
+def test_merge_counters():
+    values = ['x', 'y', np.nan, 'x', 'z', 'y', 'w']
+    merged = utils.merge_counters(utils.count_values(values[:3]), {},
+                                  utils.count_values(values[3:]))
+    assert list(merged.items()) == list(loop_counter(values).items())
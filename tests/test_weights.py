@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import pandas as pd
+from src.table import RespondentTable
+from src.weights import rake
+import src.summaries as summaries
+
+@pytest.fixture
+def table():
+    return RespondentTable.from_frames(pd.read_csv('data/talent_census_data_20241216_gsheet_export.csv'))
+
+def weighted_shares(column, weights):
+    answered = column.codes >= 0
+    totals = np.bincount(column.codes[answered], weights[answered], minlength=len(column.categories))
+    return dict(zip(column.categories, totals / totals.sum()))
+
+def test_rake_matches_margins(table):
+    gender = table.census['gender']
+    shares = {value: 1 / len(gender.categories) for value in gender.categories}
+    targets = {'gender': shares,
+               'is_student': {True: 0.2, False: 0.8}}
+
+    weights = rake(table, targets)
+
+    assert weights.mean() == pytest.approx(1)
+    for value, share in weighted_shares(gender, weights).items():
+        assert share == pytest.approx(shares[value], abs=1e-5)
+    assert weights[table.flags['is_student']].sum() / weights.sum() == pytest.approx(0.2, abs=1e-5)
+
+def test_rake_invalid_targets(table):
+    with pytest.raises(ValueError):
+        rake(table, {'gender': {'Male': 1.0}})
+    with pytest.raises(ValueError):
+        rake(table, {'gender': {'No such answer': 1.0}})
+    with pytest.raises(TypeError):
+        rake(table, {'salary_base': {100000: 1.0}})
+
+def test_weighted_median_ignores_the_scale_of_the_weights(table):
+    values = np.array([1, 2, 3, 4], dtype=float)
+    for scale in [0.01, 0.1, 0.5, 1, 10]:
+        assert summaries.nanmedian(values, np.full(4, scale)) == 2.5
+
+    salary = table.company['salary_base'].values
+    for scale in [0.01, 0.1, 1, 10]:
+        assert summaries.nanmedian(salary, np.full(len(salary), scale)) == np.nanmedian(salary)
+
+def test_raked_median(table):
+    gender = table.census['gender']
+    weights = rake(table, {'gender': {value: 1 / len(gender.categories)
+                                      for value in gender.categories}})
+
+    salary = table.company['salary_base'].values
+    median = summaries.nanmedian(salary, weights)
+    for scale in [0.01, 0.1, 10]:
+        assert summaries.nanmedian(salary, weights * scale) == pytest.approx(median)
+
+    # Half of the weight of the salaries lies on either side of the median
+    is_value = ~np.isnan(salary)
+    salary, weights = salary[is_value], weights[is_value]
+    assert weights[salary < median].sum() <= weights.sum() / 2 <= weights[salary <= median].sum()
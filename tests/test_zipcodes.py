@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import numpy as np
+from src.zipcodes import normalize_zip, resolve_states
+
+def test_normalize_zip():
+    assert normalize_zip('94305') == '94305'
+    assert normalize_zip(' 94305 ') == '94305'
+    assert normalize_zip('94305-1234') == '94305'
+    assert normalize_zip('943051234') == '94305'
+    assert normalize_zip('2139') == '02139'
+    assert normalize_zip(2139.0) == '02139'
+    assert normalize_zip('2139-4307') == '02139'
+
+    # Missing answers and non-US postal codes
+    for zip_code in [np.nan, None, '', 'SW1A 1AA', 'V6J 3T6', '560064', '3700-447', '4615202']:
+        assert normalize_zip(zip_code) is None
+
+def test_resolve_states():
+    states = resolve_states(['94305', '94305-1234', ' 02139', '2139', 'K1Y0P9', np.nan, '00000'])
+    assert states.tolist() == ['CA', 'CA', 'MA', 'MA', None, None, None]
+    assert resolve_states([]).tolist() == []
+
+def test_resolve_states_by_country():
+    # Postal codes of other countries that look like US ZIP codes without
+    # their leading zero (from the 2024-12-30 export)
+    countries = ['Switzerland', 'Austria', 'Belgium', 'Spain', 'Norway', 'Australia', 'Argentina']
+    zip_codes = ['1260', '8020', '1050', '4600', '7034', '6026', '1001']
+    assert resolve_states(zip_codes).tolist() == ['MA', 'NJ', 'MA', 'ME', 'NJ', 'CT', 'MA']
+    assert resolve_states(zip_codes, countries).tolist() == [None] * 7
+
+    states = resolve_states(['2139', '2139', '94305', '10115'],
+                            ['United States', np.nan, 'United States', 'Germany'])
+    assert states.tolist() == ['MA', 'MA', 'CA', None]
+
+def test_import_does_not_open_zip_database():
+    code = 'import sqlite3; sqlite3.connect = None; import src.respondent, src.analyst'
+    subprocess.run([sys.executable, '-c', code], check=True)